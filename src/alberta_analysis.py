@@ -3,6 +3,11 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 
+from cap_monitoring import CapMonitor, compile_rules
+from gas_targets import GasChangeMatrix, evaluate_gas_targets
+from provinces import load_targets
+from sector_targets import sector_cube
+
 # ---------- Robust paths (works no matter where you run from) ----------
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
 DATA_DIR = os.path.join(BASE_DIR, "data")
@@ -155,4 +160,57 @@ plt.legend()
 plt.tight_layout()
 ab_oilsands_png = os.path.join(OUT_DIR, "ab_oilsands_insitu_vs_mined_trend.png")
 plt.savefig(ab_oilsands_png, dpi=200)
-plt.show()
\ No newline at end of file
+plt.show()
+
+# =======================================================================================
+# Part 5: Oil sands emissions vs the 100 Mt/year cap (from the targets table)
+# =======================================================================================
+ab_rules = [r for r in compile_rules(load_targets()) if r.province == "Alberta"]
+
+if not ab_rules:
+    print("⚠️ No Alberta cap rules in targets table; skipping cap check.")
+else:
+    ab_monitor = CapMonitor(sector_cube(alberta_overall_df), ab_rules)
+    ab_cap_report = ab_monitor.report()
+
+    ab_cap_csv = os.path.join(OUT_DIR, "ab_oilsands_cap_check.csv")
+    ab_cap_report.to_csv(ab_cap_csv, index=False)
+    print(f"Saved AB oil sands cap check → {ab_cap_csv}")
+
+    for r, rule in enumerate(ab_monitor.rules):
+        result = ab_cap_report.iloc[r]
+        print(f"Alberta {rule.sector}: {result['Latest Emissions']/1e6:.2f} Mt in {result['Latest Year']}, "
+              f"headroom {result['Headroom (tonnes CO2e)']/1e6:.2f} Mt under the {rule.limit/1e6:g} Mt cap; "
+              f"projected breach year: {result['Projected Breach Year']}")
+
+        plt.figure(figsize=(10, 6))
+        plt.plot(ab_monitor.years, ab_monitor.series[r] / 1e6, marker="o", label=f"{rule.sector} emissions")
+        plt.axhline(rule.limit / 1e6, color="red", linestyle="--", label=f"{rule.limit/1e6:g} Mt cap")
+        plt.title(f"Alberta — {rule.sector} Emissions vs Cap")
+        plt.xlabel("Reference Year")
+        plt.ylabel("Emissions (Mt CO2e)")
+        plt.grid(True)
+        plt.xticks(ab_monitor.years, rotation=45)
+        plt.legend()
+        plt.tight_layout()
+        ab_cap_png = os.path.join(OUT_DIR, "ab_oilsands_vs_cap.png")
+        plt.savefig(ab_cap_png, dpi=200)
+        plt.show()
+        print(f"Saved AB oil sands vs cap plot → {ab_cap_png}")
+
+# =======================================================================================
+# Part 6: Methane target check (45% below 2014 by 2025) from the gas target matrix
+# =======================================================================================
+ab_gas_matrix = GasChangeMatrix(alberta_overall_df, ["Facility Province"])
+ab_methane_check = evaluate_gas_targets(load_targets(), ab_gas_matrix)
+
+if ab_methane_check.empty:
+    print("⚠️ No evaluable Alberta gas targets; skipping methane target check.")
+else:
+    ab_methane_csv = os.path.join(OUT_DIR, "ab_methane_target_check.csv")
+    ab_methane_check.to_csv(ab_methane_csv, index=False)
+    print(f"Saved AB methane target check → {ab_methane_csv}")
+    for _, check in ab_methane_check.iterrows():
+        print(f"Alberta {check['Gas']}: {check['% Change from Baseline']:+.1f}% vs {check['Baseline Year']} "
+              f"in {check['Latest Year']} (target {check['Required % Change']:g}% by {check['Target Year']}) — "
+              f"{'met' if check['Met'] else 'not met'}")
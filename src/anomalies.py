@@ -0,0 +1,133 @@
+import os
+import warnings
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from emissions_cube import build_cube, TOTAL_COL
+from facility_index import build_facility_index
+from provinces import PROVINCE_OUTPUTS, province_out_dir
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/Anomalies")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+ROLLING_WINDOW = 5        # trailing years behind each rolling median / MAD
+MIN_PERIODS = 3           # reported years needed in the window
+Z_THRESHOLD = 3.5         # robust z-score cut-off (Iglewicz & Hoaglin)
+RATIO_THRESHOLD = 3.0     # year-over-year jump or drop by this factor
+MIN_CHANGE = 10_000       # tonnes; smaller year-over-year changes are never flagged
+MAD_SCALE = 1.4826        # MAD -> standard deviation for normal data
+
+
+def _robust_z(x, center, mad):
+    """(x - median) / scaled MAD, with a floor so flat series do not divide by zero."""
+    scale = MAD_SCALE * np.maximum(mad, 0.01 * np.abs(center) + 1.0)
+    return (x - center) / scale
+
+
+def detect_anomalies(matrix, years, window=ROLLING_WINDOW):
+    """
+    Flag outlier cells of an entities x years matrix (NaN = not reported).
+
+    Three tests run as whole-matrix operations:
+      - rolling z: each year against the median / MAD of the previous
+        `window` reported years (sliding_window_view over a NaN-padded copy);
+      - series z: each year against the median / MAD of the whole series;
+      - ratio: year-over-year jumps or drops by RATIO_THRESHOLD or more.
+    Cells whose year-over-year change is below MIN_CHANGE are never flagged.
+    Returns a dict of entities x years arrays.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    padded = np.concatenate([np.full((len(matrix), window), np.nan), matrix[:, :-1]], axis=1)
+    windows = sliding_window_view(padded, window, axis=1)                  # entities x years x window
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)                     # all-NaN windows
+        roll_med = np.nanmedian(windows, axis=2)
+        roll_mad = np.nanmedian(np.abs(windows - roll_med[..., None]), axis=2)
+        series_med = np.nanmedian(matrix, axis=1, keepdims=True)
+        series_mad = np.nanmedian(np.abs(matrix - series_med), axis=1, keepdims=True)
+    enough = (~np.isnan(windows)).sum(axis=2) >= MIN_PERIODS
+
+    rolling_z = np.where(enough, _robust_z(matrix, roll_med, roll_mad), np.nan)
+    series_z = _robust_z(matrix, series_med, series_mad)
+
+    prev = np.concatenate([np.full((len(matrix), 1), np.nan), matrix[:, :-1]], axis=1)
+    change = matrix - prev
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where((prev > 0) & (matrix > 0), matrix / prev, np.nan)
+    big = np.abs(change) >= MIN_CHANGE
+
+    flags = {
+        "Rolling Z": big & (np.abs(rolling_z) > Z_THRESHOLD),
+        "Series Z": big & (np.abs(series_z) > Z_THRESHOLD),
+        "YoY Ratio": big & ((ratio >= RATIO_THRESHOLD) | (ratio <= 1.0 / RATIO_THRESHOLD)),
+    }
+    return {"years": np.asarray(years), "value": matrix, "change": change, "ratio": ratio,
+            "rolling_z": rolling_z, "series_z": series_z, "flags": flags}
+
+
+def anomaly_table(result, labels):
+    """
+    One row per flagged cell, ranked by number of tests failed then by the
+    size of the year-over-year change. `labels` is a DataFrame with one row
+    per matrix row (e.g. facility name and province).
+    """
+    n_flags = sum(f.astype(int) for f in result["flags"].values())
+    r, c = np.nonzero(n_flags)
+    table = labels.iloc[r].reset_index(drop=labels.index.name is None)
+    table["Reference Year"] = result["years"][c]
+    table["Emissions (tonnes CO2e)"] = result["value"][r, c]
+    table["YoY Change (tonnes CO2e)"] = result["change"][r, c]
+    table["YoY Ratio"] = result["ratio"][r, c]
+    table["Rolling Robust Z"] = result["rolling_z"][r, c]
+    table["Series Robust Z"] = result["series_z"][r, c]
+    for name, flag in result["flags"].items():
+        table[f"Flag: {name}"] = flag[r, c]
+    table["Tests Failed"] = n_flags[r, c]
+    table["_size"] = np.abs(table["YoY Change (tonnes CO2e)"])
+    table = table.sort_values(["Tests Failed", "_size"], ascending=False).drop(columns="_size")
+    return table.reset_index(drop=True)
+
+
+def facility_anomalies(df):
+    """Anomalies over the dense facility x year matrix (non-reporting years are NaN)."""
+    index = build_facility_index(df, [TOTAL_COL])
+    matrix, years = index.dense(TOTAL_COL, fill_value=np.nan)
+    return anomaly_table(detect_anomalies(matrix, years), index.info)
+
+
+def sector_anomalies(df):
+    """Anomalies over the province x Facility Description x year cube, flattened to series."""
+    cube = build_cube(df, ["Facility Province", "Facility Description", "Reference Year"], TOTAL_COL)
+    provinces, descriptions, years = cube.labels
+    values = cube.values.reshape(-1, len(years))
+    reported = values.any(axis=1)
+    labels = pd.DataFrame({"Facility Province": np.repeat(provinces, len(descriptions)),
+                           "Facility Description": np.tile(descriptions, len(provinces))})[reported]
+    matrix = np.where(values[reported] > 0, values[reported], np.nan)
+    return anomaly_table(detect_anomalies(matrix, years), labels)
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+
+    tables = {"facility": facility_anomalies(emission_df), "sector": sector_anomalies(emission_df)}
+    for level, table in tables.items():
+        table_csv = os.path.join(OUT_DIR, f"{level}_year_anomalies.csv")
+        table.to_csv(table_csv, index=False)
+        print(f"Saved {len(table)} {level}-year anomalies → {table_csv}")
+
+    # Ranked tables next to each province's other outputs
+    for province, (_, prefix) in PROVINCE_OUTPUTS.items():
+        for level, table in tables.items():
+            ranked = table[table["Facility Province"] == province]
+            if ranked.empty:
+                print(f"⚠️ No {level}-year anomalies flagged for {province}.")
+                continue
+            ranked_csv = os.path.join(province_out_dir(province), f"{prefix}_{level}_anomalies_ranked.csv")
+            ranked.to_csv(ranked_csv, index=False)
+            print(f"Saved {province} ranked {level} anomalies → {ranked_csv}")
@@ -0,0 +1,224 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from cap_monitoring import PROJECTION_HORIZON, TREND_WINDOW
+from changepoints import detect_change_points, last_regime_start, masked_trend
+from emissions_cube import build_cube, TOTAL_COL
+from gas_targets import GAS_TARGET_SECTORS
+from naics_rollup import TARGET_SECTORS, with_parent_sectors
+from provinces import load_targets
+from sector_targets import sector_cube
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/Attainment")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+# Scenario draws per target: annual log-changes resampled from the target's own history
+N_DRAWS = 5000
+RANDOM_SEED = 42
+
+
+def target_series(df, targets):
+    """
+    Emissions series behind every reduction / threshold target.
+
+    Province-wide targets use province totals, sector targets the sector cube
+    and gas targets (e.g. Alberta methane) that gas column. Returns
+    (targets with "Target Level" added, targets x years matrix, years);
+    targets whose level cannot be resolved (baseline year not in the data)
+    are dropped.
+    """
+    sel = targets[targets["Kind"].isin(["reduction", "threshold"])]
+    sectors = with_parent_sectors(sector_cube(df))
+    years = np.asarray(sectors.labels[2], dtype=np.int64)
+    provinces = list(sectors.labels[0])
+    columns = [TOTAL_COL] + list(GAS_TARGET_SECTORS.values())
+    totals = build_cube(df, ["Facility Province", "Reference Year"], columns,
+                        labels={"Facility Province": provinces, "Reference Year": years})   # P x Y x columns
+
+    series = np.full((len(sel), len(years)), np.nan)
+    for i, (province, sector) in enumerate(zip(sel["Province"], sel["Sector"])):
+        if province not in provinces:
+            continue
+        p = provinces.index(province)
+        if sector in GAS_TARGET_SECTORS:
+            series[i] = totals.values[p, :, columns.index(GAS_TARGET_SECTORS[sector])]
+        elif sector in TARGET_SECTORS:
+            series[i] = sectors.values[p, TARGET_SECTORS.index(sector)]
+        else:
+            series[i] = totals.values[p, :, 0]
+
+    b_idx = np.searchsorted(years, sel["Baseline Year"].fillna(0).to_numpy(dtype=np.int64))
+    has_base = sel["Baseline Year"].isin(years).to_numpy()
+    baseline = np.where(has_base, series[np.arange(len(sel)), np.minimum(b_idx, len(years) - 1)], np.nan)
+    upper = sel["Reduction Upper Bound"].to_numpy(dtype=float)
+    level = np.where(sel["Kind"] == "reduction", baseline * (1 - upper / 100.0), upper * 1_000_000)
+
+    keep = ~np.isnan(level) & ~np.isnan(series).any(axis=1) & (level > 0)
+    return sel[keep].assign(**{"Target Level": level[keep]}), series[keep], years
+
+
+def projection_grid(hist_years, horizon=PROJECTION_HORIZON):
+    """Year grid from the last actual year to the horizon."""
+    return np.arange(int(hist_years[-1]), horizon + 1)
+
+
+def linear_paths(series, hist_years, grid, window=TREND_WINDOW, regime_starts=None):
+    """
+    Closed-form least squares slopes over the trailing window, applied from
+    each series' actual last value so grid column 0 (the last actual year) is
+    the observed level, not the fitted one. With `regime_starts` (per-series
+    index of the first post-break year) each slope is fitted to its own last
+    regime instead.
+    """
+    if regime_starts is not None:
+        slope, _ = masked_trend(series, hist_years, regime_starts)
+    else:
+        x = hist_years[-window:].astype(float)
+        y = series[:, -window:]
+        x_c = x - x.mean()
+        slope = (y - y.mean(axis=1, keepdims=True)) @ x_c / (x_c @ x_c)
+    return series[:, -1, None] + slope[:, None] * (grid[None, :] - hist_years[-1])
+
+
+def exponential_paths(series, hist_years, grid, window=TREND_WINDOW, regime_starts=None):
+    """Log-linear (constant % change) fits from the last actual value; series with non-positive values in the fitted years are NaN."""
+    fitted = np.arange(series.shape[1])[None, :] >= (series.shape[1] - window if regime_starts is None
+                                                     else np.asarray(regime_starts)[:, None])
+    positive = ((series > 0) | ~fitted).all(axis=1)
+    log_y = np.log(np.where(series > 0, series, 1.0))
+    paths = np.exp(linear_paths(log_y, hist_years, grid, window, regime_starts))
+    return np.where(positive[:, None], paths, np.nan)
+
+
+def scenario_draws(series, grid, n_draws=N_DRAWS, seed=RANDOM_SEED, window=TREND_WINDOW, series_ids=None):
+    """
+    Series x draws x grid array of random-walk paths.
+
+    Each step's log-change is resampled from that series' own observed
+    year-over-year log-changes in the trailing window; the whole array is
+    one gather and one cumulative sum. Every series draws from its own
+    generator seeded with (seed, series id), e.g. the Target ID, so its
+    paths do not depend on which other series are in the batch.
+    """
+    series_ids = np.arange(len(series)) if series_ids is None else np.asarray(series_ids)
+    y = series[:, -(window + 1):]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_changes = np.diff(np.log(y), axis=1)                          # series x window
+    valid = np.isfinite(log_changes)
+    log_changes = np.where(valid, log_changes, 0.0)
+
+    n_series, n_steps = len(series), len(grid) - 1
+    picks = np.stack([np.random.default_rng([seed, int(i)]).integers(0, log_changes.shape[1], size=(n_draws, n_steps))
+                      for i in series_ids]) if n_series else np.zeros((0, n_draws, n_steps), dtype=np.int64)
+    steps = np.take_along_axis(log_changes[:, None, :], picks, axis=2)
+    cum = np.concatenate([np.zeros((n_series, n_draws, 1)), np.cumsum(steps, axis=2)], axis=2)
+    paths = series[:, -1, None, None] * np.exp(cum)
+    return np.where(valid.all(axis=1)[:, None, None], paths, np.nan)
+
+
+def first_crossing(paths, levels, grid):
+    """
+    First grid year each path is at or below its level (NaN if never).
+
+    `paths` is (..., years) and `levels` broadcasts against its leading
+    shape, so any number of targets, models and draws is solved by one
+    comparison and one argmax along the year axis.
+    """
+    below = paths <= np.asarray(levels)[..., None]
+    first = np.argmax(below, axis=-1)
+    return np.where(below.any(axis=-1), grid[first], np.nan)
+
+
+def attainment_years(df, targets, n_draws=N_DRAWS, seed=RANDOM_SEED, post_break=False):
+    """
+    Attainment year and lead (+) / lag (-) in years vs each target date,
+    per target and trend model. Scenario draws are summarised by their
+    median and 10th/90th percentile attainment years (never = after the
+    horizon) and the share of draws that meet the target on time.
+    With `post_break`, trend models are fitted only to each series' last
+    regime found by change-point detection.
+    """
+    meta, series, hist_years = target_series(df, targets)
+    grid = projection_grid(hist_years)
+    regime_starts = last_regime_start(detect_change_points(series)) if post_break else None
+    levels = meta["Target Level"].to_numpy()
+    target_year = meta["Target Year"].to_numpy(dtype=float)
+
+    rows = []
+    for model, paths in [("Linear", linear_paths(series, hist_years, grid, regime_starts=regime_starts)),
+                         ("Exponential", exponential_paths(series, hist_years, grid, regime_starts=regime_starts))]:
+        year = first_crossing(paths, levels, grid)
+        rows.append(pd.DataFrame({"Model": model, "Attainment Year": year,
+                                  "P10 Attainment Year": np.nan, "P90 Attainment Year": np.nan,
+                                  "Share On Time": (year <= target_year).astype(float)}, index=meta.index))
+
+    draws = first_crossing(scenario_draws(series, grid, n_draws, seed, series_ids=meta.index.to_numpy()),
+                           levels[:, None], grid)
+    never = np.where(np.isnan(draws), grid[-1] + 1.0, draws)              # "never" sorts after the horizon
+    p10, p50, p90 = np.quantile(never, [0.1, 0.5, 0.9], axis=1)
+
+    def in_grid(a):
+        return np.where(a <= grid[-1], a, np.nan)
+
+    rows.append(pd.DataFrame({"Model": f"Scenario draws (n={n_draws})", "Attainment Year": in_grid(p50),
+                              "P10 Attainment Year": in_grid(p10), "P90 Attainment Year": in_grid(p90),
+                              "Share On Time": (never <= target_year[:, None]).mean(axis=1)}, index=meta.index))
+
+    result = pd.concat(rows)
+    result = meta[["Province", "Sector", "Kind", "Baseline Year", "Target Year", "Target Level"]].join(result)
+    result.insert(6, "Latest Emissions", pd.Series(series[:, -1], index=meta.index).reindex(result.index).to_numpy())
+    result["Lead (+) / Lag (-) Years"] = result["Target Year"].astype(float) - result["Attainment Year"]
+    return result.sort_index(kind="stable")
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+    targets = load_targets()
+
+    result = attainment_years(emission_df, targets)
+    skipped = sorted(set(targets.index[targets["Kind"].isin(["reduction", "threshold"])]) - set(result.index))
+    if skipped:
+        print(f"⚠️ Targets {skipped} have no usable baseline in the data; no attainment year computed.")
+
+    result_csv = os.path.join(OUT_DIR, "target_attainment_years.csv")
+    result.to_csv(result_csv)
+    print(f"Saved target attainment years → {result_csv}")
+
+    post_break = attainment_years(emission_df, targets, post_break=True)
+    post_break_csv = os.path.join(OUT_DIR, "target_attainment_years_post_break.csv")
+    post_break.to_csv(post_break_csv)
+    print(f"Saved target attainment years (post-break trends) → {post_break_csv}")
+
+    # Plot: lead/lag per target and model (targets never met by the horizon are marked)
+    labels = [f"{r['Province']} — {r['Sector']} ({r['Target Year']})" for _, r in result.groupby(level=0).first().iterrows()]
+    models = list(result["Model"].unique())
+    lead = result.pivot_table(index=result.index, columns="Model", values="Lead (+) / Lag (-) Years", dropna=False)[models]
+    y = np.arange(len(lead))
+    height = 0.8 / len(models)
+
+    plt.figure(figsize=(12, 0.6 * len(lead) + 2))
+    for m, model in enumerate(models):
+        values = lead[model].to_numpy()
+        never = np.isnan(values)
+        bars = plt.barh(y + m * height, np.where(never, 0.0, values), height=height, label=model)
+        for k in np.flatnonzero(never):
+            plt.text(0, y[k] + m * height, f" not by {PROJECTION_HORIZON}", va="center", fontsize=7,
+                     color=bars.patches[0].get_facecolor())
+    plt.axvline(0, color="black", linewidth=1)
+    plt.yticks(y + 0.4 - height / 2, labels, fontsize=8)
+    plt.gca().invert_yaxis()
+    plt.title("Target Attainment: Years Ahead (+) or Behind (-) the Target Date")
+    plt.xlabel("Lead (+) / Lag (-) Years")
+    plt.grid(True, axis="x")
+    plt.legend(fontsize=8)
+    plt.tight_layout()
+    lead_png = os.path.join(OUT_DIR, "target_attainment_lead_lag.png")
+    plt.savefig(lead_png, dpi=200)
+    plt.show()
+    print(f"Saved attainment lead/lag plot → {lead_png}")
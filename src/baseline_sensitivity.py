@@ -0,0 +1,168 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from carbon_budget import province_year_totals
+from provinces import PROVINCES, load_external_baselines, load_targets
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/BaselineSensitivity")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+
+def baseline_matrix(totals, external=None, extra_years=()):
+    """
+    Province x baseline-year matrix of baseline emissions (tonnes).
+
+    Facility totals are used where the year is in the data; external
+    baselines fill years the data does not cover (e.g. 1990). Returns
+    (matrix, baseline years, source matrix of "data" / "external" / "").
+    """
+    external = external if external is not None else pd.DataFrame(index=totals.index)
+    years = np.union1d(np.asarray(totals.columns, dtype=np.int64),
+                       np.union1d(np.asarray(external.columns, dtype=np.int64), np.asarray(extra_years, dtype=np.int64)))
+    data = totals.reindex(columns=years).to_numpy(dtype=float)
+    ext = external.reindex(index=totals.index, columns=years).to_numpy(dtype=float)
+
+    values = np.where(np.isnan(data), ext, data)
+    source = np.select([~np.isnan(data), ~np.isnan(ext)], ["data", "external"], "")
+    return values, years, source
+
+
+def sensitivity_cube(totals, targets, external=None):
+    """
+    Target gaps for every baseline year x target year x province at once.
+
+    Province-wide reduction targets set level = baseline x (1 - upper %);
+    threshold targets keep their fixed level. The required path runs
+    linearly from the baseline year to the target level, so the gap of the
+    latest actual year to that path depends on the baseline even for fixed
+    levels. Cells with no baseline or no target are NaN.
+    """
+    sel = targets[(targets["Sector"] == "All") & targets["Kind"].isin(["reduction", "threshold"])
+                  & targets["Province"].isin(totals.index) & targets["Target Year"].notna()]
+    baselines, base_years, source = baseline_matrix(totals, external, sel["Baseline Year"].dropna())
+    provinces = list(totals.index)
+    target_years = np.unique(sel["Target Year"].to_numpy(dtype=np.int64))
+    latest_year = int(max(totals.columns))
+    latest = totals[latest_year].to_numpy(dtype=float)                               # P
+
+    # Target year x province: reduction fraction, fixed level and the official baseline year
+    reduction = np.full((len(target_years), len(provinces)), np.nan)
+    fixed = np.full_like(reduction, np.nan)
+    official = np.full_like(reduction, np.nan)
+    t_idx = np.searchsorted(target_years, sel["Target Year"].to_numpy(dtype=np.int64))
+    p_idx = np.array([provinces.index(p) for p in sel["Province"]], dtype=int)
+    is_pct = (sel["Kind"] == "reduction").to_numpy()
+    upper = sel["Reduction Upper Bound"].to_numpy(dtype=float)
+    reduction[t_idx[is_pct], p_idx[is_pct]] = upper[is_pct] / 100.0
+    fixed[t_idx[~is_pct], p_idx[~is_pct]] = upper[~is_pct] * 1_000_000
+    official[t_idx, p_idx] = sel["Baseline Year"].to_numpy(dtype=float, na_value=np.nan)
+
+    base = baselines.T[:, None, :]                                                   # B x 1 x P
+    level = np.where(np.isnan(fixed)[None], base * (1.0 - reduction[None]), fixed[None])   # B x T x P
+    level = np.where(np.isnan(base), np.nan, level)
+
+    b_year = base_years[:, None, None].astype(float)
+    t_year = target_years[None, :, None].astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        progress = np.clip((latest_year - b_year) / (t_year - b_year), 0.0, 1.0)
+        path = base + (level - base) * progress
+        gap_pct = (latest[None, None, :] - path) / path * 100.0
+    # A baseline must precede the latest actual year, otherwise the gap is trivially zero
+    valid = (b_year < latest_year) & (b_year < t_year) & ~np.isnan(level)
+
+    return {
+        "provinces": np.asarray(provinces), "baseline_years": base_years, "target_years": target_years,
+        "latest_year": latest_year, "baseline": baselines, "source": source,
+        "level": np.where(valid, level, np.nan),
+        "path": np.where(valid, path, np.nan),
+        "gap": np.where(valid, latest[None, None, :] - path, np.nan),
+        "gap_pct": np.where(valid, gap_pct, np.nan),
+        "official": official,
+    }
+
+
+def sensitivity_tables(cube):
+    """(long table of every valid cell, fragility summary per province x target year)."""
+    b, t, p = np.nonzero(~np.isnan(cube["gap"]))
+    long = pd.DataFrame({
+        "Province": cube["provinces"][p],
+        "Target Year": cube["target_years"][t],
+        "Baseline Year": cube["baseline_years"][b],
+        "Baseline Source": cube["source"][p, b],
+        "Official Baseline": cube["baseline_years"][b] == cube["official"][t, p],
+        "Baseline Emissions": cube["baseline"][p, b],
+        "Target Level": cube["level"][b, t, p],
+        f"Required Path {cube['latest_year']}": cube["path"][b, t, p],
+        f"Gap to Path {cube['latest_year']} (tonnes CO2e)": cube["gap"][b, t, p],
+        "Gap to Path (%)": cube["gap_pct"][b, t, p],
+        "On Track": cube["gap"][b, t, p] <= 0,
+    })
+
+    grouped = long.groupby(["Province", "Target Year"])
+    summary = grouped.agg(**{
+        "Baselines Evaluated": ("On Track", "size"),
+        "Share of Baselines On Track": ("On Track", "mean"),
+        "Min Gap to Path (%)": ("Gap to Path (%)", "min"),
+        "Max Gap to Path (%)": ("Gap to Path (%)", "max"),
+    })
+    official = long[long["Official Baseline"]].set_index(["Province", "Target Year"])
+    summary["Official Baseline Year"] = official["Baseline Year"]
+    summary["On Track (official baseline)"] = official["On Track"]
+    share = summary["Share of Baselines On Track"]
+    summary["Conclusion"] = np.select([share == 1.0, share == 0.0], ["Robust: on track", "Robust: off track"],
+                                      "Fragile: depends on baseline")
+    return long, summary.reset_index()
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+    targets = load_targets()
+    external = load_external_baselines()
+
+    totals = province_year_totals(emission_df).reindex(PROVINCES).fillna(0.0)
+    cube = sensitivity_cube(totals, targets, external)
+    long, summary = sensitivity_tables(cube)
+
+    no_baseline = summary.loc[summary["Official Baseline Year"].isna(), ["Province", "Target Year"]]
+    for _, row in no_baseline.iterrows():
+        print(f"⚠️ {row['Province']} {row['Target Year']}: official baseline not in data or external table; "
+              f"only alternative baselines evaluated.")
+
+    long_csv = os.path.join(OUT_DIR, "baseline_sensitivity_gaps.csv")
+    long.to_csv(long_csv, index=False)
+    print(f"Saved baseline × target year × province gaps → {long_csv}")
+    summary_csv = os.path.join(OUT_DIR, "baseline_sensitivity_summary.csv")
+    summary.to_csv(summary_csv, index=False)
+    print(f"Saved baseline fragility summary → {summary_csv}")
+
+    # Heatmap: gap to required path (%) for each baseline year (rows) x province/target year (columns)
+    pairs = summary[["Province", "Target Year"]].to_numpy()
+    p_idx = np.array([list(cube["provinces"]).index(p) for p in pairs[:, 0]], dtype=int)
+    t_idx = np.searchsorted(cube["target_years"], pairs[:, 1].astype(np.int64))
+    grid = cube["gap_pct"][:, t_idx, p_idx]                                           # B x pairs
+    rows = ~np.isnan(grid).all(axis=1)
+
+    limit = np.nanpercentile(np.abs(grid), 95)
+    plt.figure(figsize=(12, 8))
+    plt.imshow(grid[rows], aspect="auto", cmap="RdYlGn_r", vmin=-limit, vmax=limit)
+    plt.colorbar(label=f"{cube['latest_year']} gap to required path (%)  (>0 = behind)")
+    plt.yticks(np.arange(rows.sum()), cube["baseline_years"][rows])
+    plt.xticks(np.arange(len(pairs)), [f"{p} {t}" for p, t in pairs], rotation=45, ha="right", fontsize=8)
+    official = cube["official"][t_idx, p_idx]
+    for c, year in enumerate(official):
+        r = np.flatnonzero(cube["baseline_years"][rows] == year)
+        if len(r):
+            plt.scatter(c, r[0], marker="s", facecolors="none", edgecolors="black", s=80)
+    plt.title("Gap to Required Path by Baseline Year (official baseline boxed)")
+    plt.ylabel("Baseline Year")
+    plt.tight_layout()
+    heatmap_png = os.path.join(OUT_DIR, "baseline_sensitivity_heatmap.png")
+    plt.savefig(heatmap_png, dpi=200)
+    plt.show()
+    print(f"Saved baseline sensitivity heatmap → {heatmap_png}")
@@ -3,6 +3,8 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from facility_index import build_facility_index
+
 # --- Paths that work from ANY working directory ---
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))          # project root
 DATA_DIR = os.path.join(BASE_DIR, "data")
@@ -163,15 +165,13 @@ print(f"BC's 2050 emissions target: {target_2050/1_000_000:.2f} million tonnes C
 # =======================================================
 # Part 5: Top 15 most emission-intensive facilities (avg)
 # =======================================================
-tmp = bc_emission.copy()
-tmp['Total Emissions (tonnes CO2e)'] = pd.to_numeric(tmp['Total Emissions (tonnes CO2e)'], errors='coerce')
-
-facility_avg = tmp.groupby('Facility Name')['Total Emissions (tonnes CO2e)'].agg(['sum', 'count'])
-facility_avg['Avg Emissions per Year'] = facility_avg['sum'] / facility_avg['count']
+# Per-facility means come from the facility index (stable IDs, so renamed plants stay one entry)
+bc_index = build_facility_index(bc_emission, ['Total Emissions (tonnes CO2e)'])
+facility_avg = bc_index.segment_stats().rename(columns={'Mean': 'Avg Emissions per Year'})
 top_emitters = facility_avg.sort_values('Avg Emissions per Year', ascending=False).head(15)
 
 plt.figure(figsize=(12, 6))
-plt.barh(top_emitters.index, top_emitters['Avg Emissions per Year'] / 1e6, color='gold')
+plt.barh(top_emitters['Facility Name'], top_emitters['Avg Emissions per Year'] / 1e6, color='gold')
 plt.xlabel('Average Annual Emissions (Million tonnes CO2e)')
 plt.title('Top 15 Emission-Intensive Facilities in BC')
 plt.gca().invert_yaxis()
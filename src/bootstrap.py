@@ -0,0 +1,153 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from attainment import target_series
+from cap_monitoring import PROJECTION_HORIZON, TREND_WINDOW
+from changepoints import series_frame
+from provinces import load_targets
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/Bootstrap")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+N_BOOT = 2000
+RANDOM_SEED = 42
+BAND_LEVEL = 0.90
+PROJECTION_YEARS = [2030, 2050]
+
+
+def bootstrap_trends(values, years, window=TREND_WINDOW, n_boot=N_BOOT, method="residual", seed=RANDOM_SEED):
+    """
+    Bootstrap slope / intercept samples for many series at once.
+
+    "residual": fitted line plus resampled residuals, solved for every
+    series and resample in one product with the pseudo-inverse of the
+    (years x 2) design matrix. "pairs": years resampled with replacement,
+    expressed as multinomial weights in a closed-form weighted least squares.
+    Returns (slopes, intercepts), each series x resamples.
+    """
+    rng = np.random.default_rng(seed)
+    x = np.asarray(years[-window:], dtype=float)
+    y = np.asarray(values, dtype=float)[:, -window:]
+    n_series, n_years = y.shape
+
+    if method == "residual":
+        design = np.column_stack([np.ones(n_years), x - x.mean()])
+        solve = np.linalg.pinv(design)                                       # 2 x years
+        coef = y @ solve.T                                                   # series x 2
+        resid = y - coef @ design.T
+        picks = rng.integers(0, n_years, size=(n_series, n_boot, n_years))
+        y_star = (coef @ design.T)[:, None, :] + np.take_along_axis(resid[:, None, :], picks, axis=2)
+        boot = y_star @ solve.T                                              # series x resamples x 2
+        intercept, slope = boot[..., 0], boot[..., 1]
+    elif method == "pairs":
+        w = rng.multinomial(n_years, np.full(n_years, 1.0 / n_years), size=(n_series, n_boot)).astype(float)
+        n = w.sum(axis=2)
+        x_mean = (w * x).sum(axis=2) / n
+        y_mean = (w * y[:, None, :]).sum(axis=2) / n
+        dx = x - x_mean[..., None]
+        sxx = (w * dx * dx).sum(axis=2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = np.where(sxx > 0, (w * dx * (y[:, None, :] - y_mean[..., None])).sum(axis=2) / sxx, np.nan)
+        intercept = y_mean - slope * (x_mean - x.mean())
+    else:
+        raise ValueError(f"Unknown bootstrap method: {method}")
+    # Intercepts are at the window's mean year; shift to year 0
+    return slope, intercept - slope * x.mean()
+
+
+def crossing_years(slopes, levels, last_year, last_values, horizon=PROJECTION_HORIZON):
+    """
+    Closed-form first year each bootstrap trend is at or below its level,
+    projected from the actual last value: the last actual year if that value
+    is already there, else last_year + ceil((level - last value) / slope)
+    (never before last_year + 1) for declining trends, NaN if never by `horizon`.
+    """
+    levels = np.asarray(levels, dtype=float)[:, None]
+    last_values = np.asarray(last_values, dtype=float)[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cross = last_year + np.ceil((levels - last_values) / slopes)
+    cross = np.where(slopes < 0, np.maximum(cross, last_year + 1), np.nan)
+    cross = np.where(last_values <= levels, float(last_year), cross)
+    return np.where(cross <= horizon, cross, np.nan)
+
+
+def quantile_band(samples, level=BAND_LEVEL):
+    """(lower, median, upper) along the last axis, ignoring NaN."""
+    tail = (1.0 - level) / 2.0
+    return np.nanquantile(samples, [tail, 0.5, 1.0 - tail], axis=-1)
+
+
+def trend_band(years, values, level=BAND_LEVEL, n_boot=N_BOOT):
+    """Bootstrap band of a full-period linear trendline, evaluated at `years` (for the per-province plots)."""
+    years = np.asarray(years, dtype=float)
+    slope, intercept = bootstrap_trends(np.asarray(values, dtype=float)[None, :], years, window=len(years), n_boot=n_boot)
+    lines = intercept[0][:, None] + slope[0][:, None] * years[None, :]
+    lower, _, upper = quantile_band(lines.T, level)
+    return lower, upper
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+    targets = load_targets()
+    pct = f"{BAND_LEVEL:.0%}"
+
+    # Slopes and projections for every province and province x sector series
+    series = series_frame(emission_df)
+    values, years = series.to_numpy(), np.asarray(series.columns)
+    slope, intercept = bootstrap_trends(values, years)
+
+    bands = series.index.to_frame(index=False)
+    point = np.polyfit(years[-TREND_WINDOW:].astype(float), values[:, -TREND_WINDOW:].T, 1)
+    bands["Slope (tonnes/yr)"] = point[0]
+    bands[[f"Slope {pct} Low", "Slope Median", f"Slope {pct} High"]] = quantile_band(slope).T
+    for year in PROJECTION_YEARS:
+        projected = np.maximum(intercept + slope * year, 0.0)
+        bands[[f"{year} {pct} Low", f"{year} Median", f"{year} {pct} High"]] = quantile_band(projected).T
+    bands["Slope Sign Certain"] = (np.sign(bands[f"Slope {pct} Low"]) == np.sign(bands[f"Slope {pct} High"]))
+    bands_csv = os.path.join(OUT_DIR, "bootstrap_trend_bands.csv")
+    bands.to_csv(bands_csv, index=False)
+    print(f"Saved bootstrap slope / projection bands for {len(bands)} series → {bands_csv}")
+
+    # Attainment-year bands for every target with a resolvable level
+    meta, t_values, t_years = target_series(emission_df, targets)
+    t_slope, _ = bootstrap_trends(t_values, t_years)
+    cross = crossing_years(t_slope, meta["Target Level"], int(t_years[-1]), t_values[:, -1])
+    target_year = meta["Target Year"].to_numpy(dtype=float)[:, None]
+    attain = meta[["Province", "Sector", "Target Year", "Target Level"]].copy()
+    never = np.where(np.isnan(cross), PROJECTION_HORIZON + 1.0, cross)     # "never" sorts after the horizon
+    band = quantile_band(never)
+    attain[[f"Attainment {pct} Low", "Attainment Median", f"Attainment {pct} High"]] = \
+        np.where(band <= PROJECTION_HORIZON, band, np.nan).T
+    attain["Share Reached by 2100"] = (~np.isnan(cross)).mean(axis=1)
+    attain["Share On Time"] = (cross <= target_year).mean(axis=1)
+    attain_csv = os.path.join(OUT_DIR, "bootstrap_attainment_bands.csv")
+    attain.to_csv(attain_csv)
+    print(f"Saved bootstrap attainment-year bands → {attain_csv}")
+
+    # Plot: province totals with the band of bootstrap trend lines projected to 2050
+    grid = np.arange(years[-TREND_WINDOW], PROJECTION_YEARS[-1] + 1)
+    province_rows = np.flatnonzero(series.index.get_level_values("Sector") == "All")
+    fig, axes = plt.subplots(2, 5, figsize=(20, 8), squeeze=False)
+    for ax, r in zip(axes.ravel(), province_rows):
+        lines = np.maximum(intercept[r][:, None] + slope[r][:, None] * grid[None, :], 0.0)
+        lower, median, upper = quantile_band(lines.T)
+        ax.plot(years, values[r] / 1e6, marker="o", markersize=3, color="g", label="Actual")
+        ax.plot(grid, median / 1e6, color="b", linestyle="--", label="Median trend")
+        ax.fill_between(grid, lower / 1e6, upper / 1e6, color="b", alpha=0.2, label=f"{pct} band")
+        ax.set_title(series.index[r][0], fontsize=10)
+        ax.grid(True)
+    axes[0][0].legend(fontsize=8)
+    for ax in axes[:, 0]:
+        ax.set_ylabel("Emissions (Mt CO2e)")
+    fig.suptitle(f"Provincial Totals — {TREND_WINDOW}-Year Trend with {pct} Residual-Bootstrap Band (n={N_BOOT})")
+    plt.tight_layout()
+    bands_png = os.path.join(OUT_DIR, "province_trend_bands.png")
+    plt.savefig(bands_png, dpi=200)
+    plt.show()
+    print(f"Saved province trend band plot → {bands_png}")
@@ -0,0 +1,167 @@
+import os
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from naics_rollup import TARGET_SECTORS, with_parent_sectors
+from provinces import load_targets
+from sector_targets import build_sector_lookup, sector_cube
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/CapMonitoring")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+# Years used for the linear trend behind projected breach dates
+TREND_WINDOW = 10
+
+# Crossings projected beyond this year are reported as no projected breach
+PROJECTION_HORIZON = 2100
+
+
+@dataclass
+class CapRule:
+    """An annual "not to exceed" limit on one province (sector "All") or one of its sectors."""
+    target_id: int
+    province: str
+    sector: str
+    limit: float          # tonnes CO2e per year
+    start_year: float     # first year the limit applies (NaN = every year)
+    kind: str
+
+
+def compile_rules(targets):
+    """Turn cap and threshold rows of the targets table into CapRules."""
+    rules = []
+    limits = targets[targets["Kind"].isin(["cap", "threshold"])]
+    for target_id, row in limits.iterrows():
+        sector = row["Sector"] if row["Sector"] in TARGET_SECTORS else "All"
+        start = row["Window Start"]
+        rules.append(CapRule(int(target_id), row["Province"], sector,
+                             float(row["Reduction Upper Bound"]) * 1_000_000,
+                             np.nan if pd.isna(start) else float(start), row["Kind"]))
+    return rules
+
+
+def _rule_series(cube, rules):
+    """Rules x years matrix of the emissions each rule limits (`cube` from sector_cube)."""
+    provinces = list(cube.labels[0])
+    province_totals = cube.values.sum(axis=1)                 # each facility in one sector
+    sectors = with_parent_sectors(cube).values
+
+    series = np.zeros((len(rules), cube.values.shape[2]))
+    for r, rule in enumerate(rules):
+        if rule.province not in provinces:
+            continue
+        p = provinces.index(rule.province)
+        series[r] = province_totals[p] if rule.sector == "All" else sectors[p, TARGET_SECTORS.index(rule.sector)]
+    return series
+
+
+class CapMonitor:
+    """
+    Vectorized cap/threshold checks over a province x sector x year cube.
+
+    All rules are evaluated as one rules x years comparison. append_year()
+    builds only the new year's column from that year's rows and re-evaluates
+    every rule against the extended series (each rule's latest value and
+    trend window move with the new year, even where its province did not report).
+    """
+
+    def __init__(self, cube, rules, trend_window=TREND_WINDOW):
+        self.rules = list(rules)
+        self.trend_window = trend_window
+        self.years = np.asarray(cube.labels[2], dtype=np.int64)
+        self.limits = np.array([r.limit for r in self.rules])
+        self.starts = np.array([r.start_year for r in self.rules])
+        self.series = _rule_series(cube, self.rules)
+        self._results = {}
+        self._evaluate(np.arange(len(self.rules)))
+
+    def _evaluate(self, rows):
+        """Recompute breach flags, headroom and projected breach year for `rows` only."""
+        series, limits = self.series[rows], self.limits[rows, None]
+        applies = np.isnan(self.starts[rows, None]) | (self.years[None, :] >= self.starts[rows, None])
+        breach = (series > limits) & applies
+        headroom = limits[:, 0] - series[:, -1]
+
+        # Closed-form least squares slope/intercept over the trailing window, all rules at once
+        x = self.years[-self.trend_window:].astype(float)
+        y = series[:, -self.trend_window:]
+        x_c = x - x.mean()
+        slope = (y - y.mean(axis=1, keepdims=True)) @ x_c / (x_c @ x_c) if len(x) > 1 else np.zeros(len(rows))
+
+        # Trend projected from the actual latest value, so a rule under its limit never breaches in the past
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing = self.years[-1] + (limits[:, 0] - series[:, -1]) / slope
+        crossing = np.maximum(np.ceil(crossing), self.years[-1] + 1)
+        projected = np.where(series[:, -1] > limits[:, 0], float(self.years[-1]),
+                             np.where((slope > 0) & (crossing <= PROJECTION_HORIZON), crossing, np.nan))
+        start = np.nan_to_num(self.starts[rows], nan=-np.inf)
+        projected = np.where(np.isnan(projected), np.nan, np.maximum(projected, start))
+
+        for k, r in enumerate(rows):
+            self._results[r] = {
+                "Breach Years": self.years[breach[k]].tolist(),
+                "Latest Emissions": series[k, -1],
+                "Headroom (tonnes CO2e)": headroom[k],
+                "Headroom (%)": headroom[k] / limits[k, 0] * 100.0,
+                "Trend Slope (tonnes/yr)": slope[k],
+                "Projected Breach Year": projected[k],
+            }
+
+    def append_year(self, year, year_df, lookup=None):
+        """Add one new reporting year and re-check every rule; returns the rules whose province reported in it."""
+        if year in self.years:
+            raise ValueError(f"{year} is already monitored")
+        year_df = year_df[year_df["Reference Year"] == year]
+        new_cube = sector_cube(year_df, lookup=lookup)
+        self.series = np.column_stack([self.series, _rule_series(new_cube, self.rules)[:, 0]
+                                       if len(new_cube.labels[2]) else np.zeros(len(self.rules))])
+        self.years = np.append(self.years, year)
+
+        self._evaluate(np.arange(len(self.rules)))
+
+        reported = set(year_df["Facility Province"].unique())
+        return np.array([r for r, rule in enumerate(self.rules) if rule.province in reported], dtype=int)
+
+    def report(self):
+        """One row per rule with breach years, headroom and projected breach year."""
+        rows = []
+        for r, rule in enumerate(self.rules):
+            rows.append({"Target ID": rule.target_id, "Province": rule.province, "Sector": rule.sector,
+                         "Kind": rule.kind, "Limit (tonnes CO2e)": rule.limit,
+                         "Applies From": rule.start_year, "Latest Year": int(self.years[-1]),
+                         **self._results[r]})
+        return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+    rules = compile_rules(load_targets())
+
+    lookup = build_sector_lookup(emission_df)
+    monitor = CapMonitor(sector_cube(emission_df, lookup=lookup), rules)
+    report = monitor.report()
+
+    report_csv = os.path.join(OUT_DIR, "cap_threshold_report.csv")
+    report.to_csv(report_csv, index=False)
+    print(f"Saved cap/threshold report → {report_csv}")
+
+    for r, rule in enumerate(monitor.rules):
+        plt.figure(figsize=(10, 6))
+        plt.plot(monitor.years, monitor.series[r] / 1e6, marker="o", label="Actual Emissions")
+        plt.axhline(rule.limit / 1e6, color="red", linestyle="--", label=f"Limit ({rule.limit/1e6:g} Mt)")
+        plt.title(f"{rule.province} — {rule.sector} vs {rule.kind}")
+        plt.xlabel("Reference Year")
+        plt.ylabel("Emissions (Mt CO2e)")
+        plt.grid(True)
+        plt.legend()
+        plt.tight_layout()
+        rule_png = os.path.join(OUT_DIR, f"cap_rule_{rule.target_id}.png")
+        plt.savefig(rule_png, dpi=200)
+        plt.show()
+        print(f"Saved cap rule plot → {rule_png}")
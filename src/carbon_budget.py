@@ -0,0 +1,186 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from emissions_cube import build_cube, TOTAL_COL
+from provinces import PROVINCES, load_targets, province_target_paths
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/CarbonBudget")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+HORIZON_YEAR = 2050
+
+# Annual % change applied after the last actual year, one path per scenario
+SCENARIO_RATES = {
+    "Flat": 0.0,
+    "-2%/yr": -0.02,
+    "-5%/yr": -0.05,
+    "-16%/yr (Manitoba projection)": -0.16,
+}
+
+
+def province_year_totals(df):
+    """Province x year totals (tonnes) as a DataFrame."""
+    return build_cube(df, ["Facility Province", "Reference Year"], TOTAL_COL).frame("Facility Province", "Reference Year")
+
+
+def scenario_paths(totals, rates, horizon=HORIZON_YEAR):
+    """
+    Scenarios x provinces x years array: actual history, then each province's
+    last actual value compounded at each scenario's annual rate up to `horizon`.
+    `rates` is (scenarios,) or (scenarios, provinces).
+    """
+    hist_years = np.asarray(totals.columns, dtype=np.int64)
+    years = np.arange(hist_years[0], horizon + 1)
+    rates = np.asarray(rates, dtype=float)
+    rates = rates[:, None] if rates.ndim == 1 else rates                       # S x P
+
+    steps = np.clip(years - hist_years[-1], 0, None)                           # Y
+    last = totals[hist_years[-1]].to_numpy(dtype=float)                        # P
+    paths = last[None, :, None] * (1.0 + rates[:, :, None]) ** steps[None, None, :]
+
+    hist = totals.reindex(columns=years[years <= hist_years[-1]]).fillna(0.0).to_numpy()
+    paths[:, :, :hist.shape[1]] = hist[None, :, :]
+    return paths, years
+
+
+class CarbonBudget:
+    """
+    Prefix sums over emission paths (any leading shape, years last).
+
+    After one cumulative pass, the total over any window, cumulative
+    reductions against a baseline, remaining budget and budget depletion
+    year are O(1) array lookups for every path at once.
+    """
+
+    def __init__(self, paths, years):
+        self.paths = np.asarray(paths, dtype=float)
+        self.years = np.asarray(years, dtype=np.int64)
+        zero = np.zeros(self.paths.shape[:-1] + (1,))
+        self.cum = np.concatenate([zero, np.cumsum(self.paths, axis=-1)], axis=-1)
+
+    def _pos(self, year):
+        """Column of `year`; a ValueError for years outside the paths (no silent negative-index wrap)."""
+        if not self.years[0] <= year <= self.years[-1]:
+            raise ValueError(f"Year {year} is outside the budget paths ({self.years[0]}–{self.years[-1]})")
+        return int(year - self.years[0])
+
+    def window_sum(self, start, end):
+        """Emissions summed over start..end inclusive."""
+        return self.cum[..., self._pos(end) + 1] - self.cum[..., self._pos(start)]
+
+    def value(self, year):
+        return self.paths[..., self._pos(year)]
+
+    def window_reduction(self, start, end, baseline):
+        """Cumulative reduction over the window against a constant baseline level."""
+        return np.asarray(baseline) * (end - start + 1) - self.window_sum(start, end)
+
+    def remaining(self, budget, start, year):
+        """Budget left after spending from `start` through `year`."""
+        return np.asarray(budget) - self.window_sum(start, year)
+
+    def depletion_year(self, budget, start):
+        """First year the emissions spent since `start` exceed `budget` (NaN if never)."""
+        spent = self.cum[..., self._pos(start) + 1:] - self.cum[..., self._pos(start), None]
+        budget = np.asarray(budget)[..., None]
+        over = (spent > budget) & ~np.isclose(spent, budget)
+        first = np.argmax(over, axis=-1)
+        return np.where(over.any(axis=-1), self.years[self._pos(start):][first], np.nan)
+
+
+def cumulative_target_checks(targets, totals, rates=SCENARIO_RATES):
+    """
+    Evaluate cumulative targets (e.g. Manitoba's 5.6 Mt over 2023–2027) under
+    every scenario. The reference level is the year before the window held flat.
+    """
+    paths, years = scenario_paths(totals, list(rates.values()))
+    budget = CarbonBudget(paths, years)
+    provinces = list(totals.index)
+
+    rows = []
+    for target_id, t in targets[targets["Kind"] == "cumulative"].iterrows():
+        if t["Province"] not in provinces or pd.isna(t["Window Start"]):
+            continue
+        p = provinces.index(t["Province"])
+        start, end = int(t["Window Start"]), int(t["Window End"])
+        reference = budget.value(start - 1)[:, p]
+        achieved = budget.window_reduction(start, end, budget.value(start - 1))[:, p]
+        required = float(t["Reduction Upper Bound"]) * 1_000_000
+        for s, scenario in enumerate(rates):
+            rows.append({
+                "Target ID": target_id, "Province": t["Province"], "Scenario": scenario,
+                "Window": f"{start}–{end}", "Reference Level (tonnes CO2e)": reference[s],
+                "Cumulative Emissions (tonnes CO2e)": budget.window_sum(start, end)[s, p],
+                "Cumulative Reduction (tonnes CO2e)": achieved[s],
+                "Required Reduction (tonnes CO2e)": required,
+                "Met": achieved[s] >= required,
+            })
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+    targets = load_targets()
+
+    totals = province_year_totals(emission_df).reindex(PROVINCES).fillna(0.0)
+    last_year = int(totals.columns.max())
+    paths, years = scenario_paths(totals, list(SCENARIO_RATES.values()))
+    budget = CarbonBudget(paths, years)
+
+    # Budget = cumulative emissions allowed by each province's target path to 2050
+    target_paths = province_target_paths(totals, targets, years)
+    allowed = CarbonBudget(target_paths.fillna(0.0).to_numpy(), years)
+    has_path = target_paths.notna().any(axis=1).to_numpy()
+    province_budget = np.where(has_path, allowed.window_sum(last_year + 1, HORIZON_YEAR), np.nan)   # P
+
+    rows = []
+    for s, scenario in enumerate(SCENARIO_RATES):
+        depletion = budget.depletion_year(province_budget, last_year + 1)[s]
+        for p, province in enumerate(totals.index):
+            rows.append({
+                "Province": province, "Scenario": scenario,
+                f"Budget {last_year + 1}–{HORIZON_YEAR} (tonnes CO2e)": province_budget[p],
+                f"Projected Emissions {last_year + 1}–2030": budget.window_sum(last_year + 1, 2030)[s, p],
+                "Remaining Budget after 2030": budget.remaining(province_budget, last_year + 1, 2030)[s, p],
+                f"Remaining Budget after {HORIZON_YEAR}": budget.remaining(province_budget, last_year + 1, HORIZON_YEAR)[s, p],
+                "Budget Depletion Year": depletion[p],
+            })
+    status = pd.DataFrame(rows)
+    status_csv = os.path.join(OUT_DIR, "province_budget_status.csv")
+    status.to_csv(status_csv, index=False)
+    print(f"Saved province carbon budget status → {status_csv}")
+
+    cumulative = pd.DataFrame(budget.cum[0, :, 1:], index=totals.index, columns=pd.Index(years, name="Year"))
+    cumulative_csv = os.path.join(OUT_DIR, "province_cumulative_emissions_flat_scenario.csv")
+    cumulative.to_csv(cumulative_csv)
+    print(f"Saved cumulative emissions (flat scenario) → {cumulative_csv}")
+
+    checks = cumulative_target_checks(targets, totals)
+    checks_csv = os.path.join(OUT_DIR, "cumulative_target_checks.csv")
+    checks.to_csv(checks_csv, index=False)
+    print(f"Saved cumulative target checks → {checks_csv}")
+
+    # Plot: cumulative emissions since last actual year vs budget, flat scenario
+    plt.figure(figsize=(12, 6))
+    since = budget.cum[0, :, budget._pos(last_year) + 1:] - budget.cum[0, :, [budget._pos(last_year) + 1]].T
+    for p, province in enumerate(totals.index):
+        if np.isnan(province_budget[p]):
+            continue
+        line, = plt.plot(years[budget._pos(last_year):], since[p] / 1e6, label=province)
+        plt.axhline(province_budget[p] / 1e6, color=line.get_color(), linestyle=":", alpha=0.7)
+    plt.title(f"Cumulative Emissions from {last_year + 1} (flat scenario) vs Target-Path Budgets (dotted)")
+    plt.xlabel("Year")
+    plt.ylabel("Cumulative Emissions (Mt CO2e)")
+    plt.grid(True)
+    plt.legend(fontsize=8)
+    plt.tight_layout()
+    budget_png = os.path.join(OUT_DIR, "province_cumulative_vs_budget.png")
+    plt.savefig(budget_png, dpi=200)
+    plt.show()
+    print(f"Saved cumulative vs budget plot → {budget_png}")
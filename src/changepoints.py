@@ -0,0 +1,176 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from carbon_budget import province_year_totals
+from naics_rollup import with_parent_sectors
+from provinces import PROVINCES
+from sector_targets import sector_cube
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/ChangePoints")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+MIN_SEGMENT = 4           # years; every regime needs enough points for its own trend
+PENALTY = 3.0             # multiplier on sigma^2 * log(n) per extra regime (BIC-style)
+NOISE_FLOOR = 0.02        # noise sigma never below 2% of the series' mean level
+PROJECTION_YEAR = 2030
+
+
+def _prefix_sums(values):
+    """Per-series prefix sums of 1, t, t^2, x, x^2 and t*x (each N x (Y + 1))."""
+    n_series, n_years = values.shape
+    t = np.arange(n_years, dtype=float) - (n_years - 1) / 2.0
+    terms = [np.ones_like(values), np.broadcast_to(t, values.shape), np.broadcast_to(t * t, values.shape),
+             values, values * values, values * t]
+    zero = np.zeros((n_series, 1))
+    return [np.concatenate([zero, np.cumsum(term, axis=1)], axis=1) for term in terms]
+
+
+def segment_costs(values, min_segment=MIN_SEGMENT):
+    """
+    N x (Y + 1) x (Y + 1) residual sum of squares of a straight-line fit to
+    every segment [i, j) of every series, from prefix-sum differences only.
+    Segments shorter than `min_segment` cost inf.
+    """
+    sums = [p[:, None, :] - p[:, :, None] for p in _prefix_sums(values)]   # [:, i, j] = P[j] - P[i]
+    n, st, stt, sx, sxx, stx = sums
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var_t = stt - st * st / n
+        cov = stx - st * sx / n
+        cost = sxx - sx * sx / n - np.where(var_t > 0, cov * cov / var_t, 0.0)
+    return np.where(n >= min_segment, np.maximum(cost, 0.0), np.inf)
+
+
+def noise_sigma(values):
+    """Robust per-series noise level from second differences (MAD), with a floor."""
+    d2 = np.diff(values, n=2, axis=1)
+    mad = np.median(np.abs(d2 - np.median(d2, axis=1, keepdims=True)), axis=1)
+    return np.maximum(1.4826 * mad / np.sqrt(6.0), NOISE_FLOOR)
+
+
+def detect_change_points(values, min_segment=MIN_SEGMENT, penalty=PENALTY):
+    """
+    Regime starts for many series at once (N x Y boolean, True where a new
+    regime begins after the first year).
+
+    Exact penalized optimal partitioning (the objective PELT minimises) with
+    a piecewise-linear cost: F[j] = min_i F[i] + cost(i, j) + beta. Costs
+    for all series and segments come from one prefix-sum tensor and the
+    recursion steps over years only, vectorized over series and split
+    points, so pruning is unnecessary at this series length. Series are
+    scaled to their mean level first so one penalty fits all of them.
+    """
+    values = np.asarray(values, dtype=float)
+    n_series, n_years = values.shape
+    level = np.abs(values).mean(axis=1, keepdims=True)
+    scaled = values / np.where(level > 0, level, 1.0)
+
+    cost = segment_costs(scaled, min_segment)
+    beta = penalty * noise_sigma(scaled) ** 2 * np.log(n_years)
+
+    best = np.full((n_series, n_years + 1), np.inf)
+    best[:, 0] = -beta
+    last = np.zeros((n_series, n_years + 1), dtype=int)
+    for j in range(1, n_years + 1):
+        candidates = best[:, :j] + cost[:, :j, j] + beta[:, None]
+        last[:, j] = np.argmin(candidates, axis=1)
+        best[:, j] = candidates[np.arange(n_series), last[:, j]]
+
+    # Backtrack every series together; each step moves to the previous regime start
+    starts = np.zeros((n_series, n_years), dtype=bool)
+    pos = np.full(n_series, n_years)
+    rows = np.arange(n_series)
+    while (pos > 0).any():
+        prev = np.where(pos > 0, last[rows, pos], 0)
+        starts[rows[prev > 0], prev[prev > 0]] = True
+        pos = prev
+    return starts
+
+
+def last_regime_start(starts):
+    """Index of the first year of each series' final regime (0 if no break)."""
+    n_years = starts.shape[1]
+    flipped = np.argmax(starts[:, ::-1], axis=1)
+    return np.where(starts.any(axis=1), n_years - 1 - flipped, 0)
+
+
+def masked_trend(values, years, first_idx):
+    """Least squares slope/intercept per series using only years from `first_idx` on."""
+    x = np.asarray(years, dtype=float)[None, :]
+    w = (np.arange(values.shape[1])[None, :] >= np.asarray(first_idx)[:, None]).astype(float)
+    n = w.sum(axis=1)
+    x_mean = (w * x).sum(axis=1) / n
+    y_mean = (w * values).sum(axis=1) / n
+    dx = (x - x_mean[:, None]) * w
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (dx * (values - y_mean[:, None])).sum(axis=1) / (dx * dx).sum(axis=1)
+    slope = np.where(n >= 2, slope, 0.0)
+    return slope, y_mean - slope * x_mean
+
+
+def series_frame(df):
+    """Province totals and province x target-sector series as one labelled N x Y matrix."""
+    totals = province_year_totals(df).reindex(PROVINCES).fillna(0.0)
+    years = np.asarray(totals.columns, dtype=np.int64)
+    labels = [(p, "All") for p in totals.index]
+    rows = [totals.to_numpy()]
+
+    cube = with_parent_sectors(sector_cube(df))                   # series compared with sector targets
+    provinces, sectors, cube_years = cube.labels
+    sector_values = cube.values[:, :, np.searchsorted(cube_years, years)].reshape(-1, len(years))
+    sector_labels = [(p, s) for p in provinces for s in sectors]
+    keep = (sector_values > 0).sum(axis=1) >= 2 * MIN_SEGMENT
+    rows.append(sector_values[keep])
+    labels += [lab for lab, k in zip(sector_labels, keep) if k]
+
+    index = pd.MultiIndex.from_tuples(labels, names=["Province", "Sector"])
+    return pd.DataFrame(np.vstack(rows), index=index, columns=pd.Index(years, name="Reference Year"))
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+
+    series = series_frame(emission_df)
+    values, years = series.to_numpy(), np.asarray(series.columns)
+    starts = detect_change_points(values)
+    first = last_regime_start(starts)
+
+    full_slope, full_icpt = masked_trend(values, years, np.zeros(len(values), dtype=int))
+    post_slope, post_icpt = masked_trend(values, years, first)
+
+    summary = series.index.to_frame(index=False)
+    summary["Break Years"] = [", ".join(map(str, years[row])) for row in starts]
+    summary["Regimes"] = starts.sum(axis=1) + 1
+    summary["Post-Break Regime From"] = years[first]
+    summary["Full-Period Slope (tonnes/yr)"] = full_slope
+    summary["Post-Break Slope (tonnes/yr)"] = post_slope
+    summary[f"{PROJECTION_YEAR} Projection (full period)"] = full_slope * PROJECTION_YEAR + full_icpt
+    summary[f"{PROJECTION_YEAR} Projection (post-break)"] = post_slope * PROJECTION_YEAR + post_icpt
+    summary_csv = os.path.join(OUT_DIR, "change_points_and_post_break_trends.csv")
+    summary.to_csv(summary_csv, index=False)
+    print(f"Saved change points for {len(summary)} series → {summary_csv}")
+
+    # Plot: each province total with its regimes and the post-break trend
+    province_rows = np.flatnonzero(series.index.get_level_values("Sector") == "All")
+    fig, axes = plt.subplots(2, 5, figsize=(20, 8), squeeze=False)
+    for ax, r in zip(axes.ravel(), province_rows):
+        ax.plot(years, values[r] / 1e6, marker="o", markersize=3, color="g")
+        for year in years[starts[r]]:
+            ax.axvline(year - 0.5, color="red", linestyle="--", alpha=0.7)
+        post = years >= years[first[r]]
+        ax.plot(years[post], (post_slope[r] * years[post] + post_icpt[r]) / 1e6, color="b", linestyle="--")
+        ax.set_title(series.index[r][0], fontsize=10)
+        ax.grid(True)
+    for ax in axes[:, 0]:
+        ax.set_ylabel("Emissions (Mt CO2e)")
+    fig.suptitle("Provincial Totals — Detected Regime Shifts (red) and Post-Break Trend (blue)")
+    plt.tight_layout()
+    breaks_png = os.path.join(OUT_DIR, "province_change_points.png")
+    plt.savefig(breaks_png, dpi=200)
+    plt.show()
+    print(f"Saved province change-point plot → {breaks_png}")
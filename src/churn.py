@@ -0,0 +1,133 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from emissions_cube import TOTAL_COL
+from facility_index import build_facility_index
+from provinces import PROVINCE_OUTPUTS, province_out_dir
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/Churn")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+
+def facility_year_sets(index):
+    """Sorted Facility ID array of every reporting year, from the (facility, year)-sorted index."""
+    row_ids = np.repeat(index.facility_ids, index.counts)
+    order = np.argsort(index.years, kind="stable")                          # IDs stay sorted within a year
+    years, row_ids = index.years[order], row_ids[order]
+    uniq, starts = np.unique(years, return_index=True)
+    return dict(zip(uniq.tolist(), np.split(row_ids, starts[1:])))
+
+
+def facility_churn(df):
+    """
+    Entrants, exits and continuing facilities for every province and year.
+
+    Set differences and intersections of consecutive years' sorted ID
+    arrays run once nationally; each resulting ID array is then counted
+    and summed per province with bincount on the facilities' province
+    codes. The continuing-facility total starts at the actual first-year
+    total and is chain-linked by the like-for-like change of facilities
+    reporting in both years, so entries and exits (e.g. the 2017
+    reporting-threshold change) do not move it.
+    """
+    index = build_facility_index(df, [TOTAL_COL])
+    matrix, years = index.dense(TOTAL_COL, fill_value=0.0)
+    sets = facility_year_sets(index)
+    provinces, codes = np.unique(index.info["Facility Province"].astype(str).to_numpy(), return_inverse=True)
+    n_prov = len(provinces)
+
+    def per_province(ids, col=None):
+        pos = np.searchsorted(index.facility_ids, ids)
+        weights = None if col is None else matrix[pos, col]
+        return np.bincount(codes[pos], weights=weights, minlength=n_prov)
+
+    rows = []
+    chain = None
+    for t, year in enumerate(years):
+        current = sets.get(int(year), np.array([], dtype=np.int64))
+        total = per_province(current, t)
+        if t == 0:
+            entrants, exits, continuing = current, np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+            chain = total.copy()
+        else:
+            previous = sets.get(int(years[t - 1]), np.array([], dtype=np.int64))
+            entrants = np.setdiff1d(current, previous, assume_unique=True)
+            exits = np.setdiff1d(previous, current, assume_unique=True)
+            continuing = np.intersect1d(current, previous, assume_unique=True)
+            cont_now, cont_before = per_province(continuing, t), per_province(continuing, t - 1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                growth = np.where(cont_before > 0, cont_now / cont_before, 1.0)
+            chain = np.where(chain > 0, chain * growth, total)               # restart a province with no history
+        rows.append(pd.DataFrame({
+            "Facility Province": provinces,
+            "Reference Year": int(year),
+            "Reporting Facilities": per_province(current),
+            "Entrants": per_province(entrants),
+            "Exits": per_province(exits),
+            "Continuing Facilities": per_province(continuing),
+            "Entrant Emissions (tonnes CO2e)": per_province(entrants, t),
+            "Exit Emissions (tonnes CO2e)": per_province(exits, t - 1) if t else 0.0,
+            "Total Emissions (tonnes CO2e)": total,
+            "Continuing-Facility Total (tonnes CO2e)": chain,
+        }))
+    table = pd.concat(rows, ignore_index=True)
+    count_cols = ["Reporting Facilities", "Entrants", "Exits", "Continuing Facilities"]
+    table[count_cols] = table[count_cols].astype(int)
+    return table.sort_values(["Facility Province", "Reference Year"]).reset_index(drop=True)
+
+
+def continuing_totals(df):
+    """Province x year matrix of continuing-facility totals (threshold-change-neutral trend series)."""
+    return facility_churn(df).pivot(index="Facility Province", columns="Reference Year",
+                                    values="Continuing-Facility Total (tonnes CO2e)")
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+
+    churn = facility_churn(emission_df)
+    churn_csv = os.path.join(OUT_DIR, "facility_churn_by_province_year.csv")
+    churn.to_csv(churn_csv, index=False)
+    print(f"Saved facility churn for {churn['Facility Province'].nunique()} provinces/territories → {churn_csv}")
+
+    for province, (_, prefix) in PROVINCE_OUTPUTS.items():
+        rows = churn[churn["Facility Province"] == province]
+        if rows.empty:
+            print(f"⚠️ No facilities for {province}; skipping churn table.")
+            continue
+        rows_csv = os.path.join(province_out_dir(province), f"{prefix}_facility_churn.csv")
+        rows.to_csv(rows_csv, index=False)
+        print(f"Saved {province} facility churn → {rows_csv}")
+
+    # Plot: national entrants / exits and the reported vs continuing-facility totals
+    national = churn.groupby("Reference Year").sum(numeric_only=True)
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
+    ax1.bar(national.index, national["Entrants"], color="tab:green", label="Entrants")
+    ax1.bar(national.index, -national["Exits"], color="tab:red", label="Exits")
+    ax1.axhline(0, color="grey", linewidth=0.8)
+    ax1.set_title("Facilities Entering / Leaving the GHGRP")
+    ax1.set_xlabel("Reference Year")
+    ax1.set_ylabel("Facilities")
+    ax1.legend()
+    ax1.grid(True, axis="y")
+
+    ax2.plot(national.index, national["Total Emissions (tonnes CO2e)"] / 1e6, marker="o", label="Reported total")
+    ax2.plot(national.index, national["Continuing-Facility Total (tonnes CO2e)"] / 1e6, marker="o",
+             linestyle="--", label="Continuing facilities only")
+    ax2.set_title("Reported vs Continuing-Facility Totals")
+    ax2.set_xlabel("Reference Year")
+    ax2.set_ylabel("Emissions (Mt CO2e)")
+    ax2.legend()
+    ax2.grid(True)
+    fig.suptitle("Canada (all facilities) — Facility Churn")
+    plt.tight_layout()
+    churn_png = os.path.join(OUT_DIR, "national_facility_churn.png")
+    plt.savefig(churn_png, dpi=200)
+    plt.show()
+    print(f"Saved national churn plot → {churn_png}")
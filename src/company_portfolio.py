@@ -0,0 +1,146 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from emissions_cube import build_cube, TOTAL_COL
+from facility_resolution import attach_facility_ids
+from provinces import PROVINCES, load_targets, target_levels
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/Companies")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+COMPANY_DIMS = ["Reporting Company", "Reference Year", "Facility Province"]
+
+
+def company_facility_index(df):
+    """Company -> sorted array of every Facility ID it has reported for."""
+    df = attach_facility_ids(df)
+    company_codes, companies = pd.factorize(df["Reporting Company"], sort=True)
+    ids = df["Facility ID"].to_numpy(dtype=np.int64)
+
+    pairs = np.unique(np.column_stack([company_codes, ids]), axis=0)
+    offsets = np.searchsorted(pairs[:, 0], np.arange(len(companies) + 1))
+    return {company: pairs[offsets[k]:offsets[k + 1], 1] for k, company in enumerate(companies)}
+
+
+def company_cube(df):
+    """Company x year x province totals from one grouped reduction."""
+    return build_cube(df, COMPANY_DIMS, TOTAL_COL)
+
+
+def company_shares(cube):
+    """Long table of company-year-province emissions with provincial and national shares (%)."""
+    values = cube.values
+    province_totals = values.sum(axis=0, keepdims=True)            # 1 x year x province
+    national_totals = values.sum(axis=(0, 2), keepdims=True)       # 1 x year x 1
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share_province = np.where(province_totals > 0, values / province_totals * 100.0, np.nan)
+        share_national = np.where(national_totals > 0, values / national_totals * 100.0, np.nan)
+
+    nz = np.nonzero(values)
+    return pd.DataFrame({
+        "Reporting Company": cube.labels[0][nz[0]],
+        "Reference Year": cube.labels[1][nz[1]],
+        "Facility Province": cube.labels[2][nz[2]],
+        TOTAL_COL: values[nz],
+        "Share of Province (%)": share_province[nz],
+        "Share of Canada (%)": share_national[nz],
+    })
+
+
+def province_reference_levels(cube, targets):
+    """
+    One allowed-emissions level per province: its nearest upcoming
+    province-wide target (overall reduction or annual threshold), else its latest.
+    """
+    province_year = cube.frame("Facility Province", "Reference Year")
+    levels = target_levels(targets, province_year)
+    levels = levels[(levels["Sector"] == "All") & levels["Target Level (upper)"].notna()]
+
+    # Upcoming targets nearest-first, then past targets latest-first
+    last_year = int(cube.labels[1].max())
+    target_year = levels["Target Year"].astype(float).to_numpy()
+    levels = levels.assign(_order=np.where(target_year >= last_year, target_year - last_year,
+                                           10_000 + last_year - target_year))
+    levels = levels.sort_values(["Province", "_order"])
+    return levels.groupby("Province").head(1).set_index("Province")[["Target Year", "Target Level (upper)"]]
+
+
+def rank_company_emitters(cube, targets, year, top_n=10):
+    """Top `top_n` companies per province in `year`, measured against the province's target level."""
+    y = cube.index_of("Reference Year", year)
+    by_company = cube.values[:, y, :]                               # company x province
+    province_totals = by_company.sum(axis=0)
+    reference = province_reference_levels(cube, targets)
+
+    # One descending argsort per province column, all at once
+    order = np.argsort(-by_company, axis=0)[:top_n]
+    frames = []
+    for p, province in enumerate(cube.labels[2]):
+        if province not in PROVINCES:
+            continue
+        rows = order[:, p]
+        rows = rows[by_company[rows, p] > 0]
+        emissions = by_company[rows, p]
+        target_year, level = (reference.loc[province] if province in reference.index else (pd.NA, np.nan))
+        frames.append(pd.DataFrame({
+            "Facility Province": province,
+            "Rank": np.arange(1, len(rows) + 1),
+            "Reporting Company": cube.labels[0][rows],
+            TOTAL_COL: emissions,
+            "Share of Province (%)": emissions / province_totals[p] * 100.0,
+            "Target Year": target_year,
+            "Province Target Level (tonnes CO2e)": level,
+            "Share of Target Level (%)": emissions / level * 100.0,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+    targets = load_targets()
+
+    # Company -> facilities
+    facilities = company_facility_index(emission_df)
+    company_facilities = pd.DataFrame({
+        "Reporting Company": list(facilities),
+        "Facilities": [len(v) for v in facilities.values()],
+        "Facility IDs": [" ".join(map(str, v)) for v in facilities.values()],
+    })
+    company_facilities_csv = os.path.join(OUT_DIR, "company_facilities.csv")
+    company_facilities.to_csv(company_facilities_csv, index=False)
+    print(f"Saved company → facilities index → {company_facilities_csv}")
+
+    # Company x year x province with shares
+    cube = company_cube(emission_df)
+    shares = company_shares(cube)
+    shares_csv = os.path.join(OUT_DIR, "company_year_province_totals.csv")
+    shares.to_csv(shares_csv, index=False)
+    print(f"Saved company × year × province totals → {shares_csv}")
+
+    # Top corporate emitters per province vs targets (latest year)
+    last_year = int(cube.labels[1].max())
+    ranking = rank_company_emitters(cube, targets, last_year)
+    ranking_csv = os.path.join(OUT_DIR, f"company_top10_by_province_{last_year}.csv")
+    ranking.to_csv(ranking_csv, index=False)
+    print(f"Saved top corporate emitters by province ({last_year}) → {ranking_csv}")
+
+    # Plot: national top 15 companies in the latest year
+    national = cube.frame("Reporting Company", "Reference Year")[last_year].sort_values(ascending=False).head(15)
+    plt.figure(figsize=(12, 6))
+    plt.barh(national.index, national.values / 1e6, color="slateblue")
+    plt.xlabel("Total Emissions (Million tonnes CO2e)")
+    plt.title(f"Top 15 Reporting Companies by Emissions in Canada ({last_year})")
+    plt.gca().invert_yaxis()
+    plt.grid(axis="x")
+    plt.tight_layout()
+    national_png = os.path.join(OUT_DIR, f"company_top15_canada_{last_year}.png")
+    plt.savefig(national_png, dpi=200)
+    plt.show()
+    print(f"Saved national top companies plot → {national_png}")
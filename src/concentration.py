@@ -0,0 +1,103 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from emissions_cube import TOTAL_COL
+from provinces import PROVINCE_OUTPUTS, PROVINCES, province_out_dir
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/Concentration")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+TOP_N = [1, 5, 10]
+
+
+def concentration_metrics(df, dims, value_col=TOTAL_COL):
+    """
+    Concentration of facility emissions within every group of `dims`.
+
+    All rows are sorted once by (group, emissions descending); a global
+    cumulative sum minus its value at each segment start gives every
+    group's running total, so top-N shares are single gathers and the
+    Herfindahl index and Gini coefficient are segmented sums:
+      HHI  = 10,000 * sum(s_i^2) with s_i the facility share;
+      Gini = (n + 1) / n - 2 * sum(r_i * x_i) / (n * T), r_i the descending rank.
+    """
+    keys = df[dims].reset_index(drop=True)
+    codes = keys.groupby(dims, sort=True).ngroup().to_numpy()
+    values = np.clip(pd.to_numeric(df[value_col], errors="coerce").fillna(0.0).to_numpy(dtype=float), 0.0, None)
+
+    order = np.lexsort((-values, codes))
+    codes, values = codes[order], values[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    counts = np.diff(np.r_[starts, len(codes)])
+    segment = np.repeat(np.arange(len(starts)), counts)
+    rank = np.arange(len(values)) - starts[segment] + 1                      # 1 = largest emitter
+
+    cum = np.cumsum(values)
+    before = np.r_[0.0, cum][starts]                                         # running total before each segment
+    total = cum[starts + counts - 1] - before
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = values / total[segment]
+        hhi = 10_000 * np.add.reduceat(share * share, starts)
+        gini = (counts + 1) / counts - 2 * np.add.reduceat(rank * values, starts) / (counts * total)
+        tops = {n: (cum[starts + np.minimum(n, counts) - 1] - before) / total for n in TOP_N}
+
+    table = keys.iloc[order[starts]].reset_index(drop=True)
+    table["Facilities"] = counts
+    table["Total (tonnes CO2e)"] = total
+    table["HHI"] = np.where(total > 0, hhi, np.nan)
+    table["Gini"] = np.where(total > 0, gini, np.nan)
+    for n, top in tops.items():
+        table[f"Top-{n} Share"] = np.where(total > 0, top, np.nan)
+    return table
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+
+    levels = {
+        "province_year": ["Facility Province", "Reference Year"],
+        "province_sector_year": ["Facility Province", "Facility Description", "Reference Year"],
+    }
+    tables = {}
+    for name, dims in levels.items():
+        tables[name] = concentration_metrics(emission_df, dims)
+        table_csv = os.path.join(OUT_DIR, f"{name}_concentration.csv")
+        tables[name].to_csv(table_csv, index=False)
+        print(f"Saved {len(tables[name])} {name.replace('_', ' × ')} concentration rows → {table_csv}")
+
+    for province, (_, prefix) in PROVINCE_OUTPUTS.items():
+        rows = tables["province_year"][tables["province_year"]["Facility Province"] == province]
+        if rows.empty:
+            print(f"⚠️ No facilities for {province}; skipping concentration table.")
+            continue
+        rows_csv = os.path.join(province_out_dir(province), f"{prefix}_concentration_by_year.csv")
+        rows.to_csv(rows_csv, index=False)
+        print(f"Saved {province} concentration by year → {rows_csv}")
+
+    # Plot: top-10 share and Gini over time for each province
+    by_year = tables["province_year"]
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(18, 7), sharex=True)
+    for province in PROVINCES:
+        rows = by_year[by_year["Facility Province"] == province]
+        ax1.plot(rows["Reference Year"], rows["Top-10 Share"] * 100, marker="o", markersize=3, label=province)
+        ax2.plot(rows["Reference Year"], rows["Gini"], marker="o", markersize=3, label=province)
+    ax1.set_title("Share of Provincial Emissions from the Top 10 Facilities")
+    ax1.set_ylabel("Top-10 share (%)")
+    ax2.set_title("Gini Coefficient of Facility Emissions")
+    ax2.set_ylabel("Gini")
+    for ax in (ax1, ax2):
+        ax.set_xlabel("Reference Year")
+        ax.grid(True)
+    ax2.legend(fontsize=8, bbox_to_anchor=(1.02, 1), loc="upper left")
+    plt.tight_layout()
+    concentration_png = os.path.join(OUT_DIR, "province_concentration_trends.png")
+    plt.savefig(concentration_png, dpi=200)
+    plt.show()
+    print(f"Saved province concentration plot → {concentration_png}")
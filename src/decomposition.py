@@ -0,0 +1,152 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from emissions_cube import TOTAL_COL
+from facility_index import build_facility_index
+from provinces import PROVINCE_OUTPUTS, province_out_dir
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/Decomposition")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+EFFECTS = ["Entry Effect", "Exit Effect", "Growth Effect", "Mix Effect"]
+
+
+def log_mean(a, b):
+    """Logarithmic mean L(a, b) = (a - b) / (ln a - ln b), with L(a, a) = a; 0 unless both are positive."""
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    both = (a > 0) & (b > 0)
+    safe_a, safe_b = np.where(both, a, 1.0), np.where(both, b, 1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lm = (safe_a - safe_b) / (np.log(safe_a) - np.log(safe_b))
+    return np.where(both, np.where(np.isclose(safe_a, safe_b), safe_a, lm), 0.0)
+
+
+def _group_sum(codes, n_groups, matrix):
+    """Sum facility rows of a facility x transition matrix into group rows."""
+    out = np.zeros((n_groups, matrix.shape[1]))
+    np.add.at(out, codes, matrix)
+    return out
+
+
+def lmdi_decomposition(matrix, codes, n_groups):
+    """
+    Additive LMDI-I split of every group's year-over-year change.
+
+    `matrix` is facility x year emissions (0 = not reported) and `codes`
+    assigns each facility to a group. For each consecutive pair of years:
+      - entry: emissions of facilities reporting now but not the year before;
+      - exit: minus last year's emissions of facilities that stopped;
+      - growth: sum_i L(e_i1, e_i0) * ln(C1 / C0), the change if every
+        continuing facility had moved with the group's continuing total C;
+      - mix: sum_i L(e_i1, e_i0) * ln(s_i1 / s_i0), the shift of shares s
+        between continuing facilities.
+    The four effects add up to the change exactly. With no activity data
+    behind the shares, mix only captures reallocation between continuing
+    facilities and is usually small next to growth. Returns a dict of
+    groups x transitions arrays.
+    """
+    prev, curr = matrix[:, :-1], matrix[:, 1:]
+    continuing = (prev > 0) & (curr > 0)
+    entry = _group_sum(codes, n_groups, np.where((prev <= 0) & (curr > 0), curr, 0.0))
+    exit_ = -_group_sum(codes, n_groups, np.where((prev > 0) & (curr <= 0), prev, 0.0))
+
+    c_prev = _group_sum(codes, n_groups, np.where(continuing, prev, 0.0))
+    c_curr = _group_sum(codes, n_groups, np.where(continuing, curr, 0.0))
+    weight = log_mean(curr, prev)                                            # 0 unless continuing
+    with np.errstate(divide="ignore", invalid="ignore"):
+        group_ratio = np.where((c_prev > 0) & (c_curr > 0), np.log(c_curr / c_prev), 0.0)
+        facility_ratio = np.where(continuing, np.log(curr / np.where(continuing, prev, 1.0)), 0.0)
+    growth = _group_sum(codes, n_groups, weight) * group_ratio
+    mix = _group_sum(codes, n_groups, weight * (facility_ratio - group_ratio[codes]))
+
+    totals = _group_sum(codes, n_groups, matrix)
+    return {"previous": totals[:, :-1], "total": totals[:, 1:], "change": np.diff(totals, axis=1),
+            "Entry Effect": entry, "Exit Effect": exit_, "Growth Effect": growth, "Mix Effect": mix}
+
+
+def decomposition_table(result, labels, years):
+    """Long table: one row per group x year with the change and its four effects."""
+    n_groups, n_steps = result["change"].shape
+    g = np.repeat(np.arange(n_groups), n_steps)
+    t = np.tile(np.arange(n_steps), n_groups)
+    table = labels.iloc[g].reset_index(drop=True)
+    table["Reference Year"] = years[1:][t]
+    table["Previous Total (tonnes CO2e)"] = result["previous"].ravel()
+    table["Total (tonnes CO2e)"] = result["total"].ravel()
+    table["Change (tonnes CO2e)"] = result["change"].ravel()
+    for effect in EFFECTS:
+        table[effect] = result[effect].ravel()
+    return table
+
+
+def decompose(df):
+    """(province table, province x Facility Description table) of LMDI year-over-year effects."""
+    index = build_facility_index(df, [TOTAL_COL])
+    matrix, years = index.dense(TOTAL_COL, fill_value=0.0)
+    tables = []
+    for dims in (["Facility Province"], ["Facility Province", "Facility Description"]):
+        keys = index.info[dims].astype(str)
+        codes = keys.groupby(dims, sort=True).ngroup().to_numpy()
+        labels = keys.drop_duplicates().sort_values(dims).reset_index(drop=True)
+        result = lmdi_decomposition(matrix, codes, len(labels))
+        table = decomposition_table(result, labels, years)
+        if len(dims) > 1:                                                    # drop sector-years with no emissions either side
+            table = table[(table["Previous Total (tonnes CO2e)"] > 0) | (table["Total (tonnes CO2e)"] > 0)]
+        tables.append(table.reset_index(drop=True))
+    return tables[0], tables[1]
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+
+    province_table, sector_table = decompose(emission_df)
+    residual = province_table["Change (tonnes CO2e)"] - province_table[EFFECTS].sum(axis=1)
+    print(f"Largest decomposition residual: {residual.abs().max():.3g} tonnes")
+
+    province_csv = os.path.join(OUT_DIR, "province_change_decomposition.csv")
+    province_table.to_csv(province_csv, index=False)
+    print(f"Saved province year-over-year decomposition → {province_csv}")
+    sector_csv = os.path.join(OUT_DIR, "sector_change_decomposition.csv")
+    sector_table.to_csv(sector_csv, index=False)
+    print(f"Saved province × sector year-over-year decomposition → {sector_csv}")
+
+    # Per-province tables next to each <prefix>_total_emissions_by_year.csv
+    for province, (_, prefix) in PROVINCE_OUTPUTS.items():
+        for level, table in (("total", province_table), ("sector", sector_table)):
+            rows = table[table["Facility Province"] == province]
+            if rows.empty:
+                print(f"⚠️ No facilities for {province}; skipping {level} decomposition.")
+                continue
+            rows_csv = os.path.join(province_out_dir(province), f"{prefix}_{level}_emissions_change_decomposition.csv")
+            rows.to_csv(rows_csv, index=False)
+        print(f"Saved {province} change decompositions → {province_out_dir(province)}")
+
+    # Plot: national year-over-year change split into the four effects
+    national = province_table.groupby("Reference Year")[EFFECTS + ["Change (tonnes CO2e)"]].sum() / 1e6
+    bottom_pos = np.zeros(len(national))
+    bottom_neg = np.zeros(len(national))
+    plt.figure(figsize=(12, 6))
+    for effect, color in zip(EFFECTS, ["tab:green", "tab:red", "tab:blue", "tab:orange"]):
+        vals = national[effect].to_numpy()
+        base = np.where(vals >= 0, bottom_pos, bottom_neg)
+        plt.bar(national.index, vals, bottom=base, color=color, label=effect)
+        bottom_pos += np.where(vals >= 0, vals, 0.0)
+        bottom_neg += np.where(vals < 0, vals, 0.0)
+    plt.plot(national.index, national["Change (tonnes CO2e)"], color="black", marker="o", label="Net change")
+    plt.axhline(0, color="grey", linewidth=0.8)
+    plt.title("Canada (all facilities) — Year-over-Year Change by LMDI Effect")
+    plt.xlabel("Reference Year")
+    plt.ylabel("Change (Mt CO2e)")
+    plt.legend()
+    plt.grid(True, axis="y")
+    plt.tight_layout()
+    national_png = os.path.join(OUT_DIR, "national_change_decomposition.png")
+    plt.savefig(national_png, dpi=200)
+    plt.show()
+    print(f"Saved national decomposition plot → {national_png}")
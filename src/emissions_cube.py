@@ -0,0 +1,93 @@
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+TOTAL_COL = "Total Emissions (tonnes CO2e)"
+
+
+@dataclass
+class EmissionsCube:
+    """
+    Dense array of summed emissions over named dimensions.
+
+    values has one axis per entry of `dims` (labels[i] gives that axis'
+    labels) plus a trailing axis over `columns` when several value columns
+    were requested.
+    """
+    dims: list
+    labels: list
+    values: np.ndarray
+    columns: list = None
+
+    def axis(self, dim):
+        return self.dims.index(dim)
+
+    def index_of(self, dim, label):
+        """Position of `label` on `dim` (KeyError if absent)."""
+        hits = np.flatnonzero(np.asarray(self.labels[self.axis(dim)]) == label)
+        if len(hits) == 0:
+            raise KeyError(label)
+        return int(hits[0])
+
+    def frame(self, row_dim, col_dim, column=None):
+        """2-D slice as a DataFrame, summing over every other dimension."""
+        values = self.values
+        if self.columns is not None:
+            values = values[..., self.columns.index(column or self.columns[-1])]
+        other = tuple(i for i, d in enumerate(self.dims) if d not in (row_dim, col_dim))
+        matrix = values.sum(axis=other) if other else values
+        if self.axis(row_dim) > self.axis(col_dim):
+            matrix = matrix.T
+        return pd.DataFrame(matrix, index=pd.Index(self.labels[self.axis(row_dim)], name=row_dim),
+                            columns=pd.Index(self.labels[self.axis(col_dim)], name=col_dim))
+
+    def to_long(self, value_name=None, drop_zero=True):
+        """Long table with one row per non-empty cell."""
+        index = pd.MultiIndex.from_product(self.labels, names=self.dims)
+        if self.columns is None:
+            long = pd.DataFrame({value_name or TOTAL_COL: self.values.ravel()}, index=index)
+        else:
+            long = pd.DataFrame(self.values.reshape(-1, len(self.columns)), index=index, columns=self.columns)
+        if drop_zero:
+            long = long[(long != 0).any(axis=1)]
+        return long.reset_index()
+
+
+def build_cube(df, dims, value_cols=TOTAL_COL, labels=None):
+    """
+    Sum `value_cols` over every combination of `dims` in one grouped reduction.
+
+    Each dimension is factorized to integer codes, the codes are combined into
+    one flat cell index and every column is reduced with np.bincount. `labels`
+    can fix a dimension's axis (e.g. a full year range); rows whose value is
+    not among the given labels are dropped.
+    """
+    labels = dict(labels or {})
+    single = isinstance(value_cols, str)
+    cols = [value_cols] if single else list(value_cols)
+
+    codes, axes = [], []
+    keep = np.ones(len(df), dtype=bool)
+    for dim in dims:
+        if dim in labels:
+            axis_labels = np.asarray(labels[dim])
+            code = pd.Index(axis_labels).get_indexer(df[dim])
+        else:
+            code, axis_labels = pd.factorize(df[dim], sort=True)
+            axis_labels = np.asarray(axis_labels)
+        keep &= code >= 0
+        codes.append(code)
+        axes.append(axis_labels)
+
+    shape = tuple(len(a) for a in axes)
+    flat = np.ravel_multi_index([c[keep] for c in codes], shape) if keep.any() else np.array([], dtype=np.int64)
+    size = int(np.prod(shape))
+
+    stacked = np.empty(shape + (len(cols),), dtype=np.float64)
+    for k, col in enumerate(cols):
+        weights = pd.to_numeric(df[col], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)[keep]
+        stacked[..., k] = np.bincount(flat, weights=weights, minlength=size).reshape(shape)
+
+    if single:
+        return EmissionsCube(list(dims), axes, stacked[..., 0])
+    return EmissionsCube(list(dims), axes, stacked, cols)
@@ -0,0 +1,150 @@
+import os
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+from facility_resolution import attach_facility_ids
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+TOTAL_COL = "Total Emissions (tonnes CO2e)"
+
+# Every numeric emissions column kept by phase1_cleaning.py
+GAS_COLUMNS = [
+    "CO2 (tonnes)",
+    "CH4 (tonnes CO2e)",
+    "N2O (tonnes CO2e)",
+    "HFC Total (tonnes CO2e)",
+    "PFC Total (tonnes CO2e)",
+    "SF6 (tonnes CO2e)",
+    TOTAL_COL,
+]
+
+# Descriptive columns carried per facility (taken from its latest reporting year)
+INFO_COLUMNS = ["Facility Name", "Facility Province", "Facility Description", "Reporting Company"]
+
+
+@dataclass
+class FacilityIndex:
+    """
+    Rows sorted once by (Facility ID, year) and stored as contiguous arrays.
+
+    Facility k owns rows offsets[k]:offsets[k + 1] of `years` and of every
+    array in `values`, so its full history is a slice and per-facility
+    statistics are segment reductions over all facilities at once.
+    """
+    facility_ids: np.ndarray   # (n_facilities,) sorted
+    offsets: np.ndarray        # (n_facilities + 1,)
+    years: np.ndarray          # (n_rows,)
+    values: dict               # column -> (n_rows,) float64
+    info: pd.DataFrame         # indexed by Facility ID
+
+    @property
+    def starts(self):
+        return self.offsets[:-1]
+
+    @property
+    def counts(self):
+        return np.diff(self.offsets)
+
+    def position(self, facility_id):
+        """Position of a Facility ID in the index (KeyError if absent)."""
+        k = np.searchsorted(self.facility_ids, facility_id)
+        if k == len(self.facility_ids) or self.facility_ids[k] != facility_id:
+            raise KeyError(facility_id)
+        return k
+
+    def series(self, facility_id, column=TOTAL_COL):
+        """(years, values) for one facility — a view, no scan."""
+        k = self.position(facility_id)
+        lo, hi = self.offsets[k], self.offsets[k + 1]
+        return self.years[lo:hi], self.values[column][lo:hi]
+
+    def row_facility(self):
+        """Facility position of every row (for scatter/gather with np.add.at)."""
+        return np.repeat(np.arange(len(self.facility_ids)), self.counts)
+
+    def segment_stats(self, column=TOTAL_COL):
+        """Mean, max, first/last year and value and CAGR for every facility."""
+        vals = self.values[column]
+        starts, ends = self.starts, self.offsets[1:] - 1
+
+        sums = np.add.reduceat(vals, starts)
+        first_val, last_val = vals[starts], vals[ends]
+        first_year, last_year = self.years[starts], self.years[ends]
+        span = last_year - first_year
+
+        valid = (span > 0) & (first_val > 0) & (last_val > 0)
+        cagr = np.full(len(starts), np.nan)
+        cagr[valid] = (last_val[valid] / first_val[valid]) ** (1.0 / span[valid]) - 1.0
+
+        stats = pd.DataFrame({
+            "Years Reported": self.counts,
+            "First Year": first_year,
+            "Last Year": last_year,
+            "Mean": sums / self.counts,
+            "Max": np.maximum.reduceat(vals, starts),
+            "First Value": first_val,
+            "Last Value": last_val,
+            "CAGR": cagr,
+        }, index=pd.Index(self.facility_ids, name="Facility ID"))
+        return self.info.join(stats)
+
+    def dense(self, column=TOTAL_COL, years=None, fill_value=0.0):
+        """Facility x year matrix; years a facility did not report get `fill_value`."""
+        if years is None:
+            years = np.arange(self.years.min(), self.years.max() + 1)
+        years = np.asarray(years)
+        matrix = np.full((len(self.facility_ids), len(years)), fill_value, dtype=np.float64)
+
+        col = self.years - years[0]
+        keep = (col >= 0) & (col < len(years))
+        matrix[self.row_facility()[keep], col[keep]] = self.values[column][keep]
+        return matrix, years
+
+
+def build_facility_index(df, value_cols=None):
+    """Sort the frame by (Facility ID, year) once and pack it into a FacilityIndex."""
+    df = attach_facility_ids(df)
+    value_cols = [c for c in (value_cols or GAS_COLUMNS) if c in df.columns]
+
+    ids = df["Facility ID"].to_numpy(dtype=np.int64)
+    years = df["Reference Year"].to_numpy(dtype=np.int64)
+    order = np.lexsort((years, ids))
+    ids, years = ids[order], years[order]
+
+    # Collapse any repeated (facility, year) rows so each year appears once per facility
+    row_key = np.concatenate(([True], (ids[1:] != ids[:-1]) | (years[1:] != years[:-1])))
+    row_starts = np.flatnonzero(row_key)
+
+    values = {}
+    for col in value_cols:
+        vals = pd.to_numeric(df[col], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)[order]
+        values[col] = np.ascontiguousarray(np.add.reduceat(vals, row_starts))
+    ids, years = ids[row_starts], years[row_starts]
+
+    facility_ids, fac_starts = np.unique(ids, return_index=True)
+    offsets = np.append(fac_starts, len(ids))
+
+    # Latest-year descriptive fields per facility
+    last_rows = order[row_starts][offsets[1:] - 1]
+    info_cols = [c for c in INFO_COLUMNS if c in df.columns]
+    info = df.iloc[last_rows][info_cols].set_index(pd.Index(facility_ids, name="Facility ID"))
+
+    return FacilityIndex(facility_ids, offsets, np.ascontiguousarray(years), values, info)
+
+
+if __name__ == "__main__":
+    emission_df = pd.read_csv(emissions_csv)
+    facility_index = build_facility_index(emission_df)
+    print(f"Indexed {len(facility_index.facility_ids)} facilities "
+          f"over {len(facility_index.years)} facility-years")
+
+    stats = facility_index.segment_stats()
+    stats_csv = os.path.join(OUT_DIR, "Facility_Statistics.csv")
+    stats.to_csv(stats_csv)
+    print(f"Saved per-facility statistics → {stats_csv}")
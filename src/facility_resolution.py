@@ -0,0 +1,179 @@
+import os
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+# Names scoring at least this trigram Jaccard similarity inside a block are the same facility
+SIMILARITY_THRESHOLD = 0.6
+
+# Geo cell size in degrees (~11 km of latitude)
+GEO_CELL_DEG = 0.1
+
+# Legal/generic tokens that change between filings without the facility changing
+NAME_STOPWORDS = {
+    "inc", "ltd", "ltee", "limited", "corp", "corporation", "co", "company",
+    "the", "of", "and", "et", "de", "du", "la", "le", "facility", "installation",
+}
+
+
+def normalize_name(name):
+    """Lower-case, strip accents/punctuation and drop generic tokens from a facility name."""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii")
+    tokens = re.sub(r"[^a-z0-9]+", " ", text.lower()).split()
+    kept = [t for t in tokens if t not in NAME_STOPWORDS]
+    return " ".join(kept or tokens)
+
+
+def _blocking_keys(df):
+    """Province + NAICS (or description) + geo cell, as one string per row."""
+    if "Facility NAICS Code" in df.columns:
+        # 4-digit industry group survives NAICS revisions that only touch the detail digits
+        naics = (pd.to_numeric(df["Facility NAICS Code"], errors="coerce") // 100).astype("Int64").astype(str)
+    else:
+        naics = df["Facility Description"].astype(str)
+
+    if {"Latitude", "Longitude"}.issubset(df.columns):
+        lat = np.floor(pd.to_numeric(df["Latitude"], errors="coerce") / GEO_CELL_DEG)
+        lon = np.floor(pd.to_numeric(df["Longitude"], errors="coerce") / GEO_CELL_DEG)
+        cell = lat.astype("Int64").astype(str) + ":" + lon.astype("Int64").astype(str)
+    else:
+        cell = pd.Series("", index=df.index)
+
+    return df["Facility Province"].astype(str) + "|" + naics + "|" + cell
+
+
+def _trigram_similarity(names):
+    """Pairwise trigram Jaccard similarity for a list of names (dense n x n matrix)."""
+    vocab = {}
+    rows, cols = [], []
+    for i, name in enumerate(names):
+        padded = f"  {name} "
+        for gram in {padded[k:k + 3] for k in range(len(padded) - 2)}:
+            rows.append(i)
+            cols.append(vocab.setdefault(gram, len(vocab)))
+
+    grams = np.zeros((len(names), len(vocab)), dtype=np.float32)
+    grams[rows, cols] = 1.0
+    sizes = grams.sum(axis=1)
+    inter = grams @ grams.T
+    union = sizes[:, None] + sizes[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def _numbers(name):
+    """Set of integers appearing in a name (unit numbers, legal land descriptions)."""
+    return {int(d) for d in re.findall(r"\d+", name)}
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def resolve_facility_ids(df, threshold=SIMILARITY_THRESHOLD):
+    """
+    Assign a stable integer Facility ID to every row of the cleaned emissions frame.
+
+    Rows carrying a GHGRP ID are grouped by that ID. The rest are grouped by
+    normalized name inside (province, NAICS, geo cell) blocks. Every name a
+    group has filed under in a block (GHGRP ID groups included) is then
+    matched against the others: groups merge when their trigram similarity
+    reaches `threshold`, they never report in the same year (a renamed plant
+    files once per year) and they do not carry two different GHGRP IDs.
+    Names carrying conflicting numbers ("Unit 1" vs "Unit 2") are never merged.
+    IDs are numbered 1..N in sorted order of each group's canonical key.
+    """
+    names = df["Facility Name"].map(normalize_name)
+    blocks = _blocking_keys(df)
+    years = df["Reference Year"].astype(int).to_numpy()
+
+    if "GHGRP ID" in df.columns:
+        ghgrp = df["GHGRP ID"].astype("string").str.strip()
+        has_id = ghgrp.notna() & (ghgrp != "")
+    else:
+        ghgrp = pd.Series(pd.NA, index=df.index, dtype="string")
+        has_id = pd.Series(False, index=df.index)
+
+    keys = np.where(has_id, "G:" + ghgrp.fillna(""), "N:" + blocks + "|" + names)
+    node_codes, node_keys = pd.factorize(keys)
+
+    # Year bitmask per node (one bit per reporting year)
+    year_bits = np.left_shift(np.int64(1), (years - years.min()).astype(np.int64))
+    node_masks = np.zeros(len(node_keys), dtype=np.int64)
+    np.bitwise_or.at(node_masks, node_codes, year_bits)
+
+    parent = np.arange(len(node_keys))
+    group_masks = node_masks.copy()
+
+    # Every (node, block, name) alias takes part in the block matching, so a facility filing with a
+    # GHGRP ID in some years and without one in others is linked; two different GHGRP IDs never merge
+    group_has_id = np.asarray([str(k).startswith("G:") for k in node_keys])
+    aliases = pd.DataFrame({"node": node_codes, "block": blocks.to_numpy(), "name": names.to_numpy()}).drop_duplicates()
+
+    for _, alias in aliases.groupby("block", sort=False):
+        if alias["node"].nunique() < 2:
+            continue
+        members = alias["node"].to_numpy()
+        block_names = alias["name"].tolist()
+        sim = _trigram_similarity(block_names)
+        ii, jj = np.nonzero(np.triu(sim >= threshold, k=1) & (members[:, None] != members[None, :]))
+        # Strongest matches first so a weaker link cannot claim a year slot early
+        order = np.argsort(-sim[ii, jj], kind="stable")
+        for i, j in zip(ii[order], jj[order]):
+            num_i, num_j = _numbers(block_names[i]), _numbers(block_names[j])
+            if not (num_i <= num_j or num_j <= num_i):
+                continue
+            ra, rb = _find(parent, members[i]), _find(parent, members[j])
+            if ra == rb or group_masks[ra] & group_masks[rb] or (group_has_id[ra] and group_has_id[rb]):
+                continue
+            parent[rb] = ra
+            group_masks[ra] |= group_masks[rb]
+            group_has_id[ra] |= group_has_id[rb]
+
+    roots = np.array([_find(parent, i) for i in range(len(node_keys))])
+
+    # Canonical key of a group = smallest node key in it, so numbering is deterministic
+    canonical = pd.Series(node_keys).groupby(roots).transform("min").to_numpy()
+    _, dense_ids = np.unique(canonical, return_inverse=True)
+
+    return pd.Series(dense_ids[node_codes] + 1, index=df.index, name="Facility ID", dtype="int64")
+
+
+def attach_facility_ids(df):
+    """Return `df` with a Facility ID column, resolving it only if it is missing."""
+    if "Facility ID" in df.columns:
+        return df
+    df = df.copy()
+    df["Facility ID"] = resolve_facility_ids(df)
+    return df
+
+
+if __name__ == "__main__":
+    # phase1_cleaning.py owns the cleaned CSV (and attaches Facility IDs there); only the crosswalk is written here
+    emission_df = attach_facility_ids(pd.read_csv(emissions_csv))
+
+    n_names = emission_df.groupby(["Facility Province", "Facility Name"]).ngroups
+    n_ids = emission_df["Facility ID"].nunique()
+    print(f"Resolved {n_names} province/name pairs into {n_ids} facilities")
+
+    # Crosswalk: every name a facility has reported under, with its year span
+    crosswalk = (
+        emission_df
+        .groupby(["Facility ID", "Facility Name", "Facility Province"], as_index=False)
+        .agg(**{"First Year": ("Reference Year", "min"),
+                "Last Year": ("Reference Year", "max"),
+                "Rows": ("Reference Year", "size")})
+        .sort_values(["Facility ID", "First Year"])
+    )
+    crosswalk_csv = os.path.join(OUT_DIR, "Facility_ID_Crosswalk.csv")
+    crosswalk.to_csv(crosswalk_csv, index=False)
+    print(f"Saved facility ID crosswalk → {crosswalk_csv}")
@@ -0,0 +1,226 @@
+import os
+import json
+import warnings
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from changepoints import series_frame
+from facility_index import build_facility_index
+from emissions_cube import TOTAL_COL
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/Forecasts")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+cache_json = os.path.join(OUT_DIR, "fitted_model_cache.json")
+
+FORECAST_HORIZON = 2050
+BACKTEST_YEARS = 3        # held-out trailing years for out-of-sample error
+FACILITY_YEARS = 10       # facilities are fitted on the trailing years they reported without gaps
+
+# Damped-trend smoothing parameter grid, searched for all series at once
+ALPHAS = np.array([0.1, 0.3, 0.5, 0.7, 0.9])
+BETAS = np.array([0.05, 0.2, 0.4, 0.6])
+PHIS = np.array([0.8, 0.9, 0.95, 0.98])
+
+MODELS = ["Damped Trend ES", "Log-Linear"]
+
+
+def series_hashes(values, years):
+    """
+    One content hash per series (row), over its years and values. The years
+    are hashed as cells (hash_pandas_object ignores column labels), so the
+    same values over a shifted window get a different key.
+    """
+    values = np.asarray(values, dtype=float)
+    years = np.broadcast_to(np.asarray(years, dtype=float), (len(values), values.shape[1]))
+    frame = pd.DataFrame(np.concatenate([years, values], axis=1))
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def model_fingerprint(model):
+    """Hash of the model name and its parameter grid, so a grid change invalidates cached fits."""
+    grid = [ALPHAS, BETAS, PHIS] if model == "Damped Trend ES" else []
+    text = "|".join([model] + [",".join(repr(float(v)) for v in g) for g in grid])
+    return int(pd.util.hash_array(np.array([text], dtype=object))[0])
+
+
+def fit_damped_trend(values):
+    """
+    Grid-searched damped-trend exponential smoothing for many series.
+
+    Every (series, alpha, beta, phi) combination runs through the same
+    recursion over years, so the whole grid is one array per step; the
+    combination with the lowest one-step-ahead squared error wins.
+    Returns a dict of per-series arrays: alpha, beta, phi, level, trend.
+    """
+    values = np.asarray(values, dtype=float)
+    a, b, p = (g.ravel() for g in np.meshgrid(ALPHAS, BETAS, PHIS, indexing="ij"))
+    y = values[:, None, :]                                                   # series x 1 x years
+    level = np.repeat(y[:, :, 0], len(a), axis=1)
+    trend = np.repeat(y[:, :, 1] - y[:, :, 0], len(a), axis=1)
+    sse = np.zeros_like(level)
+    for t in range(1, values.shape[1]):
+        forecast = level + p * trend
+        sse += (y[:, :, t] - forecast) ** 2
+        new_level = a * y[:, :, t] + (1 - a) * forecast
+        trend = b * (new_level - level) + (1 - b) * p * trend
+        level = new_level
+
+    best = np.argmin(sse, axis=1)
+    rows = np.arange(len(values))
+    return {"alpha": a[best], "beta": b[best], "phi": p[best],
+            "level": level[rows, best], "trend": trend[rows, best]}
+
+
+def fit_log_linear(values, years):
+    """Least squares line through log emissions; series with non-positive values get NaN."""
+    values = np.asarray(values, dtype=float)
+    positive = (values > 0).all(axis=1)
+    log_y = np.log(np.where(values > 0, values, 1.0))
+    x = np.asarray(years, dtype=float)
+    x_c = x - x.mean()
+    slope = (log_y - log_y.mean(axis=1, keepdims=True)) @ x_c / (x_c @ x_c)
+    intercept = log_y.mean(axis=1) - slope * x.mean()
+    return {"slope": np.where(positive, slope, np.nan), "intercept": np.where(positive, intercept, np.nan)}
+
+
+def forecast(model, params, last_year, years_ahead):
+    """Series x len(years_ahead) forecasts from fitted parameters (floored at zero)."""
+    years_ahead = np.asarray(years_ahead)
+    if model == "Damped Trend ES":
+        h = (years_ahead - last_year)[None, :]
+        phi = params["phi"][:, None]
+        damp = np.where(phi == 1.0, h, phi * (1 - phi ** h) / (1 - phi))   # phi + phi^2 + ... + phi^h
+        out = params["level"][:, None] + damp * params["trend"][:, None]
+    else:
+        out = np.exp(params["intercept"][:, None] + params["slope"][:, None] * years_ahead[None, :])
+    return np.maximum(out, 0.0)
+
+
+class ModelCache:
+    """
+    Fitted parameters keyed by model (name + grid fingerprint) and series
+    content hash (years + values), stored as JSON.
+
+    fit() only runs the batched fitter on series whose hash is not cached,
+    so re-running after new data refits just the series that changed.
+    """
+
+    def __init__(self, path=cache_json):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+        self.hits = self.misses = 0
+
+    def fit(self, model, values, years):
+        fingerprint = model_fingerprint(model)
+        keys = [f"{model}:{fingerprint:016x}:{h:016x}" for h in series_hashes(values, years)]
+        missing = np.array([k not in self.entries for k in keys], dtype=bool)
+        self.hits += int((~missing).sum())
+        self.misses += int(missing.sum())
+        if missing.any():
+            fitted = (fit_damped_trend(values[missing]) if model == "Damped Trend ES"
+                      else fit_log_linear(values[missing], years))
+            for i, k in enumerate(np.asarray(keys)[missing]):
+                self.entries[k] = {name: float(arr[i]) for name, arr in fitted.items()}
+        names = list(self.entries[keys[0]]) if keys else []
+        return {name: np.array([self.entries[k][name] for k in keys]) for name in names}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f)
+
+
+def backtest(cache, values, years, holdout=BACKTEST_YEARS):
+    """Fit on all but the last `holdout` years and score the held-out years, per model and series."""
+    train, test = values[:, :-holdout], values[:, -holdout:]
+    errors = {}
+    for model in MODELS:
+        params = cache.fit(model, train, years[:-holdout])
+        predicted = forecast(model, params, years[-holdout - 1], years[-holdout:])
+        with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)                   # all-zero held-out years
+            ape = np.where(test > 0, np.abs(predicted - test) / test * 100.0, np.nan)
+            mape = np.nanmean(ape, axis=1)
+        errors[model] = {"MAE": np.abs(predicted - test).mean(axis=1), "MAPE": mape}
+    return errors
+
+
+def facility_series(df, n_years=FACILITY_YEARS):
+    """Facilities that reported every one of the trailing `n_years` years, as a labelled matrix."""
+    index = build_facility_index(df, [TOTAL_COL])
+    matrix, years = index.dense(TOTAL_COL, fill_value=np.nan)
+    matrix, years = matrix[:, -n_years:], years[-n_years:]
+    complete = ~np.isnan(matrix).any(axis=1)
+    labels = index.info[complete]
+    entity = labels["Facility Name"] + " (" + labels["Facility Province"] + ")"
+    return pd.DataFrame(matrix[complete], index=pd.Index(entity, name="Entity"), columns=years)
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+    cache = ModelCache()
+
+    # Province totals, province x sector series and continuously reporting facilities
+    regional = series_frame(emission_df)
+    is_total = regional.index.get_level_values("Sector") == "All"
+    province = regional[is_total].droplevel("Sector")
+    sector = regional[~is_total].set_axis([f"{p} — {s}" for p, s in regional.index[~is_total]])
+    levels = {"Province": province, "Sector": sector, "Facility": facility_series(emission_df)}
+
+    forecasts, scores = [], []
+    for level, frame in levels.items():
+        values, years = frame.to_numpy(dtype=float), np.asarray(frame.columns, dtype=np.int64)
+        ahead = np.arange(years[-1] + 1, FORECAST_HORIZON + 1)
+        errors = backtest(cache, values, years)
+        for model in MODELS:
+            predicted = forecast(model, cache.fit(model, values, years), years[-1], ahead)
+            forecasts.append(pd.DataFrame({
+                "Level": level, "Entity": np.repeat(frame.index.to_numpy(), len(ahead)), "Model": model,
+                "Year": np.tile(ahead, len(frame)), "Forecast (tonnes CO2e)": predicted.ravel(),
+            }))
+            scores.append({"Level": level, "Model": model, "Series": len(frame),
+                           "Backtest Years": BACKTEST_YEARS,
+                           "Median MAPE (%)": np.nanmedian(errors[model]["MAPE"]),
+                           "Mean MAE (tonnes CO2e)": np.nanmean(errors[model]["MAE"]),
+                           "Share Best (lowest MAE)": np.mean(
+                               errors[model]["MAE"] <= np.min([e["MAE"] for e in errors.values()], axis=0))})
+    cache.save()
+    print(f"Model cache: {cache.hits} fits reused, {cache.misses} fitted → {cache.path}")
+
+    forecasts = pd.concat(forecasts, ignore_index=True)
+    forecasts_csv = os.path.join(OUT_DIR, "forecasts_to_2050.csv")
+    forecasts.to_csv(forecasts_csv, index=False)
+    print(f"Saved forecasts ({len(forecasts):,} rows) → {forecasts_csv}")
+
+    scores = pd.DataFrame(scores)
+    scores_csv = os.path.join(OUT_DIR, "backtest_error_by_model.csv")
+    scores.to_csv(scores_csv, index=False)
+    print(f"Saved backtest error by model → {scores_csv}")
+
+    # Plot: provincial totals with both model forecasts
+    fig, axes = plt.subplots(2, 5, figsize=(20, 8), squeeze=False)
+    for ax, name in zip(axes.ravel(), province.index):
+        ax.plot(province.columns, province.loc[name] / 1e6, marker="o", markersize=3, color="g", label="Actual")
+        for model, style in zip(MODELS, ["--", ":"]):
+            sub = forecasts[(forecasts["Level"] == "Province") & (forecasts["Entity"] == name)
+                            & (forecasts["Model"] == model)]
+            ax.plot(sub["Year"], sub["Forecast (tonnes CO2e)"] / 1e6, linestyle=style, label=model)
+        ax.set_title(name, fontsize=10)
+        ax.grid(True)
+    axes[0][0].legend(fontsize=8)
+    for ax in axes[:, 0]:
+        ax.set_ylabel("Emissions (Mt CO2e)")
+    fig.suptitle("Provincial Totals — Damped-Trend ES and Log-Linear Forecasts to 2050")
+    plt.tight_layout()
+    forecast_png = os.path.join(OUT_DIR, "province_forecasts.png")
+    plt.savefig(forecast_png, dpi=200)
+    plt.show()
+    print(f"Saved province forecast plot → {forecast_png}")
@@ -0,0 +1,196 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from cap_monitoring import TREND_WINDOW
+from emissions_cube import TOTAL_COL
+from facility_index import build_facility_index
+from provinces import PROVINCE_OUTPUTS, load_targets, province_out_dir, target_levels
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/GapContributions")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+TOP_N_PLOT = 10
+MIN_TREND_YEARS = 5       # reported years in the window needed for a facility trend (else held flat)
+
+
+def facility_projections(matrix, years, target_years, window=TREND_WINDOW):
+    """
+    Facility x target projected emissions: last actual value plus the
+    least-squares slope over the years the facility reported in the
+    trailing window, times the years to each target, floored at zero.
+    Non-reported years are left out of the fit so threshold-driven entry is
+    not read as growth. Facilities not reporting in the last year project to 0.
+    """
+    x = np.asarray(years[-window:], dtype=float)[None, :]
+    y = matrix[:, -window:]
+    w = (y > 0).astype(float)
+    n = w.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_mean = (w * x).sum(axis=1) / n
+        y_mean = (w * y).sum(axis=1) / n
+        dx = (x - x_mean[:, None]) * w
+        slope = (dx * (y - y_mean[:, None])).sum(axis=1) / (dx * dx).sum(axis=1)
+    slope = np.where(n >= MIN_TREND_YEARS, slope, 0.0)
+    last = matrix[:, -1]
+    horizon = np.asarray(target_years, dtype=float)[None, :] - years[-1]
+    projected = np.maximum(last[:, None] + slope[:, None] * horizon, 0.0)
+    return np.where(last[:, None] > 0, projected, 0.0)
+
+
+def gap_contributions(df, targets):
+    """
+    Every facility's contribution to every province-wide target's gap, at once.
+
+    With B the facility's baseline-year emissions and P its projection to
+    the target year, all as facility x target arrays:
+      change since baseline = last actual - B;
+      projected trend       = P - last actual;
+      contribution          = P - B (positive = pushing the province over).
+    A facility only counts toward its own province's targets. The gap is
+    the sum of projections minus the target level. Returns
+    (target table, dict of facility x target arrays, facility info, years).
+    """
+    index = build_facility_index(df, [TOTAL_COL])
+    matrix, years = index.dense(TOTAL_COL, fill_value=0.0)
+    info = index.info.reset_index()
+
+    totals = pd.DataFrame(matrix, index=info["Facility Province"]).groupby(level=0).sum()
+    totals.columns = years
+    levels = target_levels(targets, totals)
+    levels = levels[(levels["Sector"] == "All") & levels["Target Level (upper)"].notna()
+                    & levels["Province"].isin(totals.index) & (levels["Target Year"] > years[-1])].copy()
+
+    in_province = info["Facility Province"].to_numpy()[:, None] == levels["Province"].to_numpy()[None, :]
+    base_year = levels["Baseline Year"].to_numpy(dtype=float, na_value=np.nan)
+    has_base = np.isin(base_year, years)
+    base_col = np.where(has_base, np.searchsorted(years, np.nan_to_num(base_year).astype(np.int64)), len(years) - 1)
+    levels["Baseline in Data"] = has_base
+
+    baseline = np.where(in_province, matrix[:, base_col], 0.0)              # F x T
+    last = np.where(in_province, matrix[:, -1:], 0.0)
+    projected = np.where(in_province, facility_projections(matrix, years, levels["Target Year"]), 0.0)
+
+    levels["Projected Emissions"] = projected.sum(axis=0)
+    levels["Gap (tonnes CO2e)"] = levels["Projected Emissions"] - levels["Target Level (upper)"]
+    arrays = {"in_province": in_province, "baseline": baseline, "last": last, "projected": projected,
+              "change_since_baseline": last - baseline, "projected_trend": projected - last,
+              "contribution": projected - baseline}
+    return levels, arrays, info, years
+
+
+def greedy_cover(abatable, gaps):
+    """
+    Smallest number of facilities whose full abatement closes each gap.
+
+    One descending sort of the facility x target abatable array and one
+    cumulative sum; the cover size per target is the first position where
+    the running total reaches the gap (taking the largest first is optimal
+    when each facility can only be fully abated). Returns (order, cover
+    sizes, closable); targets already met get size 0.
+    """
+    order = np.argsort(-abatable, axis=0, kind="stable")
+    cum = np.cumsum(np.take_along_axis(abatable, order, axis=0), axis=0)
+    gaps = np.asarray(gaps, dtype=float)
+    size = (cum < gaps[None, :]).sum(axis=0) + 1
+    closable = cum[-1] >= gaps
+    size = np.where(gaps <= 0, 0, np.where(closable, size, len(abatable)))
+    return order, size, closable
+
+
+def target_label(row):
+    return f"{row['Province']} {int(row['Target Year'])} ({row['Kind']}, baseline {row['Baseline Year']})"
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+
+    levels, arrays, info, years = gap_contributions(emission_df, load_targets())
+    for _, row in levels[~levels["Baseline in Data"]].iterrows():
+        print(f"⚠️ {target_label(row)}: baseline year not in facility data; "
+              f"change since baseline measured from {years[-1]} instead.")
+
+    start = time.perf_counter()
+    order, size, closable = greedy_cover(arrays["projected"], levels["Gap (tonnes CO2e)"].to_numpy())
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"Greedy covers for {len(levels)} targets in {elapsed_ms:.1f} ms")
+
+    # Ranked contributions: one block per target, largest contribution first
+    ranked, covers = [], []
+    for t, (target_id, row) in enumerate(levels.iterrows()):
+        rows = np.flatnonzero(arrays["in_province"][:, t])
+        rows = rows[np.argsort(-arrays["contribution"][rows, t], kind="stable")]
+        block = info.iloc[rows][["Facility ID", "Facility Name", "Facility Description", "Reporting Company"]].copy()
+        block.insert(0, "Target", target_label(row))
+        block.insert(1, "Target ID", target_id)
+        block["Rank"] = np.arange(1, len(rows) + 1)
+        block["Baseline Emissions"] = arrays["baseline"][rows, t]
+        block[f"{years[-1]} Emissions"] = arrays["last"][rows, t]
+        block["Projected at Target Year"] = arrays["projected"][rows, t]
+        block["Change Since Baseline"] = arrays["change_since_baseline"][rows, t]
+        block["Projected Trend Change"] = arrays["projected_trend"][rows, t]
+        block["Contribution to Gap"] = arrays["contribution"][rows, t]
+        ranked.append(block)
+
+        picks = order[:size[t], t]
+        cover = info.iloc[picks][["Facility ID", "Facility Name", "Facility Description"]].copy()
+        cover.insert(0, "Target", target_label(row))
+        cover["Abated (tonnes CO2e)"] = arrays["projected"][picks, t]
+        cover["Cumulative Abated"] = np.cumsum(cover["Abated (tonnes CO2e)"].to_numpy())
+        cover["Gap (tonnes CO2e)"] = row["Gap (tonnes CO2e)"]
+        covers.append(cover)
+
+    levels["Facilities Ever Reported"] = arrays["in_province"].sum(axis=0)
+    levels["Minimal Cover Size"] = size
+    levels["Gap Closable"] = closable
+    summary = levels[["Province", "Target Year", "Baseline Year", "Kind", "Target Level (upper)",
+                      "Projected Emissions", "Gap (tonnes CO2e)", "Facilities Ever Reported",
+                      "Minimal Cover Size", "Gap Closable"]]
+    summary_csv = os.path.join(OUT_DIR, "target_gap_cover_summary.csv")
+    summary.to_csv(summary_csv)
+    print(f"Saved gap / minimal cover summary → {summary_csv}")
+
+    ranked = pd.concat(ranked, ignore_index=True)
+    ranked_csv = os.path.join(OUT_DIR, "facility_gap_contributions.csv")
+    ranked.to_csv(ranked_csv, index=False)
+    print(f"Saved ranked facility contributions → {ranked_csv}")
+    covers = pd.concat(covers, ignore_index=True)
+    covers_csv = os.path.join(OUT_DIR, "minimal_abatement_covers.csv")
+    covers.to_csv(covers_csv, index=False)
+    print(f"Saved minimal abatement facility sets → {covers_csv}")
+
+    for province, (_, prefix) in PROVINCE_OUTPUTS.items():
+        rows = ranked[ranked["Target"].str.startswith(province + " ")]
+        if rows.empty:
+            print(f"⚠️ No province-wide target with a resolvable level for {province}; skipping gap contributions.")
+            continue
+        rows_csv = os.path.join(province_out_dir(province), f"{prefix}_target_gap_contributions.csv")
+        rows.to_csv(rows_csv, index=False)
+        print(f"Saved {province} target gap contributions → {rows_csv}")
+
+    # Plot: top contributors to each target's gap
+    n = len(levels)
+    cols = min(n, 3)
+    fig, axes = plt.subplots(int(np.ceil(n / cols)), cols, figsize=(7 * cols, 4 * np.ceil(n / cols)), squeeze=False)
+    for ax, (label, block) in zip(axes.ravel(), ranked.groupby("Target", sort=False)):
+        top = block.head(TOP_N_PLOT).iloc[::-1]
+        ax.barh(top["Facility Name"].str.slice(0, 35), top["Contribution to Gap"] / 1e6,
+                color=np.where(top["Contribution to Gap"] > 0, "tab:red", "tab:green"))
+        ax.set_title(label, fontsize=9)
+        ax.set_xlabel("Contribution (Mt CO2e)")
+        ax.tick_params(axis="y", labelsize=7)
+        ax.grid(True, axis="x")
+    for ax in axes.ravel()[n:]:
+        ax.set_visible(False)
+    fig.suptitle("Top Facility Contributions to Provincial Target Gaps (projected − baseline)")
+    plt.tight_layout()
+    contributions_png = os.path.join(OUT_DIR, "top_gap_contributors.png")
+    plt.savefig(contributions_png, dpi=200)
+    plt.show()
+    print(f"Saved top contributors plot → {contributions_png}")
@@ -0,0 +1,153 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from emissions_cube import build_cube
+from provinces import load_targets
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/GasTargets")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+# Gas columns tracked against baselines
+TRACKED_GASES = [
+    "CH4 (tonnes CO2e)",
+    "N2O (tonnes CO2e)",
+    "HFC Total (tonnes CO2e)",
+    "PFC Total (tonnes CO2e)",
+    "SF6 (tonnes CO2e)",
+]
+
+# Targets table sector names that are really gas-specific targets
+GAS_TARGET_SECTORS = {"Methane Emissions": "CH4 (tonnes CO2e)"}
+
+# Entity levels the %-change matrices are built for
+ENTITY_LEVELS = {
+    "Province": ["Facility Province"],
+    "Province x Description": ["Facility Province", "Facility Description"],
+    "Company": ["Reporting Company"],
+}
+
+
+class GasChangeMatrix:
+    """
+    %-change-from-baseline for every entity x gas x baseline year x year.
+
+    `totals` is entities x gases x years; `pct_change[e, g, b, y]` is the %
+    change of gas g for entity e in year y relative to baseline year b,
+    produced by one broadcasted expression. Cells whose baseline is zero are NaN.
+    """
+
+    def __init__(self, df, entity_cols, gases=TRACKED_GASES):
+        codes, uniques = pd.MultiIndex.from_frame(df[entity_cols].astype(str)).factorize(sort=True)
+        cube = build_cube(df.assign(_entity=codes), ["_entity", "Reference Year"], gases)
+        self.entities = np.array([" | ".join(u) for u in uniques[cube.labels[0]]])
+        self.years = np.asarray(cube.labels[1], dtype=np.int64)
+        self.gases = list(gases)
+        self.totals = np.moveaxis(cube.values, 2, 1)                 # entity x gas x year
+
+        base = self.totals[:, :, :, None]                            # ... x baseline x 1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.pct_change = np.where(base > 0, (self.totals[:, :, None, :] - base) / base * 100.0, np.nan)
+
+    def _year_pos(self, year):
+        """Position of `year`; a ValueError if it is not a year of the data (searchsorted alone would pick the next one)."""
+        pos = int(np.searchsorted(self.years, year))
+        if pos == len(self.years) or self.years[pos] != year:
+            raise ValueError(f"Year {year} is not in the data ({self.years[0]}–{self.years[-1]})")
+        return pos
+
+    def query(self, entity, gas, baseline_year, year):
+        """% change of `gas` for `entity` in `year` relative to `baseline_year`."""
+        match = np.flatnonzero(self.entities == entity)
+        if not len(match):
+            raise ValueError(f"Unknown entity {entity!r}")
+        return self.pct_change[int(match[0]), self.gases.index(gas), self._year_pos(baseline_year), self._year_pos(year)]
+
+    def table(self, baseline_year):
+        """Long table of % change against one baseline year (non-empty baselines only)."""
+        b = self._year_pos(baseline_year)
+        slab = self.pct_change[:, :, b, :]                           # entity x gas x year
+        e, g, y = np.nonzero(~np.isnan(slab))
+        return pd.DataFrame({
+            "Entity": self.entities[e],
+            "Gas": np.asarray(self.gases)[g],
+            "Baseline Year": baseline_year,
+            "Reference Year": self.years[y],
+            "Emissions (tonnes CO2e)": self.totals[e, g, y],
+            "% Change from Baseline": slab[e, g, y],
+        })
+
+
+def evaluate_gas_targets(targets, matrix):
+    """Check every gas-specific target (e.g. Alberta's methane cut) against a province-level matrix."""
+    rows = []
+    gas_targets = targets[targets["Sector"].isin(list(GAS_TARGET_SECTORS)) & (targets["Kind"] == "reduction")]
+    latest = int(matrix.years[-1])
+    for target_id, t in gas_targets.iterrows():
+        gas = GAS_TARGET_SECTORS[t["Sector"]]
+        if t["Province"] not in matrix.entities or t["Baseline Year"] not in matrix.years:
+            continue
+        change = matrix.query(t["Province"], gas, int(t["Baseline Year"]), latest)
+        required = -float(t["Reduction Upper Bound"])
+        rows.append({
+            "Target ID": target_id, "Province": t["Province"], "Gas": gas,
+            "Baseline Year": int(t["Baseline Year"]), "Target Year": t["Target Year"],
+            "Latest Year": latest, "% Change from Baseline": change,
+            "Required % Change": required,
+            "Remaining Cut (percentage points)": max(change - required, 0.0),
+            "Met": change <= required,
+        })
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+    targets = load_targets()
+
+    matrices = {level: GasChangeMatrix(emission_df, cols) for level, cols in ENTITY_LEVELS.items()}
+    for level, matrix in matrices.items():
+        n_queries = matrix.pct_change.size
+        print(f"{level}: {len(matrix.entities)} entities → {n_queries:,} %-change cells")
+
+    # Tables against each baseline year used by a gas target
+    gas_targets = targets[targets["Sector"].isin(list(GAS_TARGET_SECTORS))]
+    for baseline_year in sorted(gas_targets["Baseline Year"].dropna().unique()):
+        if int(baseline_year) not in matrices["Province"].years:
+            print(f"⚠️ Baseline year {baseline_year} is not in the facility data; skipping its % change tables.")
+            continue
+        for level, matrix in matrices.items():
+            slug = level.lower().replace(" x ", "_").replace(" ", "_")
+            table_csv = os.path.join(OUT_DIR, f"gas_pct_change_from_{baseline_year}_{slug}.csv")
+            matrix.table(int(baseline_year)).to_csv(table_csv, index=False)
+            print(f"Saved gas % change from {baseline_year} ({level}) → {table_csv}")
+
+    checks = evaluate_gas_targets(targets, matrices["Province"])
+    checks_csv = os.path.join(OUT_DIR, "gas_target_checks.csv")
+    checks.to_csv(checks_csv, index=False)
+    print(f"Saved gas target checks → {checks_csv}")
+
+    # Plot: % change from each gas target's baseline, all tracked gases for that province
+    for _, check in checks.iterrows():
+        matrix = matrices["Province"]
+        e = int(np.flatnonzero(matrix.entities == check["Province"])[0])
+        b = int(np.searchsorted(matrix.years, check["Baseline Year"]))
+        plt.figure(figsize=(10, 6))
+        for g, gas in enumerate(matrix.gases):
+            plt.plot(matrix.years[b:], matrix.pct_change[e, g, b, b:], marker="o", label=gas)
+        plt.axhline(check["Required % Change"], color="red", linestyle="--",
+                    label=f"Target ({check['Required % Change']:g}% by {check['Target Year']})")
+        plt.title(f"{check['Province']} — % Change by Gas from {check['Baseline Year']}")
+        plt.xlabel("Reference Year")
+        plt.ylabel(f"% Change from {check['Baseline Year']}")
+        plt.grid(True)
+        plt.legend(fontsize=8)
+        plt.tight_layout()
+        gas_png = os.path.join(OUT_DIR, f"gas_pct_change_target_{check['Target ID']}.png")
+        plt.savefig(gas_png, dpi=200)
+        plt.show()
+        print(f"Saved gas target plot → {gas_png}")
@@ -2,6 +2,9 @@ import os
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from carbon_budget import cumulative_target_checks, province_year_totals
+from provinces import load_targets
+
 # ---------- Robust paths (run from anywhere) ----------
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
 DATA_DIR = os.path.join(BASE_DIR, "data")
@@ -175,4 +178,38 @@ if not row_2023.empty:
 else:
     print("⚠️ 2023 not found in by-year table; skipping prediction step.")
 
+# ==================================================================
+# Part 5: Cumulative 5.6 Mt reduction target (2023–2027) by scenario
+# ==================================================================
+# The target is a cumulative reduction over the window, so compare window sums
+# (prefix sums over each scenario path) against the pre-window level held flat.
+mb_targets = load_targets()
+mb_targets = mb_targets[mb_targets["Province"] == "Manitoba"]
+mb_totals = province_year_totals(manitoba_overall_df)
+mb_checks = cumulative_target_checks(mb_targets, mb_totals)
+
+if mb_checks.empty:
+    print("⚠️ No evaluable Manitoba cumulative targets; skipping cumulative target check.")
+else:
+    mb_checks_csv = os.path.join(OUT_DIR, "mb_cumulative_target_check.csv")
+    mb_checks.to_csv(mb_checks_csv, index=False)
+    print(f"Saved MB cumulative target check → {mb_checks_csv}")
+
+    for _, row in mb_checks.iterrows():
+        print(f"Manitoba {row['Scenario']}: {row['Cumulative Reduction (tonnes CO2e)']/1e6:.2f} Mt cut over "
+              f"{row['Window']} vs {row['Required Reduction (tonnes CO2e)']/1e6:.1f} Mt required "
+              f"({'met' if row['Met'] else 'not met'})")
 
+    plt.figure(figsize=(10, 6))
+    plt.barh(mb_checks["Scenario"], mb_checks["Cumulative Reduction (tonnes CO2e)"] / 1e6, color="skyblue")
+    plt.axvline(mb_checks["Required Reduction (tonnes CO2e)"].iat[0] / 1e6, color="red", linestyle="--",
+                label="Required cumulative reduction")
+    plt.title(f"Manitoba — Cumulative Reduction {mb_checks['Window'].iat[0]} by Scenario")
+    plt.xlabel("Cumulative Reduction vs Pre-Window Level (Mt CO2e)")
+    plt.legend()
+    plt.grid(True, axis="x")
+    plt.tight_layout()
+    mb_checks_png = os.path.join(OUT_DIR, "mb_cumulative_target_check.png")
+    plt.savefig(mb_checks_png, dpi=200)
+    plt.show()
+    print(f"Saved MB cumulative target plot → {mb_checks_png}")
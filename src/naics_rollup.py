@@ -0,0 +1,221 @@
+import os
+from dataclasses import replace
+import numpy as np
+import pandas as pd
+
+from emissions_cube import build_cube, TOTAL_COL
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/NAICS")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+NAICS_COL = "Facility NAICS Code"
+NAICS_LEVELS = [2, 3, 4, 5, 6]
+
+# NAICS prefixes -> provincial target sectors (longest matching prefix wins)
+SECTOR_NAICS_PREFIXES = {
+    "Electricity Generation": [22111],          # generation only; 22112 is transmission and distribution
+    "Oil Sands": [21114, 211114],
+    "Oil and Gas": [211, 213111, 213118, 2212, 324110, 486],
+    "Transportation": [48, 49],
+    "Industry": [21, 23, 31, 32, 33],
+    "Buildings & Communities": [22112, 2213, 41, 44, 45, 51, 52, 53, 54, 55, 56, 61, 62, 71, 72, 81, 91, 92],
+}
+
+# Sub-sectors that also count towards a broader target sector (only in with_parent_sectors views)
+SECTOR_PARENTS = {"Oil Sands": "Oil and Gas"}
+
+OTHER_SECTOR = "Other"
+TARGET_SECTORS = list(SECTOR_NAICS_PREFIXES) + [OTHER_SECTOR]
+
+# Small coded fixture for check_naics_paths(): (province, year, description, NAICS code, emissions, expected sector).
+# Covers longest-prefix wins (211114 vs 211), the 22111 / 22112 split, an unmapped code and a missing code.
+NAICS_FIXTURE = [
+    ("Alberta", 2022, "In-situ Oil Sands Extraction", 211114, 500.0, "Oil Sands"),
+    ("Alberta", 2022, "In-situ Oil Sands Extraction", 211114, 300.0, "Oil Sands"),
+    ("Alberta", 2022, "In-situ Oil Sands Extraction", 211110, 40.0, "Oil and Gas"),
+    ("Alberta", 2022, "Conventional Oil and Gas Extraction", 211110, 200.0, "Oil and Gas"),
+    ("Alberta", 2022, "Fossil-Fuel Electric Power Generation", 221112, 900.0, "Electricity Generation"),
+    ("Alberta", 2022, "Electric Power Distribution", 221122, 10.0, "Buildings & Communities"),
+    ("Alberta", 2022, "Petrochemical Manufacturing", 325110, 120.0, "Industry"),
+    ("Alberta", 2022, "Greenhouse Crop Production", 111411, 5.0, OTHER_SECTOR),
+    ("Alberta", 2022, "Petrochemical Manufacturing", None, 70.0, None),
+    ("Alberta", 2023, "In-situ Oil Sands Extraction", 211114, 450.0, "Oil Sands"),
+    ("Alberta", 2023, "Fossil-Fuel Electric Power Generation", 221111, 20.0, "Electricity Generation"),
+    ("Saskatchewan", 2022, "Fossil-Fuel Electric Power Generation", 221112, 800.0, "Electricity Generation"),
+    ("Saskatchewan", 2022, "Natural Gas Pipeline Transportation", 486210, 60.0, "Oil and Gas"),
+]
+
+
+def naics_prefix(codes, level):
+    """Truncate 6-digit codes to their `level`-digit prefix."""
+    return np.asarray(codes, dtype=np.int64) // 10 ** (6 - level)
+
+
+def sector_for_naics(codes):
+    """Target sector of every code by longest-prefix match (OTHER_SECTOR if none)."""
+    codes = np.asarray(codes, dtype=np.int64)
+    sectors = np.full(len(codes), OTHER_SECTOR, dtype=object)
+    matched = np.zeros(len(codes), dtype=bool)
+    for level in sorted({len(str(p)) for ps in SECTOR_NAICS_PREFIXES.values() for p in ps}, reverse=True):
+        lookup = {p: s for s, ps in SECTOR_NAICS_PREFIXES.items() for p in ps if len(str(p)) == level}
+        prefix = naics_prefix(codes, level)
+        hit = ~matched & np.isin(prefix, list(lookup))
+        sectors[hit] = [lookup[p] for p in prefix[hit]]
+        matched |= hit
+    return sectors
+
+
+def naics_rollup(df, value_col=TOTAL_COL, levels=NAICS_LEVELS, by=("Facility Province", "Reference Year")):
+    """
+    Emissions summed at every NAICS level, per `by` group, from a single sort.
+
+    Rows are sorted once by (by..., 6-digit code). A coarser prefix is then
+    always a contiguous run of that order, so each level is one np.add.reduceat
+    over the boundaries where (by..., code // 10**(6 - level)) changes.
+    """
+    if NAICS_COL not in df.columns:
+        raise KeyError(f"'{NAICS_COL}' missing — re-run phase1_cleaning.py to keep NAICS codes")
+
+    frame = df[df[NAICS_COL].notna()]
+    codes = frame[NAICS_COL].to_numpy(dtype=np.int64)
+    group_codes = [pd.factorize(frame[col], sort=True) for col in by]
+    values = pd.to_numeric(frame[value_col], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+
+    order = np.lexsort([codes] + [c for c, _ in reversed(group_codes)])
+    codes, values = codes[order], values[order]
+    keys = [c[order] for c, _ in group_codes]
+
+    group_change = np.zeros(len(codes), dtype=bool)
+    for k in keys:
+        group_change[1:] |= k[1:] != k[:-1]
+    group_change[0] = True
+
+    frames = []
+    for level in levels:
+        prefix = naics_prefix(codes, level)
+        change = group_change.copy()
+        change[1:] |= prefix[1:] != prefix[:-1]
+        starts = np.flatnonzero(change)
+
+        out = {col: labels[k[starts]] for col, (_, labels), k in zip(by, group_codes, keys)}
+        out.update({"NAICS Level": level, "NAICS Prefix": prefix[starts],
+                    value_col: np.add.reduceat(values, starts)})
+        frames.append(pd.DataFrame(out))
+    return pd.concat(frames, ignore_index=True)
+
+
+def naics_sector_cube(df, value_col=TOTAL_COL):
+    """
+    Province x sector x year cube with sectors assigned from NAICS prefixes.
+
+    Every facility counts in exactly one sector, so sums across sectors are
+    province totals; use with_parent_sectors() for the view compared with
+    provincial sector targets (oil sands also counting towards Oil and Gas).
+    """
+    frame = df[df[NAICS_COL].notna()]
+    frame = frame.assign(Sector=sector_for_naics(frame[NAICS_COL].to_numpy(dtype=np.int64)))
+    cube = build_cube(frame, ["Facility Province", "Sector", "Reference Year"], value_col,
+                      labels={"Sector": TARGET_SECTORS})
+    return cube
+
+
+def with_parent_sectors(cube):
+    """
+    Target view of a sector cube: a copy in which each parent sector also
+    includes its sub-sectors. Sub-sectors are then counted twice, so never
+    sum this view across sectors; the input cube is left unchanged.
+    """
+    view = replace(cube, values=cube.values.copy())
+    axis = cube.axis("Sector")
+    for child, parent in SECTOR_PARENTS.items():
+        src = [slice(None)] * cube.values.ndim
+        dst = list(src)
+        src[axis], dst[axis] = TARGET_SECTORS.index(child), TARGET_SECTORS.index(parent)
+        view.values[tuple(dst)] += cube.values[tuple(src)]
+    return view
+
+
+def check_naics_paths():
+    """
+    Run the NAICS code paths on NAICS_FIXTURE, so they stay exercised while the
+    cleaned data carries no NAICS codes. Raises AssertionError listing every
+    failed check; returns the number of checks run.
+    """
+    from sector_targets import build_sector_lookup   # imports this module
+
+    rows = pd.DataFrame(NAICS_FIXTURE, columns=["Facility Province", "Reference Year", "Facility Description",
+                                                NAICS_COL, TOTAL_COL, "Expected Sector"])
+    rows[NAICS_COL] = rows[NAICS_COL].astype("Int64")
+    coded = rows[rows[NAICS_COL].notna()]
+    failures, checks = [], 0
+
+    def check(ok, message):
+        nonlocal checks
+        checks += 1
+        if not ok:
+            failures.append(message)
+
+    sectors = sector_for_naics(coded[NAICS_COL].to_numpy(dtype=np.int64))
+    for code, got, expected in zip(coded[NAICS_COL], sectors, coded["Expected Sector"]):
+        check(got == expected, f"sector_for_naics({code}) = {got}, expected {expected}")
+
+    rollup = naics_rollup(rows)
+    for level in NAICS_LEVELS:
+        expected = (coded.assign(**{"NAICS Prefix": naics_prefix(coded[NAICS_COL], level)})
+                    .groupby(["Facility Province", "Reference Year", "NAICS Prefix"])[TOTAL_COL].sum())
+        got = (rollup[rollup["NAICS Level"] == level]
+               .set_index(["Facility Province", "Reference Year", "NAICS Prefix"])[TOTAL_COL])
+        check(got.sort_index().equals(expected.sort_index()),
+              f"naics_rollup level {level} differs from a groupby over its {level}-digit prefix")
+
+    cube = naics_sector_cube(rows)
+    by_sector = (coded.assign(Sector=coded["Expected Sector"])
+                 .groupby(["Facility Province", "Sector", "Reference Year"])[TOTAL_COL].sum())
+    long = cube.to_long().set_index(["Facility Province", "Sector", "Reference Year"]).iloc[:, 0]
+    check(np.allclose(long.reindex(by_sector.index).to_numpy(), by_sector.to_numpy()) and len(long) == len(by_sector),
+          "naics_sector_cube totals differ from the expected sector of each coded row (missing codes must be dropped)")
+
+    view = with_parent_sectors(cube)
+    child, parent = next(iter(SECTOR_PARENTS.items()))
+    child_i, parent_i = TARGET_SECTORS.index(child), TARGET_SECTORS.index(parent)
+    check(np.allclose(view.values[:, parent_i], cube.values[:, parent_i] + cube.values[:, child_i]),
+          f"with_parent_sectors must add {child} into {parent}")
+    province_totals = coded.groupby(["Facility Province", "Reference Year"])[TOTAL_COL].sum().unstack(fill_value=0.0)
+    check(np.allclose(cube.values.sum(axis=1), province_totals.to_numpy()),
+          "the exclusive sector cube must still sum to province totals after with_parent_sectors")
+
+    lookup = build_sector_lookup(rows)
+    for desc, expected in [("In-situ Oil Sands Extraction", "Oil Sands"),
+                           ("Fossil-Fuel Electric Power Generation", "Electricity Generation"),
+                           ("Petrochemical Manufacturing", "Industry")]:
+        check(lookup.get(desc) == expected, f"build_sector_lookup[{desc!r}] = {lookup.get(desc)}, expected {expected}")
+
+    if failures:
+        raise AssertionError("NAICS self-check failed:\n" + "\n".join(failures))
+    return checks
+
+
+if __name__ == "__main__":
+    print(f"NAICS self-check passed on {len(NAICS_FIXTURE)} fixture rows ({check_naics_paths()} checks)")
+
+    emission_df = pd.read_csv(emissions_csv)
+
+    if NAICS_COL not in emission_df.columns:
+        print(f"⚠️ '{NAICS_COL}' not in cleaned data; re-run phase1_cleaning.py. Skipping NAICS rollups.")
+    else:
+        os.makedirs(OUT_DIR, exist_ok=True)
+
+        rollup = naics_rollup(emission_df)
+        rollup_csv = os.path.join(OUT_DIR, "naics_rollup_by_province_year.csv")
+        rollup.to_csv(rollup_csv, index=False)
+        print(f"Saved NAICS 2–6 digit rollups → {rollup_csv}")
+
+        # Each facility in one sector; Parent Sector marks rows a target view also counts in their parent
+        sector_totals = naics_sector_cube(emission_df).to_long()
+        sector_totals["Parent Sector"] = sector_totals["Sector"].map(SECTOR_PARENTS)
+        sector_csv = os.path.join(OUT_DIR, "naics_target_sector_totals.csv")
+        sector_totals.to_csv(sector_csv, index=False)
+        print(f"Saved target-sector totals from NAICS prefixes → {sector_csv}")
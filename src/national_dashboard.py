@@ -0,0 +1,178 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from carbon_budget import HORIZON_YEAR, province_year_totals
+from provinces import load_targets, province_target_paths
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/National")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+# Canada's net-zero year; the reference path falls linearly to zero by then
+NET_ZERO_YEAR = HORIZON_YEAR
+
+# Years reported in the per-province summary
+SUMMARY_YEARS = [2030, 2040, 2050]
+
+
+def national_dashboard(df, targets, net_zero_year=NET_ZERO_YEAR):
+    """
+    Province x year arrays for the national picture, from one aggregation.
+
+    Implied path: actuals, then each province's target path (provinces
+    without a resolvable province-wide target are held flat at their last
+    actual year). The net-zero reference path falls linearly from each
+    province's last actual value to zero in `net_zero_year`; the residual
+    gap is implied minus that reference. Returns a dict of arrays plus
+    provinces, years and which provinces follow a target path.
+    """
+    totals = province_year_totals(df).fillna(0.0)
+    hist_years = np.asarray(totals.columns, dtype=np.int64)
+    last_year = int(hist_years[-1])
+    years = np.arange(hist_years[0], net_zero_year + 1)
+
+    actual = totals.reindex(columns=years).to_numpy()                        # NaN after last_year
+    last = totals[last_year].to_numpy()[:, None]
+    target_paths = province_target_paths(totals, targets, years).to_numpy()
+    has_target = ~np.isnan(target_paths).all(axis=1)
+
+    future = years[None, :] >= last_year
+    projected = np.where(has_target[:, None], target_paths, np.broadcast_to(last, actual.shape))
+    implied = np.where(future, projected, actual)
+
+    progress = np.clip((years - last_year) / (net_zero_year - last_year), 0.0, 1.0)
+    net_zero = np.where(future, last * (1.0 - progress)[None, :], actual)
+    gap = implied - net_zero
+
+    national = implied.sum(axis=0)
+    national_gap = gap.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = implied / national * 100.0
+        contribution = np.where(national_gap > 0, gap / national_gap * 100.0, np.nan)
+
+    return {
+        "provinces": np.asarray(totals.index), "years": years, "last_year": last_year,
+        "has_target": has_target, "implied": implied, "net_zero": net_zero, "gap": gap,
+        "share": share, "contribution": contribution,
+        "national": national, "national_net_zero": net_zero.sum(axis=0), "national_gap": national_gap,
+    }
+
+
+def dashboard_tables(dash):
+    """(long province x year table, national by-year table, per-province summary)."""
+    provinces, years, last_year = dash["provinces"], dash["years"], dash["last_year"]
+    n_p, n_y = dash["implied"].shape
+    source = np.where(dash["has_target"], "Provincial targets", "Held flat (no resolvable target)")
+
+    by_year = pd.DataFrame({
+        "Province": np.repeat(provinces, n_y),
+        "Year": np.tile(years, n_p),
+        "Projected": np.tile(years > last_year, n_p),
+        "Path Source": np.repeat(source, n_y),
+        "Emissions (tonnes CO2e)": dash["implied"].ravel(),
+        "Share of National (%)": dash["share"].ravel(),
+        "Net-Zero Path (tonnes CO2e)": dash["net_zero"].ravel(),
+        "Gap to Net-Zero Path (tonnes CO2e)": dash["gap"].ravel(),
+        "Share of National Gap (%)": dash["contribution"].ravel(),
+    })
+
+    national = pd.DataFrame({
+        "Year": years,
+        "Projected": years > last_year,
+        "Implied National Emissions (tonnes CO2e)": dash["national"],
+        "Net-Zero Path (tonnes CO2e)": dash["national_net_zero"],
+        "Residual Gap (tonnes CO2e)": dash["national_gap"],
+    })
+
+    cols = np.searchsorted(years, [last_year] + [y for y in SUMMARY_YEARS if y <= years[-1]])
+    summary = pd.DataFrame({"Province": provinces, "Path Source": source,
+                            f"Share of National {last_year} (%)": dash["share"][:, cols[0]]})
+    for c in cols[1:]:
+        summary[f"Implied {years[c]} (tonnes CO2e)"] = dash["implied"][:, c]
+        summary[f"Gap to Net Zero {years[c]} (tonnes CO2e)"] = dash["gap"][:, c]
+        summary[f"Share of National Gap {years[c]} (%)"] = dash["contribution"][:, c]
+    summary = summary.sort_values(summary.columns[-1], ascending=False, na_position="last")
+    return by_year, national, summary
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+    targets = load_targets()
+
+    dash = national_dashboard(emission_df, targets)
+    by_year, national, summary = dashboard_tables(dash)
+    provinces, years, last_year = dash["provinces"], dash["years"], dash["last_year"]
+
+    held_flat = list(provinces[~dash["has_target"]])
+    if held_flat:
+        print(f"⚠️ No resolvable province-wide target for {held_flat}; held flat at {last_year} levels.")
+
+    for name, table in [("national_dashboard_by_province_year", by_year),
+                        ("national_dashboard_by_year", national),
+                        ("national_dashboard_summary", summary)]:
+        table_csv = os.path.join(OUT_DIR, f"{name}.csv")
+        table.to_csv(table_csv, index=False)
+        print(f"Saved {name.replace('_', ' ')} → {table_csv}")
+
+    # Plot 1: stacked province emissions (actual then implied) vs national net-zero path
+    order = np.argsort(-dash["implied"][:, years == last_year].ravel())
+    plt.figure(figsize=(12, 7))
+    plt.stackplot(years, dash["implied"][order] / 1e6, labels=provinces[order], alpha=0.85,
+                  colors=plt.cm.tab20(np.arange(len(order))))
+    plt.plot(years, dash["national_net_zero"] / 1e6, color="black", linestyle="--", label="Net-zero path")
+    plt.axvline(last_year, color="grey", linestyle=":", label=f"Last actual year ({last_year})")
+    plt.title("Canada — Provincial Emissions and Implied Path from Provincial Targets")
+    plt.xlabel("Year")
+    plt.ylabel("Emissions (Mt CO2e)")
+    plt.grid(True)
+    plt.legend(fontsize=8, loc="upper right")
+    plt.tight_layout()
+    stacked_png = os.path.join(OUT_DIR, "national_implied_path_stacked.png")
+    plt.savefig(stacked_png, dpi=200)
+    plt.show()
+    print(f"Saved implied national path plot → {stacked_png}")
+
+    # Plot 2: each province's share of national emissions (actual years)
+    hist = years <= last_year
+    plt.figure(figsize=(12, 6))
+    for k, p in enumerate(order):
+        plt.plot(years[hist], dash["share"][p, hist], marker="o", markersize=3, label=provinces[p],
+                 color=plt.cm.tab20(k))
+    plt.title("Province Share of National Facility Emissions")
+    plt.xlabel("Reference Year")
+    plt.ylabel("Share of National (%)")
+    plt.grid(True)
+    plt.legend(fontsize=8, ncol=2)
+    plt.tight_layout()
+    share_png = os.path.join(OUT_DIR, "national_province_shares.png")
+    plt.savefig(share_png, dpi=200)
+    plt.show()
+    print(f"Saved province share plot → {share_png}")
+
+    # Plot 3: who contributes most to the residual gap in each summary year
+    gap_years = [y for y in SUMMARY_YEARS if y <= years[-1]]
+    cols = np.searchsorted(years, gap_years)
+    gaps = dash["gap"][:, cols] / 1e6                                      # P x summary years
+    rank = np.argsort(-gaps[:, -1])
+    y = np.arange(len(rank))
+    height = 0.8 / len(gap_years)
+    plt.figure(figsize=(12, 7))
+    for k, year in enumerate(gap_years):
+        plt.barh(y + k * height, gaps[rank, k], height=height, label=str(year))
+    plt.yticks(y + 0.4 - height / 2, provinces[rank])
+    plt.gca().invert_yaxis()
+    plt.axvline(0, color="black", linewidth=1)
+    plt.title("Residual Gap to the Net-Zero Path by Province")
+    plt.xlabel("Implied Emissions minus Net-Zero Path (Mt CO2e)")
+    plt.grid(True, axis="x")
+    plt.legend()
+    plt.tight_layout()
+    gap_png = os.path.join(OUT_DIR, "national_gap_by_province.png")
+    plt.savefig(gap_png, dpi=200)
+    plt.show()
+    print(f"Saved gap contribution plot → {gap_png}")
@@ -4,6 +4,8 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from bootstrap import trend_band
+
 # ---------- Robust paths (run from anywhere) ----------
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
 DATA_DIR = os.path.join(BASE_DIR, "data")
@@ -107,6 +109,8 @@ if len(years) >= 2:
     z = np.polyfit(years, vals, 1)
     p = np.poly1d(z)
     plt.plot(years, p(years), linestyle="--", color="r", label="Trendline")
+    band_low, band_high = trend_band(years, vals)
+    plt.fill_between(years, band_low, band_high, color="r", alpha=0.15, label="90% bootstrap band")
 else:
     print("⚠️ Not enough points to compute a trendline.")
 plt.title("Total Emissions by Year in Newfoundland & Labrador")
@@ -4,6 +4,8 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from provinces import load_external_baselines
+
 # ---------- Robust paths (run from anywhere) ----------
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
 DATA_DIR = os.path.join(BASE_DIR, "data")
@@ -70,8 +72,9 @@ pei_targets_csv = os.path.join(OUT_DIR, "pei_targets_table.csv")
 pei_target.to_csv(pei_targets_csv, index=False)
 print(f"Saved PEI targets table → {pei_targets_csv}")
 
-# Your baseline numbers (in *tonnes*)
-baseline_year_emission_1990 = 1.78 * 1_000_000
+# Your baseline numbers (in *tonnes*); 1990 predates the facility data, so it comes
+# from the external baselines table (data/ExternalBaselines.csv)
+baseline_year_emission_1990 = float(load_external_baselines().at["Prince Edward Island", 1990])
 baseline_reduction_in_tonnes = baseline_year_emission_1990 - (1.2 * 1_000_000)
 annual_percentage_deduction = baseline_reduction_in_tonnes / (2030 - 1990)  # tonnes/year
 
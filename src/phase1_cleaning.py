@@ -1,6 +1,9 @@
 import pandas as pd
 import os
 
+from facility_resolution import resolve_facility_ids
+from validation import validate, write_report, print_summary, report_json
+
 # Ensure output directory exists
 os.makedirs("outputs", exist_ok=True)
 
@@ -12,15 +15,13 @@ os.makedirs("outputs", exist_ok=True)
 emission_df = pd.read_csv("data/GHGEmissions.csv")
 
 # Dropping columns unnecessary for analysis
+# (GHGRP ID, Latitude and Longitude are kept for facility identity resolution,
+#  the NAICS code for the NAICS hierarchy rollups)
 columns_to_drop = [
-    "GHGRP ID No. / No d'identification du PDGES",
     "Facility Location / Emplacement de l'installation",
     "Facility City or District or Municipality / Ville ou District ou Municipalité de l'installation",
-    "Latitude",
-    "Longitude",
     "Facility Postal Code / Code postal de l'installation",
     "Facility NPRI ID / Numéro d'identification de l'INRP",
-    "Facility NAICS Code / Code SCIAN de l'installation",
     "French Facility NAICS Code Description / Description du code SCIAN de l'installation en français",
     "Reporting Company Legal Name / Dénomination sociale de la société déclarante",
     "Reporting Company Business Number / Numéro d'entreprise de la société déclarante",
@@ -46,6 +47,8 @@ emission_df.drop(columns=columns_to_drop, inplace=True)
 # Renaming columns to remove french labels
 columns_rename_map = {
     "Reference Year / Année de référence": "Reference Year",
+    "GHGRP ID No. / No d'identification du PDGES": "GHGRP ID",
+    "Facility NAICS Code / Code SCIAN de l'installation": "Facility NAICS Code",
     "Facility Name / Nom de l'installation": "Facility Name",
     "Facility City or District or Municipality / Ville ou District ou Municipalité de l'installation": "Facility City",
     "Facility Province or Territory / Province ou territoire de l'installation": "Facility Province",
@@ -81,6 +84,9 @@ columns_rename_map = {
 
 emission_df.rename(columns=columns_rename_map, inplace=True)
 
+# Keep the 6-digit NAICS code as an integer so prefixes roll up with integer division
+emission_df["Facility NAICS Code"] = pd.to_numeric(emission_df["Facility NAICS Code"], errors="coerce").astype("Int64")
+
 # Dropping columns as the CO2 equivalent of these gases have been provided
 columns_to_drop_additional = [
     "CH4 (tonnes)",
@@ -137,10 +143,20 @@ columns_to_drop_gas = [
 emission_df.drop(columns=columns_to_drop_gas, inplace=True)
 
 # Impute missing values for reporting company
-emission_df["Reporting Company"].fillna(emission_df["Facility Name"], inplace=True)
+# (assigned back: a chained fillna(inplace=True) on a column no longer updates the frame under copy-on-write)
+emission_df["Reporting Company"] = emission_df["Reporting Company"].fillna(emission_df["Facility Name"])
 
 # Province fix for Fibrek SENC
-emission_df["Facility Province"].fillna("Quebec", inplace=True)
+emission_df["Facility Province"] = emission_df["Facility Province"].fillna("Quebec")
+
+# Stable Facility IDs across renamed / re-owned facilities (GHGRP ID, else name similarity)
+emission_df["Facility ID"] = resolve_facility_ids(emission_df)
+
+# Vectorized rule checks and duplicate detection over the cleaned frame
+validation_report = validate(emission_df)
+print_summary(validation_report)
+write_report(validation_report)
+print(f"Saved validation report → {report_json}")
 
 # Save cleaned dataset
 emission_df.to_csv("outputs/Cleaned_GHGEmissions.csv", index=False)
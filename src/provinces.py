@@ -0,0 +1,150 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+
+prov_targets_csv = os.path.join(BASE_DIR, "outputs/Cleaned_ProvincialTargets.csv")
+external_baselines_csv = os.path.join(BASE_DIR, "data/ExternalBaselines.csv")
+
+# Province -> (outputs sub-folder, file prefix) used by the provincial scripts
+PROVINCE_OUTPUTS = {
+    "British Columbia": ("BritishColumbia", "bc"),
+    "Alberta": ("Alberta", "ab"),
+    "Saskatchewan": ("Saskatchewan", "sk"),
+    "Manitoba": ("Manitoba", "mb"),
+    "Ontario": ("Ontario", "on"),
+    "Quebec": ("Quebec", "qc"),
+    "New Brunswick": ("NewBrunswick", "nb"),
+    "Nova Scotia": ("NovaScotia", "ns"),
+    "Prince Edward Island": ("PEI", "pei"),
+    "Newfoundland and Labrador": ("NewfoundlandLabrador", "nl"),
+}
+PROVINCES = list(PROVINCE_OUTPUTS)
+
+# Targets table spellings -> emissions data spellings
+PROVINCE_ALIASES = {
+    "Newfoundland & Labrador": "Newfoundland and Labrador",
+}
+
+
+def province_out_dir(province):
+    """outputs/<Province folder>, created on demand (None for territories)."""
+    if province not in PROVINCE_OUTPUTS:
+        return None
+    out_dir = os.path.join(BASE_DIR, "outputs", PROVINCE_OUTPUTS[province][0])
+    os.makedirs(out_dir, exist_ok=True)
+    return out_dir
+
+
+def _parse_number(value):
+    """'40' -> 40.0, '<1.2' -> 1.2, 'N/A' -> NaN."""
+    match = re.search(r"-?\d+(\.\d+)?", str(value))
+    return float(match.group()) if match else np.nan
+
+
+def _target_kind(row):
+    notes = str(row["Notes"]).lower()
+    if "cumulative" in notes:
+        return "cumulative"
+    # Whole words only, so notes mentioning "capture" or "capacity" are not read as caps
+    if re.search(r"\bcaps?\b", notes) or "not to exceed" in notes:
+        return "cap"
+    if row["Unit"] != "%":
+        return "threshold"
+    return "reduction"
+
+
+def load_targets(csv=prov_targets_csv):
+    """
+    Provincial targets with numeric years and bounds.
+
+    Adds Window Start / Window End (equal to Target Year unless the target
+    covers a range such as Manitoba's 2023–2027), and Kind: one of
+    "reduction" (% below baseline), "cap" / "threshold" (annual megatonne
+    limits) or "cumulative" (megatonnes summed over the window).
+    Open-ended years such as "Post-2030" map to their first year.
+    """
+    targets = pd.read_csv(csv)
+    targets["Province"] = targets["Province"].replace(PROVINCE_ALIASES)
+    targets["Notes"] = targets["Notes"].replace("N/A", "").fillna("")
+    targets["Kind"] = targets.apply(_target_kind, axis=1)
+
+    years = targets["Target Year"].fillna("").astype(str).str.findall(r"\d{4}")
+    targets["Window Start"] = years.map(lambda ys: int(ys[0]) if ys else np.nan).astype("Int64")
+    targets["Window End"] = years.map(lambda ys: int(ys[-1]) if ys else np.nan).astype("Int64")
+    targets["Target Year"] = targets["Window End"]
+    targets["Baseline Year"] = targets["Baseline Year"].map(_parse_number).astype("Int64")
+
+    for col in ["Reduction Lower Bound", "Reduction Upper Bound"]:
+        targets[col] = targets[col].map(_parse_number)
+
+    targets.index.name = "Target ID"
+    return targets
+
+
+def load_external_baselines(csv=external_baselines_csv):
+    """
+    Province x year baselines (tonnes) from outside the facility data, e.g.
+    1990 inventory totals for targets whose baseline predates 2004.
+    """
+    baselines = pd.read_csv(csv)
+    baselines["Province"] = baselines["Province"].replace(PROVINCE_ALIASES)
+    scale = np.where(baselines["Unit"] == "megatonnes", 1_000_000, 1)
+    baselines["Emissions (tonnes CO2e)"] = baselines["Emissions"].astype(float) * scale
+    return baselines.pivot_table(index="Province", columns="Year", values="Emissions (tonnes CO2e)", aggfunc="last")
+
+
+def target_levels(targets, province_year_totals):
+    """
+    Allowed annual emissions (tonnes) implied by each target.
+
+    `province_year_totals` is a province x year frame of tonnes. Reduction
+    targets resolve against the baseline-year total (NaN when the baseline
+    year is not in the data); cap/threshold targets are converted from
+    megatonnes. "Target Level (upper)" is the more ambitious end of a range.
+    """
+    levels = targets.copy()
+    baseline = np.full(len(levels), np.nan)
+    for i, (prov, year) in enumerate(zip(levels["Province"], levels["Baseline Year"])):
+        if prov in province_year_totals.index and not pd.isna(year) and year in province_year_totals.columns:
+            baseline[i] = province_year_totals.at[prov, year]
+    levels["Baseline Emissions"] = baseline
+
+    is_pct = levels["Kind"] == "reduction"
+    is_limit = levels["Kind"].isin(["cap", "threshold"])
+    for bound, col in [("lower", "Reduction Lower Bound"), ("upper", "Reduction Upper Bound")]:
+        levels[f"Target Level ({bound})"] = np.where(
+            is_pct, baseline * (1 - levels[col] / 100.0),
+            np.where(is_limit, levels[col] * 1_000_000, np.nan),
+        )
+    return levels
+
+
+def province_target_paths(province_year_totals, targets, years):
+    """
+    Province x year frame of the emissions path implied by each province's
+    province-wide targets: linear from its last actual year through every
+    target level (most ambitious end), then held flat after the last target.
+    Provinces without a resolvable target level are left NaN.
+    """
+    levels = target_levels(targets, province_year_totals)
+    levels = levels[(levels["Sector"] == "All") & levels["Target Level (upper)"].notna()]
+    last_year = int(max(province_year_totals.columns))
+    years = np.asarray(years)
+
+    paths = pd.DataFrame(np.nan, index=province_year_totals.index, columns=pd.Index(years, name="Year"))
+    for province, rows in levels.groupby("Province"):
+        if province not in province_year_totals.index:
+            continue
+        rows = rows[rows["Target Year"] > last_year].sort_values("Target Year")
+        if rows.empty:
+            continue
+        knots_x = np.concatenate(([last_year], rows["Target Year"].to_numpy(dtype=float)))
+        knots_y = np.concatenate(([province_year_totals.at[province, last_year]],
+                                  rows["Target Level (upper)"].to_numpy(dtype=float)))
+        knots_y = np.minimum.accumulate(knots_y)
+        paths.loc[province] = np.where(years >= last_year, np.interp(years, knots_x, knots_y), np.nan)
+    return paths
@@ -0,0 +1,180 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from emissions_cube import build_cube, TOTAL_COL
+from facility_index import build_facility_index
+from provinces import PROVINCE_OUTPUTS, PROVINCES, province_out_dir
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/RankStability")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+TOP_N = 10
+PERSIST_YEARS = 5         # "persistent" = in the top N in every one of the last PERSIST_YEARS years
+LABEL_CHARS = 28
+
+
+def grouped_cube(values, group_codes, n_groups):
+    """
+    Pack an entity x year matrix into a group x slot x year cube (NaN
+    padding), with slot_entity[g, s] the source row (-1 for padding).
+    """
+    order = np.argsort(group_codes, kind="stable")
+    codes = group_codes[order]
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    slot = np.arange(len(codes)) - starts[codes]
+    cube = np.full((n_groups, max(counts.max(), 1), values.shape[1]), np.nan)
+    cube[codes, slot] = values[order]
+    slot_entity = np.full(cube.shape[:2], -1)
+    slot_entity[codes, slot] = order
+    return cube, slot_entity
+
+
+def rank_matrices(cube):
+    """
+    Group x year x slot ranks (1 = largest emitter) from a single argsort
+    over the whole cube; slots not reporting in a year are NaN.
+    """
+    values = np.swapaxes(cube, 1, 2)                                         # G x Y x S
+    key = np.where(np.isnan(values) | (values <= 0), -np.inf, values)
+    order = np.argsort(-key, axis=-1, kind="stable")
+    ranks = np.empty(values.shape)
+    np.put_along_axis(ranks, order, np.broadcast_to(np.arange(1, values.shape[-1] + 1, dtype=float), values.shape), axis=-1)
+    return np.where(np.isinf(key), np.nan, ranks)
+
+
+def consecutive_kendall_tau(cube):
+    """
+    Kendall tau between each pair of consecutive years for every group at
+    once (group x transitions), over entities reporting in both years.
+    Entities present in both years are moved to the front and the slot
+    axis trimmed, so each transition is one group x n x n sign product.
+    """
+    n_groups, _, n_years = cube.shape
+    tau = np.full((n_groups, n_years - 1), np.nan)
+    for t in range(1, n_years):
+        a, b = cube[:, :, t - 1], cube[:, :, t]
+        both = (a > 0) & (b > 0)
+        m = both.sum(axis=1).max()
+        if m < 2:
+            continue
+        front = np.argsort(~both, axis=1, kind="stable")[:, :m]
+        a, b = np.take_along_axis(a, front, 1), np.take_along_axis(b, front, 1)
+        keep = np.take_along_axis(both, front, 1)
+        pair = keep[:, :, None] & keep[:, None, :] & ~np.eye(m, dtype=bool)[None]
+        concord = (np.sign(a[:, :, None] - a[:, None, :]) * np.sign(b[:, :, None] - b[:, None, :]))
+        n_pairs = pair.sum(axis=(1, 2))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tau[:, t - 1] = np.where(n_pairs > 0, np.where(pair, concord, 0.0).sum(axis=(1, 2)) / n_pairs, np.nan)
+    return tau
+
+
+def rank_stability(cube, slot_entity, group_labels, entity_labels, years, level):
+    """(per group-year mobility table, per-entity top-N persistence table, ranks) for one entity level."""
+    ranks = rank_matrices(cube)                                              # G x Y x S
+    tau = consecutive_kendall_tau(cube)
+    in_top = ranks <= TOP_N
+    turnover = (in_top[:, 1:] & ~in_top[:, :-1]).sum(axis=2)
+
+    n_groups, n_years, _ = ranks.shape
+    mobility = pd.DataFrame({
+        "Level": level,
+        "Province": np.repeat(group_labels, n_years - 1),
+        "Reference Year": np.tile(years[1:], n_groups),
+        "Entities Ranked": (~np.isnan(ranks[:, 1:])).sum(axis=2).ravel(),
+        "Kendall Tau vs Previous Year": tau.ravel(),
+        f"New Entries to Top {TOP_N}": turnover.ravel(),
+    })
+
+    years_in_top = in_top.sum(axis=1)                                         # G x S
+    persistent = in_top[:, -PERSIST_YEARS:].all(axis=1)
+    g, s = np.nonzero(years_in_top > 0)
+    with np.errstate(invalid="ignore"):
+        best = np.nanmin(np.where(np.isnan(ranks), np.inf, ranks), axis=1)
+    persistence = pd.DataFrame({
+        "Level": level,
+        "Province": group_labels[g],
+        "Entity": entity_labels[slot_entity[g, s]],
+        f"Years in Top {TOP_N}": years_in_top[g, s],
+        f"Persistent Top {TOP_N} (last {PERSIST_YEARS} years)": persistent[g, s],
+        "Best Rank": best[g, s],
+        f"Rank {years[0]}": ranks[g, 0, s],
+        f"Rank {years[-1]}": ranks[g, -1, s],
+    }).sort_values(["Province", f"Years in Top {TOP_N}", "Best Rank"], ascending=[True, False, True])
+    return mobility, persistence, ranks
+
+
+def bump_chart(ax, ranks, years, labels, top=TOP_N):
+    """Rank-over-time lines for the entities in the top `top` of the last year (rank 1 at the top)."""
+    leaders = np.flatnonzero(ranks[-1] <= top)
+    leaders = leaders[np.argsort(ranks[-1, leaders])]
+    for s in leaders:
+        line = np.where(ranks[:, s] <= 2 * top, ranks[:, s], np.nan)           # drop far-off years
+        ax.plot(years, line, marker="o", markersize=2)
+        ax.annotate(str(labels[s])[:LABEL_CHARS], (years[-1], ranks[-1, s]), xytext=(3, 0),
+                    textcoords="offset points", fontsize=5, va="center")
+    ax.set_ylim(2 * top + 0.5, 0.5)
+    ax.set_yticks([1, 5, 10, 15, 20])
+    ax.grid(True, alpha=0.3)
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+
+    # Facilities, grouped by province into one padded province x slot x year cube
+    index = build_facility_index(emission_df, [TOTAL_COL])
+    matrix, years = index.dense(TOTAL_COL, fill_value=np.nan)
+    provinces, codes = np.unique(index.info["Facility Province"].astype(str).to_numpy(), return_inverse=True)
+    fac_cube, fac_slots = grouped_cube(matrix, codes, len(provinces))
+    fac = rank_stability(fac_cube, fac_slots, provinces, index.info["Facility Name"].to_numpy(), years, "Facility")
+
+    # Sectors: the province x description cube already has one shared slot axis
+    cube = build_cube(emission_df, ["Facility Province", "Facility Description", "Reference Year"], TOTAL_COL,
+                      labels={"Reference Year": years})
+    sec_provinces, sectors, _ = cube.labels
+    sec_slots = np.broadcast_to(np.arange(len(sectors)), cube.values.shape[:2])
+    sec = rank_stability(np.where(cube.values > 0, cube.values, np.nan), sec_slots, sec_provinces, sectors,
+                         years, "Sector")
+
+    mobility = pd.concat([fac[0], sec[0]], ignore_index=True)
+    mobility_csv = os.path.join(OUT_DIR, "rank_mobility_by_year.csv")
+    mobility.to_csv(mobility_csv, index=False)
+    print(f"Saved Kendall tau and top-{TOP_N} turnover by province-year → {mobility_csv}")
+    persistence = pd.concat([fac[1], sec[1]], ignore_index=True)
+    persistence_csv = os.path.join(OUT_DIR, f"top{TOP_N}_persistence.csv")
+    persistence.to_csv(persistence_csv, index=False)
+    print(f"Saved top-{TOP_N} persistence → {persistence_csv}")
+
+    for province, (_, prefix) in PROVINCE_OUTPUTS.items():
+        rows = persistence[persistence["Province"] == province]
+        if rows.empty:
+            print(f"⚠️ No facilities for {province}; skipping rank stability table.")
+            continue
+        rows_csv = os.path.join(province_out_dir(province), f"{prefix}_top{TOP_N}_rank_persistence.csv")
+        rows.to_csv(rows_csv, index=False)
+        print(f"Saved {province} top-{TOP_N} rank persistence → {rows_csv}")
+
+    # Bump charts: facilities and sectors for every province
+    for level, (cube_values, slots, labels, group_labels) in {
+        "facility": (fac[2], fac_slots, index.info["Facility Name"].to_numpy(), provinces),
+        "sector": (sec[2], sec_slots, sectors, sec_provinces),
+    }.items():
+        fig, axes = plt.subplots(2, 5, figsize=(24, 10), squeeze=False)
+        for ax, province in zip(axes.ravel(), PROVINCES):
+            g = int(np.flatnonzero(group_labels == province)[0])
+            bump_chart(ax, cube_values[g], years, labels[np.maximum(slots[g], 0)])
+            ax.set_title(province, fontsize=10)
+        for ax in axes[:, 0]:
+            ax.set_ylabel("Rank")
+        fig.suptitle(f"Top-{TOP_N} {level.title()} Rankings Over Time (by {years[-1]} leaders)")
+        plt.tight_layout()
+        bump_png = os.path.join(OUT_DIR, f"{level}_rank_bump_charts.png")
+        plt.savefig(bump_png, dpi=200)
+        plt.show()
+        print(f"Saved {level} bump charts → {bump_png}")
@@ -0,0 +1,128 @@
+import os
+import warnings
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from numpy.lib.stride_tricks import sliding_window_view
+
+from changepoints import series_frame
+from emissions_cube import TOTAL_COL
+from facility_index import build_facility_index
+from provinces import PROVINCE_OUTPUTS, PROVINCES, province_out_dir
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/Rolling")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+WINDOWS = [3, 5]
+
+
+def rolling_aggregates(matrix, windows=WINDOWS):
+    """
+    Trailing-window statistics for every series (row) of a NaN-for-missing matrix.
+
+    Moving averages come from differences of one cumulative sum (and one
+    cumulative count, so windows with a missing year are NaN); rolling
+    min / max reduce a sliding_window_view; rolling CAGR compares each year
+    with the first year of its window. Every output is series x years,
+    NaN until a full window is available.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    n_series, n_years = matrix.shape
+    present = ~np.isnan(matrix)
+    zero = np.zeros((n_series, 1))
+    csum = np.concatenate([zero, np.cumsum(np.where(present, matrix, 0.0), axis=1)], axis=1)
+    ccount = np.concatenate([zero, np.cumsum(present, axis=1)], axis=1)
+
+    out = {}
+    for w in windows:
+        pad = np.full((n_series, w - 1), np.nan)
+        full = (ccount[:, w:] - ccount[:, :-w]) == w
+        mean = (csum[:, w:] - csum[:, :-w]) / w
+        out[f"{w}-Year Moving Average"] = np.concatenate([pad, np.where(full, mean, np.nan)], axis=1)
+
+        windows_view = sliding_window_view(matrix, w, axis=1)                # series x (years - w + 1) x w
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)                   # all-NaN windows
+            low, high = np.nanmin(windows_view, axis=2), np.nanmax(windows_view, axis=2)
+        out[f"{w}-Year Rolling Min"] = np.concatenate([pad, np.where(full, low, np.nan)], axis=1)
+        out[f"{w}-Year Rolling Max"] = np.concatenate([pad, np.where(full, high, np.nan)], axis=1)
+
+        start, end = matrix[:, :-(w - 1)], matrix[:, w - 1:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cagr = np.where((start > 0) & (end > 0), (end / start) ** (1.0 / (w - 1)) - 1.0, np.nan)
+        out[f"{w}-Year Rolling CAGR"] = np.concatenate([pad, cagr], axis=1)
+    return out
+
+
+def all_series(df):
+    """Province totals, province x sector and facility series as one labelled NaN-for-missing matrix."""
+    regional = series_frame(df)
+    regional_values = regional.to_numpy(dtype=float)
+    labels = pd.DataFrame({
+        "Level": np.where(regional.index.get_level_values("Sector") == "All", "Province", "Sector"),
+        "Facility Province": regional.index.get_level_values("Province"),
+        "Entity": [p if s == "All" else s for p, s in regional.index],
+    })
+    years = np.asarray(regional.columns, dtype=np.int64)
+
+    index = build_facility_index(df, [TOTAL_COL])
+    facility_values, _ = index.dense(TOTAL_COL, years=years, fill_value=np.nan)
+    facility_labels = pd.DataFrame({"Level": "Facility",
+                                    "Facility Province": index.info["Facility Province"].to_numpy(),
+                                    "Entity": index.info["Facility Name"].to_numpy()})
+    return (np.vstack([np.where(regional_values > 0, regional_values, np.nan), facility_values]),
+            pd.concat([labels, facility_labels], ignore_index=True), years)
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+
+    matrix, labels, years = all_series(emission_df)
+    stats = rolling_aggregates(matrix)
+
+    # Long table: one row per reported series-year
+    r, c = np.nonzero(~np.isnan(matrix))
+    table = labels.iloc[r].reset_index(drop=True)
+    table["Reference Year"] = years[c]
+    table["Emissions (tonnes CO2e)"] = matrix[r, c]
+    for name, values in stats.items():
+        table[name] = values[r, c]
+    table_csv = os.path.join(OUT_DIR, "rolling_aggregates.csv")
+    table.to_csv(table_csv, index=False)
+    print(f"Saved rolling aggregates for {len(labels)} series ({len(table):,} rows) → {table_csv}")
+
+    # Smoothed provincial totals next to each <prefix>_total_emissions_by_year.csv
+    totals = table[table["Level"] == "Province"]
+    for province, (_, prefix) in PROVINCE_OUTPUTS.items():
+        rows = totals[totals["Facility Province"] == province]
+        if rows.empty:
+            print(f"⚠️ No facilities for {province}; skipping rolling totals.")
+            continue
+        rows_csv = os.path.join(province_out_dir(province), f"{prefix}_total_emissions_rolling.csv")
+        rows.drop(columns=["Level", "Entity"]).to_csv(rows_csv, index=False)
+        print(f"Saved {province} rolling totals → {rows_csv}")
+
+    # Plot: provincial totals with 3- and 5-year moving averages
+    fig, axes = plt.subplots(2, 5, figsize=(20, 8), squeeze=False)
+    for ax, province in zip(axes.ravel(), PROVINCES):
+        rows = totals[totals["Facility Province"] == province]
+        ax.plot(rows["Reference Year"], rows["Emissions (tonnes CO2e)"] / 1e6, marker="o", markersize=3,
+                color="g", alpha=0.5, label="Actual")
+        for w, style in zip(WINDOWS, ["--", "-"]):
+            ax.plot(rows["Reference Year"], rows[f"{w}-Year Moving Average"] / 1e6, linestyle=style,
+                    label=f"{w}-yr moving average")
+        ax.set_title(province, fontsize=10)
+        ax.grid(True)
+    axes[0][0].legend(fontsize=8)
+    for ax in axes[:, 0]:
+        ax.set_ylabel("Emissions (Mt CO2e)")
+    fig.suptitle("Provincial Totals — 3- and 5-Year Moving Averages")
+    plt.tight_layout()
+    rolling_png = os.path.join(OUT_DIR, "province_moving_averages.png")
+    plt.savefig(rolling_png, dpi=200)
+    plt.show()
+    print(f"Saved province moving-average plot → {rolling_png}")
@@ -4,6 +4,11 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from attainment import attainment_years
+from bootstrap import trend_band
+from provinces import load_targets
+from sector_targets import evaluate_sector_targets, sector_cube
+
 # ---------- Robust paths (run from anywhere) ----------
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
 DATA_DIR = os.path.join(BASE_DIR, "data")
@@ -106,6 +111,8 @@ if len(years) >= 2:
     z = np.polyfit(years, vals, 1)
     p = np.poly1d(z)
     plt.plot(years, p(years), linestyle="--", color="g", label="Trendline")
+    band_low, band_high = trend_band(years, vals)
+    plt.fill_between(years, band_low, band_high, color="g", alpha=0.15, label="90% bootstrap band")
 else:
     print("⚠️ Not enough points to compute a trendline.")
 plt.title("Total Emissions by Year in Saskatchewan")
@@ -185,3 +192,58 @@ else:
     plt.savefig(sk_overlay_png, dpi=200)
     plt.show()
     print(f"Saved Saskatchewan overlay plot → {sk_overlay_png}")
+
+# =========================================================
+# Part 5 — Electricity Generation vs 40% sector target
+# =========================================================
+# Part 3 applies 30% to all emissions; the targets table's Saskatchewan target is
+# 40% below 2005 for Electricity Generation only, so evaluate that sector here.
+sk_targets = load_targets()
+sk_targets = sk_targets[sk_targets["Province"] == "Saskatchewan"]
+sk_sector_summary, sk_sector_by_year = evaluate_sector_targets(sector_cube(saskatchewan_emission_df), sk_targets)
+
+if sk_sector_summary.empty:
+    print("⚠️ No evaluable Saskatchewan sector targets; skipping sector target check.")
+else:
+    sk_sector_csv = os.path.join(OUT_DIR, "sk_sector_target_gaps_by_year.csv")
+    sk_sector_by_year.to_csv(sk_sector_csv, index=False)
+    print(f"Saved Saskatchewan sector target gaps → {sk_sector_csv}")
+
+    for _, row in sk_sector_summary.iterrows():
+        print(f"Saskatchewan {row['Sector']}: {row['Latest Emissions']/1e6:.2f} Mt in {row['Latest Year']} "
+              f"vs {row['Target Level (upper)']/1e6:.2f} Mt target for {row['Target Year']} ({row['Status']})")
+
+    plt.figure(figsize=(10, 6))
+    for target_id, row in sk_sector_summary.iterrows():
+        target = sk_targets.loc[target_id]
+        target_rows = sk_sector_by_year[sk_sector_by_year["Target ID"] == target_id]
+        plt.plot(target_rows["Reference Year"], target_rows["Actual Emissions"],
+                 marker="o", linestyle="-", color="g", label=f"Actual {row['Sector']}")
+        plt.plot(target_rows["Reference Year"], target_rows["Required Path (upper)"], linestyle="--", color="b",
+                 label=f"Linear path to {target['Reduction Upper Bound']:g}% below {int(row['Baseline Year'])} "
+                       f"by {int(row['Target Year'])}")
+    plt.title(f"Saskatchewan {', '.join(sk_sector_summary['Sector'].unique())} vs Sector Target")
+    plt.xlabel("Reference Year")
+    plt.ylabel("Emission (tonnes CO2e)")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    sk_sector_png = os.path.join(OUT_DIR, "sk_electricity_vs_sector_target.png")
+    plt.savefig(sk_sector_png, dpi=200)
+    plt.show()
+    print(f"Saved Saskatchewan sector target plot → {sk_sector_png}")
+
+# =========================================================
+# Part 6 — Year the trend crosses the sector target
+# =========================================================
+sk_attainment = attainment_years(saskatchewan_emission_df, sk_targets)
+if sk_attainment.empty:
+    print("⚠️ No Saskatchewan targets with a usable baseline; skipping attainment years.")
+else:
+    sk_attainment_csv = os.path.join(OUT_DIR, "sk_target_attainment_years.csv")
+    sk_attainment.to_csv(sk_attainment_csv)
+    print(f"Saved Saskatchewan target attainment years → {sk_attainment_csv}")
+    for _, row in sk_attainment.iterrows():
+        reached = "not by 2100" if pd.isna(row["Attainment Year"]) else f"{row['Attainment Year']:.0f}"
+        print(f"Saskatchewan {row['Sector']} ({row['Model']}): target reached {reached} "
+              f"vs {row['Target Year']} target date")
@@ -0,0 +1,171 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from emissions_cube import build_cube, TOTAL_COL
+from provinces import PROVINCE_OUTPUTS, province_out_dir
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/SectorCorrelation")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+MIN_REPORTED_YEARS = 15   # a sector needs this many reporting years in a province to be correlated
+TOP_PAIRS = 10            # strongest co-moving pairs listed per province
+LABEL_CHARS = 40
+
+
+MIN_COMMON_CHANGES = 10  # year-over-year changes two series must share to be correlated
+
+
+def reported_changes(values, min_years=MIN_REPORTED_YEARS):
+    """
+    Year-over-year changes of a (..., sector, year) array, with years that
+    report nothing (stored as 0 in the cube) set to NaN first, so entering or
+    leaving the GHGRP is never read as a change. Series reporting in fewer
+    than `min_years` years are all-NaN. Returns (changes, valid mask).
+    """
+    reported = np.where(values > 0, values, np.nan)
+    changes = np.diff(reported, axis=-1)
+    valid = (values > 0).sum(axis=-1) >= min_years
+    return np.where(valid[..., None], changes, np.nan), valid
+
+
+def masked_correlation(a, b, min_common=MIN_COMMON_CHANGES):
+    """
+    Pearson correlation between every row of `a` (..., S, T) and of `b`
+    (..., R, T) over the years both rows have a change, giving (..., S, R).
+
+    Missing changes are zeroed and tracked with a 0/1 mask, so the pairwise
+    counts, sums and sums of squares over shared years are all batched
+    matrix products; pairs sharing fewer than `min_common` changes, or with
+    no variation over them, are NaN.
+    """
+    ma, mb = (~np.isnan(a)).astype(float), (~np.isnan(b)).astype(float)
+    xa, xb = np.nan_to_num(a), np.nan_to_num(b)
+    ma_t, mb_t, xb_t = (np.swapaxes(m, -1, -2) for m in (ma, mb, xb))
+    n = ma @ mb_t
+    sa, sb = xa @ mb_t, ma @ xb_t
+    saa, sbb = (xa * xa) @ mb_t, ma @ (xb_t * xb_t)
+    sab = xa @ xb_t
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var = (n * saa - sa * sa) * (n * sbb - sb * sb)
+        corr = (n * sab - sa * sb) / np.sqrt(var)
+    return np.where((n >= min_common) & (var > 0), np.clip(corr, -1.0, 1.0), np.nan)
+
+
+def change_correlations(values, min_years=MIN_REPORTED_YEARS):
+    """
+    Correlation of year-over-year changes between every pair of sectors.
+
+    `values` is (..., sector, year), e.g. province x sector x year; the
+    correlations of all provinces come from batched products of the masked
+    change array with its transpose, each pair over the years both report,
+    giving (..., sector, sector).
+    """
+    changes, valid = reported_changes(values, min_years)
+    corr = masked_correlation(changes, changes)
+    valid &= ~np.isnan(np.diagonal(corr, axis1=-2, axis2=-1))              # too few changes or no variation
+    pair = valid[..., :, None] & valid[..., None, :]
+    return np.where(pair, corr, np.nan), valid
+
+
+def spectral_order(corr):
+    """
+    Order sectors so co-moving ones sit together: sort by the Fiedler vector
+    (second-smallest eigenvector) of the graph Laplacian of the affinity
+    (1 + corr) / 2 (NaN pairs count as 0 correlation), with NumPy's eigh in place of scipy's hierarchical clustering.
+    """
+    if len(corr) < 3:
+        return np.arange(len(corr))
+    affinity = (1.0 + np.nan_to_num(corr)) / 2.0                     # pairs with too few shared years: neutral
+    np.fill_diagonal(affinity, 0.0)
+    laplacian = np.diag(affinity.sum(axis=1)) - affinity
+    _, vectors = np.linalg.eigh(laplacian)
+    return np.argsort(vectors[:, 1], kind="stable")
+
+
+def plot_heatmap(corr, labels, title, out_png, show=False):
+    """Spectrally ordered correlation heatmap drawn as one image."""
+    order = spectral_order(corr)
+    size = max(8, 0.28 * len(labels) + 4)
+    plt.figure(figsize=(size + 2, size))
+    plt.imshow(corr[np.ix_(order, order)], cmap="RdBu_r", vmin=-1, vmax=1, interpolation="nearest")
+    plt.colorbar(label="Correlation of year-over-year changes", shrink=0.8)
+    short = [str(labels[i])[:LABEL_CHARS] for i in order]
+    plt.xticks(np.arange(len(order)), short, rotation=90, fontsize=7)
+    plt.yticks(np.arange(len(order)), short, fontsize=7)
+    plt.title(title)
+    plt.tight_layout()
+    plt.savefig(out_png, dpi=200)
+    if show:
+        plt.show()
+    else:
+        plt.close()
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+
+    cube = build_cube(emission_df, ["Facility Province", "Facility Description", "Reference Year"], TOTAL_COL)
+    provinces, sectors, years = cube.labels
+    values = cube.values                                                          # P x D x Y
+    national = values.sum(axis=0)
+
+    # Provinces and the national sum in one batch: (P + 1) x D x D
+    stacked = np.concatenate([values, national[None]], axis=0)
+    names = list(provinces) + ["Canada"]
+    corr, valid = change_correlations(stacked)
+
+    # Co-movement of each sector with its province total, over the years the sector reports
+    totals = stacked.sum(axis=1, keepdims=True)                                   # (P + 1) x 1 x Y
+    sector_changes, _ = reported_changes(stacked)
+    total_changes, _ = reported_changes(totals, min_years=0)
+    with_total = masked_correlation(sector_changes, total_changes)[..., 0]
+    last_change = sector_changes[..., -1]
+    g, d = np.nonzero(valid)
+    comovement = pd.DataFrame({
+        "Province": np.asarray(names)[g],
+        "Facility Description": sectors[d],
+        "Correlation with Province Total Change": with_total[g, d],
+        f"{years[-2]}→{years[-1]} Change (tonnes CO2e)": last_change[g, d],
+        "Share of Province Change Variance (%)": (np.nanvar(sector_changes[g, d], axis=-1) /
+                                                   np.diff(totals, axis=-1)[g, 0].var(axis=-1) * 100.0),
+    }).sort_values(["Province", "Correlation with Province Total Change"], ascending=[True, False])
+    comovement_csv = os.path.join(OUT_DIR, "sector_total_comovement.csv")
+    comovement.to_csv(comovement_csv, index=False)
+    print(f"Saved sector co-movement with province totals → {comovement_csv}")
+
+    # Strongest pairs per province (upper triangle only)
+    upper = np.triu(np.ones((len(sectors), len(sectors)), dtype=bool), k=1)
+    g, a, b = np.nonzero(~np.isnan(corr) & upper[None])
+    pairs = pd.DataFrame({"Province": np.asarray(names)[g], "Sector A": sectors[a], "Sector B": sectors[b],
+                          "Correlation": corr[g, a, b]})
+    pairs["_abs"] = pairs["Correlation"].abs()
+    pairs = (pairs.sort_values("_abs", ascending=False).groupby("Province").head(TOP_PAIRS)
+             .sort_values(["Province", "_abs"], ascending=[True, False]).drop(columns="_abs"))
+    pairs_csv = os.path.join(OUT_DIR, "top_sector_change_correlations.csv")
+    pairs.to_csv(pairs_csv, index=False)
+    print(f"Saved strongest co-moving sector pairs → {pairs_csv}")
+
+    for i, province in enumerate(provinces):
+        if province not in PROVINCE_OUTPUTS:
+            continue
+        keep = np.flatnonzero(valid[i])
+        if len(keep) < 2:
+            print(f"⚠️ Fewer than two sectors with {MIN_REPORTED_YEARS}+ reporting years in {province}; skipping heatmap.")
+            continue
+        prefix = PROVINCE_OUTPUTS[province][1]
+        out_png = os.path.join(province_out_dir(province), f"{prefix}_sector_change_correlation.png")
+        plot_heatmap(corr[i][np.ix_(keep, keep)], sectors[keep],
+                     f"{province} — Correlation of Year-over-Year Sector Changes", out_png)
+        print(f"Saved {province} sector correlation heatmap → {out_png}")
+
+    keep = np.flatnonzero(valid[-1])
+    national_png = os.path.join(OUT_DIR, "national_sector_change_correlation.png")
+    plot_heatmap(corr[-1][np.ix_(keep, keep)], sectors[keep],
+                 "Canada — Correlation of Year-over-Year Sector Changes", national_png, show=True)
+    print(f"Saved national sector correlation heatmap → {national_png}")
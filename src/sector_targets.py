@@ -0,0 +1,200 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from emissions_cube import build_cube, TOTAL_COL
+from naics_rollup import NAICS_COL, OTHER_SECTOR, TARGET_SECTORS, sector_for_naics, with_parent_sectors
+from provinces import load_targets
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/SectorTargets")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+SECTOR_DIMS = ["Facility Province", "Sector", "Reference Year"]
+
+# Facility Description keyword rules, used when NAICS codes are not in the cleaned data.
+# First match wins; descriptions no rule matches are reported and counted as Other.
+DESCRIPTION_SECTOR_RULES = [
+    ("Electricity Generation", r"electric power generation"),
+    ("Oil Sands", r"in-situ oil sands|mined oil sands|non-conventional oil"),
+    ("Oil and Gas", r"oil and gas|natural gas|crude oil|all other pipeline|petroleum refineries|petroleum product wholesal"),
+    # Transport services only: "... Transportation Equipment Manufacturing" is Industry
+    ("Transportation", r"(air|rail|water|truck|ground passenger|transit) transportation|"
+                       r"support activities for (air |road |rail |water )?transportation|"
+                       r"freight|trucking|marine cargo|port and harbour|warehousing"),
+    ("Buildings & Communities", r"universit|hospital|colleges|schools|public administration|defence|waste|sewage|"
+                                r"remediation|material recovery|water supply|casino|laundry|head offices|"
+                                r"data processing|retailers|professional|steam and air-conditioning|"
+                                r"electric power distribution|electric bulk power"),
+    ("Industry", r"manufactur|mining|quarrying|mills\b|milling|foundries|smelting|refining|rolling|forging|"
+                 r"slaughter|processing|canning|breweries|distilleries|machine shops|stamping|steel wire|"
+                 r"heat treating|wood preservation|primary production of alumina|construction"),
+    (OTHER_SECTOR, r"grown under cover|floriculture|forest nurseries"),
+]
+
+
+def rule_sector(description):
+    """Target sector of a Facility Description from DESCRIPTION_SECTOR_RULES (None if no rule matches)."""
+    text = str(description).lower()
+    return next((sector for sector, pattern in DESCRIPTION_SECTOR_RULES if re.search(pattern, text)), None)
+
+
+def build_sector_lookup(df):
+    """
+    Facility Description -> target sector, computed once per distinct description.
+
+    With NAICS codes each description takes the sector of its most common
+    code; otherwise DESCRIPTION_SECTOR_RULES are applied to the text.
+    Descriptions matching no rule are listed in a warning and mapped to Other.
+    """
+    descriptions = pd.unique(df["Facility Description"].dropna())
+    if NAICS_COL in df.columns and df[NAICS_COL].notna().any():
+        coded = df[df[NAICS_COL].notna()]
+        by_code = pd.Series(sector_for_naics(coded[NAICS_COL].to_numpy(dtype=np.int64)), index=coded.index)
+        from_naics = by_code.groupby(coded["Facility Description"]).agg(lambda s: s.mode().iat[0])
+    else:
+        from_naics = pd.Series(dtype=object)
+
+    lookup, unmatched = {}, []
+    for desc in descriptions:
+        if desc in from_naics.index:
+            lookup[desc] = from_naics[desc]
+            continue
+        sector = rule_sector(desc)
+        if sector is None:
+            unmatched.append(desc)
+            sector = OTHER_SECTOR
+        lookup[desc] = sector
+    if unmatched:
+        print(f"⚠️ {len(unmatched)} Facility Descriptions match no sector rule; counted as {OTHER_SECTOR}: "
+              + "; ".join(sorted(unmatched)))
+    return lookup
+
+
+def sector_cube(df, value_col=TOTAL_COL, lookup=None):
+    """Province x target sector x year cube, each facility in one sector (see with_parent_sectors for targets)."""
+    lookup = lookup or build_sector_lookup(df)
+    codes, descriptions = pd.factorize(df["Facility Description"])
+    sectors = np.array([lookup.get(d) or rule_sector(d) or OTHER_SECTOR for d in descriptions], dtype=object)[codes]
+    cube = build_cube(df.assign(Sector=sectors), SECTOR_DIMS, value_col, labels={"Sector": TARGET_SECTORS})
+    return cube
+
+
+def evaluate_sector_targets(cube, targets):
+    """
+    Actual vs target-range gaps for every sector reduction target at once.
+
+    `cube` comes from sector_cube(); targets are read from its
+    with_parent_sectors() view, so Oil and Gas includes oil sands.
+    Each target row picks one (province, sector) series out of the cube by
+    fancy indexing, so baselines, required linear paths and gaps for all
+    targets and years are plain broadcasted array expressions.
+    Returns (summary per target for the latest year, long per-year table).
+    """
+    cube = with_parent_sectors(cube)
+    years = np.asarray(cube.labels[2])
+    provinces = list(cube.labels[0])
+    sel = targets[(targets["Target Type"] == "Sector") & (targets["Kind"] == "reduction")
+                  & targets["Sector"].isin(TARGET_SECTORS) & targets["Province"].isin(provinces)
+                  & targets["Baseline Year"].isin(years)]
+
+    p_idx = np.array([provinces.index(p) for p in sel["Province"]], dtype=int)
+    s_idx = np.array([TARGET_SECTORS.index(s) for s in sel["Sector"]], dtype=int)
+    b_idx = np.searchsorted(years, sel["Baseline Year"].to_numpy(dtype=np.int64))
+
+    series = cube.values[p_idx, s_idx, :]                           # targets x years
+    baseline = series[np.arange(len(sel)), b_idx]
+    lower = sel["Reduction Lower Bound"].to_numpy(dtype=float) / 100.0
+    upper = sel["Reduction Upper Bound"].to_numpy(dtype=float) / 100.0
+    level_lo = baseline * (1 - lower)                               # least ambitious end of the range
+    level_hi = baseline * (1 - upper)                               # most ambitious end of the range
+
+    base_year = sel["Baseline Year"].to_numpy(dtype=float)
+    target_year = sel["Target Year"].to_numpy(dtype=float)
+    progress = np.clip((years[None, :] - base_year[:, None]) / (target_year - base_year)[:, None], 0.0, None)
+    path_lo = baseline[:, None] + (level_lo - baseline)[:, None] * progress
+    path_hi = baseline[:, None] + (level_hi - baseline)[:, None] * progress
+
+    # Sectors with nothing reported in the baseline year (e.g. below the pre-2017
+    # reporting threshold) have no meaningful % change
+    has_baseline = baseline > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_pct = np.where(has_baseline[:, None], (series / baseline[:, None] - 1.0) * 100.0, np.nan)
+
+    latest = series[:, -1]
+    status = np.select([~has_baseline, latest <= level_hi, latest <= level_lo],
+                       ["No baseline", "Below range", "Within range"], "Above range")
+    summary = pd.DataFrame({
+        "Province": sel["Province"].to_numpy(),
+        "Sector": sel["Sector"].to_numpy(),
+        "Baseline Year": sel["Baseline Year"].to_numpy(),
+        "Target Year": sel["Target Year"].to_numpy(),
+        "Baseline Emissions": baseline,
+        "Target Level (lower)": level_lo,
+        "Target Level (upper)": level_hi,
+        "Latest Year": years[-1],
+        "Latest Emissions": latest,
+        "Change from Baseline (%)": change_pct[:, -1],
+        "Gap to Range Top (tonnes CO2e)": latest - level_lo,
+        "Gap to Range Bottom (tonnes CO2e)": latest - level_hi,
+        "Status": status,
+    }, index=sel.index)
+
+    n_t, n_y = series.shape
+    by_year = pd.DataFrame({
+        "Target ID": np.repeat(sel.index.to_numpy(), n_y),
+        "Province": np.repeat(sel["Province"].to_numpy(), n_y),
+        "Sector": np.repeat(sel["Sector"].to_numpy(), n_y),
+        "Reference Year": np.tile(years, n_t),
+        "Actual Emissions": series.ravel(),
+        "Change from Baseline (%)": change_pct.ravel(),
+        "Required Path (lower)": path_lo.ravel(),
+        "Required Path (upper)": path_hi.ravel(),
+        "Gap to Required Path (upper)": (series - path_hi).ravel(),
+    })
+    return summary, by_year
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+    targets = load_targets()
+
+    lookup = build_sector_lookup(emission_df)
+    lookup_csv = os.path.join(OUT_DIR, "facility_description_sector_lookup.csv")
+    pd.Series(lookup, name="Sector").rename_axis("Facility Description").sort_index().to_csv(lookup_csv)
+    print(f"Saved description → sector lookup → {lookup_csv}")
+
+    cube = sector_cube(emission_df, lookup=lookup)
+    summary, by_year = evaluate_sector_targets(cube, targets)
+
+    summary_csv = os.path.join(OUT_DIR, "sector_target_gaps.csv")
+    summary.to_csv(summary_csv)
+    print(f"Saved sector target gaps → {summary_csv}")
+    by_year_csv = os.path.join(OUT_DIR, "sector_target_gaps_by_year.csv")
+    by_year.to_csv(by_year_csv, index=False)
+    print(f"Saved sector target gaps by year → {by_year_csv}")
+
+    # One panel per sector target: actual vs required range path
+    n = len(summary)
+    if n:
+        fig, axes = plt.subplots(1, n, figsize=(4.5 * n, 4.5), squeeze=False)
+        for ax, (target_id, row) in zip(axes[0], summary.iterrows()):
+            sub = by_year[by_year["Target ID"] == target_id]
+            ax.plot(sub["Reference Year"], sub["Actual Emissions"] / 1e6, marker="o", label="Actual")
+            ax.fill_between(sub["Reference Year"], sub["Required Path (upper)"] / 1e6,
+                            sub["Required Path (lower)"] / 1e6, color="green", alpha=0.2, label="Target range path")
+            ax.set_title(f"{row['Province']}\n{row['Sector']}", fontsize=10)
+            ax.set_xlabel("Reference Year")
+            ax.grid(True)
+        axes[0][0].set_ylabel("Emissions (Mt CO2e)")
+        axes[0][0].legend(fontsize=8)
+        plt.tight_layout()
+        sector_png = os.path.join(OUT_DIR, "sector_targets_actual_vs_path.png")
+        plt.savefig(sector_png, dpi=200)
+        plt.show()
+        print(f"Saved sector target plot → {sector_png}")
@@ -0,0 +1,189 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from emissions_cube import TOTAL_COL
+from facility_index import build_facility_index
+from provinces import PROVINCES
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/Trajectories")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+N_CLUSTERS = 20        # over-clustered, then each centroid is labelled with one of four archetypes
+BATCH_SIZE = 256
+N_ITER = 200
+RANDOM_SEED = 42
+
+ARCHETYPES = ["Steady", "Declining", "Ramping", "Step-down / closed"]
+TREND_CUTOFF = 0.25       # fitted change over the period, as a share of the peak
+CLOSED_LEVEL = 0.15       # final level (share of peak) below which a shape counts as closed
+STEP_DROP = 0.35          # single-year drop (share of peak) that marks a step-down, if not recovered
+
+
+def gap_filled_matrix(matrix):
+    """
+    Facility x year shapes from a NaN-for-unreported matrix.
+
+    Interior gaps are interpolated linearly, years before a facility's
+    first report take its first value (history before entering the GHGRP
+    is unknown, not zero) and years after its last report are 0 (closed or
+    below threshold). Rows are then scaled to a peak of 1.
+    """
+    n_fac, n_years = matrix.shape
+    reported = ~np.isnan(matrix)
+    cols = np.arange(n_years)
+    first = np.argmax(reported, axis=1)
+    last = n_years - 1 - np.argmax(reported[:, ::-1], axis=1)
+
+    # Previous / next reported column of every cell, via running max / min of reported positions
+    prev_idx = np.maximum.accumulate(np.where(reported, cols, -1), axis=1)
+    next_idx = np.minimum.accumulate(np.where(reported, cols, n_years)[:, ::-1], axis=1)[:, ::-1]
+    rows = np.arange(n_fac)[:, None]
+    prev_val = matrix[rows, np.clip(prev_idx, 0, n_years - 1)]
+    next_val = matrix[rows, np.clip(next_idx, 0, n_years - 1)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frac = (cols - prev_idx) / (next_idx - prev_idx)
+    filled = np.where(reported, matrix, prev_val + frac * (next_val - prev_val))
+    filled = np.where(cols < first[:, None], matrix[np.arange(n_fac), first][:, None], filled)
+    filled = np.where(cols > last[:, None], 0.0, filled)
+    filled = np.clip(np.nan_to_num(filled), 0.0, None)
+
+    peak = filled.max(axis=1, keepdims=True)
+    return np.where(peak > 0, filled / np.where(peak > 0, peak, 1.0), 0.0)
+
+
+def _sq_distances(x, centers):
+    """Squared Euclidean distances (rows x centers) from one matrix product."""
+    return np.maximum((x * x).sum(axis=1)[:, None] - 2.0 * x @ centers.T + (centers * centers).sum(axis=1)[None, :], 0.0)
+
+
+def minibatch_kmeans(x, k=N_CLUSTERS, batch_size=BATCH_SIZE, n_iter=N_ITER, seed=RANDOM_SEED):
+    """
+    Mini-batch k-means (Sculley, 2010) with k-means++ seeding.
+
+    Each step assigns a random batch to its nearest centers and moves every
+    touched center toward its batch mean with a per-center learning rate of
+    batch count / total count seen, so the cost per step is independent of
+    the number of facilities. Returns (centers, labels for every row).
+    """
+    rng = np.random.default_rng(seed)
+    n = len(x)
+    centers = x[[rng.integers(n)]]
+    for _ in range(1, k):
+        d2 = _sq_distances(x, centers).min(axis=1)
+        probs = d2 / d2.sum() if d2.sum() > 0 else np.full(n, 1.0 / n)
+        centers = np.vstack([centers, x[rng.choice(n, p=probs)]])
+
+    seen = np.zeros(k)
+    for _ in range(n_iter):
+        batch = x[rng.integers(0, n, min(batch_size, n))]
+        labels = np.argmin(_sq_distances(batch, centers), axis=1)
+        counts = np.bincount(labels, minlength=k).astype(float)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, batch)
+        seen += counts
+        hit = counts > 0
+        eta = counts[hit] / seen[hit]
+        centers[hit] = (1.0 - eta)[:, None] * centers[hit] + eta[:, None] * sums[hit] / counts[hit][:, None]
+    return centers, np.argmin(_sq_distances(x, centers), axis=1)
+
+
+def centroid_archetypes(centers):
+    """Map each (peak-normalized) centroid shape to an archetype name."""
+    n_years = centers.shape[1]
+    t = np.arange(n_years) - (n_years - 1) / 2.0
+    slope = (centers - centers.mean(axis=1, keepdims=True)) @ t / (t @ t)
+    change = slope * (n_years - 1) / np.maximum(centers.max(axis=1), 1e-12)
+    final = centers[:, -1] / np.maximum(centers.max(axis=1), 1e-12)
+    biggest_drop = np.max(-np.diff(centers, axis=1), axis=1) / np.maximum(centers.max(axis=1), 1e-12)
+    return np.select(
+        [(final < CLOSED_LEVEL) | ((biggest_drop > STEP_DROP) & (final < 1.0 - STEP_DROP)),
+         change < -TREND_CUTOFF, change > TREND_CUTOFF],
+        ["Step-down / closed", "Declining", "Ramping"], "Steady")
+
+
+def cluster_trajectories(df, k=N_CLUSTERS, seed=RANDOM_SEED):
+    """(per-facility table with cluster and archetype, centroid matrix, centroid archetypes, years)."""
+    index = build_facility_index(df, [TOTAL_COL])
+    matrix, years = index.dense(TOTAL_COL, fill_value=np.nan)
+    shapes = gap_filled_matrix(matrix)
+    centers, labels = minibatch_kmeans(shapes, k=k, seed=seed)
+    archetypes = centroid_archetypes(centers)
+
+    table = index.info.reset_index()
+    table["Years Reported"] = (~np.isnan(matrix)).sum(axis=1)
+    table["Cluster"] = labels
+    table["Archetype"] = archetypes[labels]
+    table["Cumulative Emissions (tonnes CO2e)"] = np.nansum(matrix, axis=1)
+    table[f"{years[-1]} Emissions (tonnes CO2e)"] = np.nan_to_num(matrix[:, -1])
+    return table, centers, archetypes, years
+
+
+def archetype_summary(table, last_year):
+    """Per-province archetype counts and shares of cumulative and latest-year emissions."""
+    cum_col, last_col = "Cumulative Emissions (tonnes CO2e)", f"{last_year} Emissions (tonnes CO2e)"
+    grouped = table.groupby(["Facility Province", "Archetype"])
+    summary = grouped.agg(**{"Facilities": ("Cluster", "size"), cum_col: (cum_col, "sum"), last_col: (last_col, "sum")})
+    province_sums = summary.groupby(level="Facility Province")[[cum_col, last_col]].transform("sum")
+    summary["Share of Cumulative Emissions (%)"] = summary[cum_col] / province_sums[cum_col] * 100.0
+    summary[f"Share of {last_year} Emissions (%)"] = summary[last_col] / province_sums[last_col] * 100.0
+    return summary.reset_index()
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+
+    start = time.perf_counter()
+    table, centers, archetypes, years = cluster_trajectories(emission_df)
+    print(f"Clustered {len(table)} facility trajectories into {N_CLUSTERS} clusters in {time.perf_counter() - start:.2f}s")
+
+    table_csv = os.path.join(OUT_DIR, "facility_trajectory_archetypes.csv")
+    table.to_csv(table_csv, index=False)
+    print(f"Saved facility archetypes → {table_csv}")
+
+    centroid_table = pd.DataFrame(centers, columns=years)
+    centroid_table.insert(0, "Archetype", archetypes)
+    centroid_table.insert(1, "Facilities", np.bincount(table["Cluster"], minlength=len(centers)))
+    centroids_csv = os.path.join(OUT_DIR, "trajectory_cluster_centroids.csv")
+    centroid_table.to_csv(centroids_csv, index_label="Cluster")
+    print(f"Saved cluster centroids → {centroids_csv}")
+
+    summary = archetype_summary(table, int(years[-1]))
+    summary_csv = os.path.join(OUT_DIR, "province_archetype_summary.csv")
+    summary.to_csv(summary_csv, index=False)
+    print(f"Saved per-province archetype counts and shares → {summary_csv}")
+
+    # Plot: centroid shapes (left) and each province's cumulative emissions by archetype (right)
+    colors = dict(zip(ARCHETYPES, ["tab:blue", "tab:green", "tab:red", "tab:gray"]))
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(18, 7))
+    sizes = np.bincount(table["Cluster"], minlength=len(centers))
+    for archetype in ARCHETYPES:
+        members = np.flatnonzero(archetypes == archetype)
+        for i, c in enumerate(members):
+            ax1.plot(years, centers[c], color=colors[archetype], marker="o", markersize=3, alpha=0.8,
+                     label=f"{archetype} ({len(members)} clusters, n={sizes[members].sum()})" if i == 0 else None)
+    ax1.set_title("Cluster Centroids (peak-normalized trajectories)")
+    ax1.set_xlabel("Reference Year")
+    ax1.set_ylabel("Share of facility peak")
+    ax1.legend(fontsize=8)
+    ax1.grid(True)
+
+    shares = summary.pivot(index="Facility Province", columns="Archetype", values="Share of Cumulative Emissions (%)")
+    shares = shares.reindex(index=[p for p in PROVINCES if p in shares.index], columns=ARCHETYPES).fillna(0.0)
+    shares.plot(kind="barh", stacked=True, ax=ax2, color=[colors[a] for a in ARCHETYPES])
+    ax2.set_title("Share of Cumulative Emissions by Trajectory Archetype")
+    ax2.set_xlabel("Share (%)")
+    ax2.set_ylabel("")
+    ax2.legend(fontsize=8, bbox_to_anchor=(1.02, 1), loc="upper left")
+    ax2.grid(True, axis="x")
+    plt.tight_layout()
+    archetype_png = os.path.join(OUT_DIR, "trajectory_archetypes.png")
+    plt.savefig(archetype_png, dpi=200)
+    plt.show()
+    print(f"Saved trajectory archetype plot → {archetype_png}")
@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import numpy as np
+import pandas as pd
+
+from facility_index import GAS_COLUMNS, TOTAL_COL
+from provinces import PROVINCES
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+report_json = os.path.join(OUT_DIR, "Data_Validation_Report.json")
+
+TERRITORIES = ["Yukon", "Northwest Territories", "Nunavut"]
+KNOWN_PROVINCES = PROVINCES + TERRITORIES
+
+FIRST_YEAR = 2004                       # first GHGRP reporting year
+LAST_YEAR = 2023                        # latest reporting year in the published data; bump on refresh
+
+# Total vs gas sum: flagged when off by more than both the absolute and the relative tolerance
+TOTAL_TOLERANCE_T = 1.0
+TOTAL_TOLERANCE_REL = 0.01
+
+MAX_REPORTED_ROWS = 100                 # row indices listed per rule / duplicate groups listed
+
+
+NAME_KEY_COLUMNS = ["Facility Province", "Facility Name", "Facility Description"]
+
+
+def facility_keys(df):
+    """
+    (Reference Year, facility key) frame identifying a facility within a year:
+    the GHGRP ID (else Facility ID) where present, and name + province +
+    description for rows missing it, so rows with a NaN ID are not all one facility.
+    Returns (key frame, description of the key).
+    """
+    name_key = "N:" + df[NAME_KEY_COLUMNS[0]].astype(str)
+    for col in NAME_KEY_COLUMNS[1:]:
+        name_key = name_key + "|" + df[col].astype(str)
+    for col in ["GHGRP ID", "Facility ID"]:
+        if col in df.columns:
+            ids = df[col].astype("string").str.strip()
+            has_id = ids.notna() & (ids != "")
+            key = ("I:" + ids.fillna("")).where(has_id, name_key)
+            return (pd.DataFrame({"Reference Year": df["Reference Year"], "Facility Key": key}),
+                    ["Reference Year", f"{col} (else {' + '.join(NAME_KEY_COLUMNS)})"])
+    return (pd.DataFrame({"Reference Year": df["Reference Year"], "Facility Key": name_key}),
+            ["Reference Year"] + NAME_KEY_COLUMNS)
+
+
+def rule_masks(df, year_range=(FIRST_YEAR, LAST_YEAR)):
+    """
+    One boolean row mask per rule, each a single vectorized comparison over
+    the whole frame. Rules on columns the frame does not carry are skipped.
+    `year_range` is the inclusive (first, last) valid Reference Year.
+    """
+    gas_cols = [c for c in GAS_COLUMNS if c in df.columns and c != TOTAL_COL]
+    gases = df[gas_cols].to_numpy(dtype=float)
+    total = df[TOTAL_COL].to_numpy(dtype=float)
+    year = pd.to_numeric(df["Reference Year"], errors="coerce").to_numpy(dtype=float)
+    first_year, last_year = year_range
+
+    gas_sum = np.nansum(gases, axis=1)
+    tolerance = np.maximum(TOTAL_TOLERANCE_T, TOTAL_TOLERANCE_REL * np.abs(total))
+    masks = {
+        "missing_total_emissions": np.isnan(total),
+        "negative_emissions": (gases < 0).any(axis=1) | (total < 0),
+        "missing_gas_values": np.isnan(gases).any(axis=1),
+        "total_not_equal_gas_sum": np.abs(total - gas_sum) > tolerance,
+        "unknown_province": ~df["Facility Province"].isin(KNOWN_PROVINCES).to_numpy(),
+        "year_out_of_range": ~((year >= first_year) & (year <= last_year)),
+    }
+    for col in ["Facility Name", "Reporting Company"]:
+        if col in df.columns:
+            masks[f"missing_{col.lower().replace(' ', '_')}"] = df[col].isna().to_numpy()
+    return masks
+
+
+def duplicate_groups(frame):
+    """
+    Groups of rows of `frame` with equal values in every column. Each row is
+    hashed once (pd.util.hash_pandas_object) and the 64-bit hashes sorted;
+    rows sharing a hash are only candidates, confirmed by comparing their
+    actual values so a hash collision cannot report a false duplicate.
+    Returns (duplicated row mask, list of row-position arrays, one per group).
+    """
+    hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    order = np.argsort(hashes, kind="stable")
+    sorted_hashes = hashes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_hashes[1:] != sorted_hashes[:-1]])
+    sizes = np.diff(np.r_[starts, len(hashes)])
+    candidates = np.sort(order[np.repeat(sizes > 1, sizes)])
+
+    mask = np.zeros(len(hashes), dtype=bool)
+    if not len(candidates):
+        return mask, []
+    subset = frame.iloc[candidates].reset_index(drop=True)
+    confirmed = subset.duplicated(keep=False).to_numpy()
+    confirmed_rows = candidates[confirmed]
+    mask[confirmed_rows] = True
+    grouped = subset[confirmed].groupby(list(subset.columns), dropna=False, sort=False).indices
+    groups = sorted((confirmed_rows[rows] for rows in grouped.values()), key=lambda g: g[0])
+    return mask, groups
+
+
+def validate(df, year_range=(FIRST_YEAR, LAST_YEAR)):
+    """
+    Run every rule and duplicate check over `df`; returns a JSON-serializable
+    report dict. The report depends only on `df` and `year_range`, so re-running
+    on the same data gives an identical file; the run time is printed, not stored.
+    """
+    start = time.perf_counter()
+    index = df.index.to_numpy()
+
+    masks = rule_masks(df, year_range)
+    rules = {}
+    for name, mask in masks.items():
+        rows = index[mask]
+        rules[name] = {"count": int(mask.sum()), "rows": rows[:MAX_REPORTED_ROWS].tolist()}
+
+    keys, key_cols = facility_keys(df)
+    key_mask, key_groups = duplicate_groups(keys)
+    row_mask, row_groups = duplicate_groups(df)
+    duplicates = {
+        "facility_year": {"key": key_cols, "groups": len(key_groups), "rows": int(key_mask.sum()),
+                          "examples": [index[g].tolist() for g in key_groups[:MAX_REPORTED_ROWS]]},
+        "identical_rows": {"groups": len(row_groups), "rows": int(row_mask.sum()),
+                           "examples": [index[g].tolist() for g in row_groups[:MAX_REPORTED_ROWS]]},
+    }
+
+    flagged = np.logical_or.reduce(list(masks.values()) + [key_mask])
+    report = {
+        "rows": len(df),
+        "columns": list(df.columns),
+        "year_range": [int(year_range[0]), int(year_range[1])],
+        "rules": rules,
+        "duplicates": duplicates,
+        "rows_flagged": int(flagged.sum()),
+    }
+    print(f"Validated {len(df):,} rows in {(time.perf_counter() - start) * 1000:.2f} ms")
+    return report
+
+
+def write_report(report, path=report_json):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def print_summary(report):
+    for name, rule in report["rules"].items():
+        if rule["count"]:
+            print(f"⚠️ {name}: {rule['count']} rows")
+    for name, dup in report["duplicates"].items():
+        if dup["groups"]:
+            print(f"⚠️ duplicate {name.replace('_', ' ')}: {dup['groups']} groups ({dup['rows']} rows)")
+    first_year, last_year = report["year_range"]
+    print(f"{report['rows_flagged']} of {report['rows']:,} rows flagged (years checked {first_year}–{last_year})")
+
+
+if __name__ == "__main__":
+    emission_df = pd.read_csv(emissions_csv)
+    report = validate(emission_df)
+    print_summary(report)
+    write_report(report)
+    print(f"Saved validation report → {report_json}")
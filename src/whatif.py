@@ -0,0 +1,225 @@
+import os
+import time
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from carbon_budget import HORIZON_YEAR
+from emissions_cube import TOTAL_COL
+from facility_index import build_facility_index
+from provinces import load_targets, target_levels
+
+# ---------- Robust paths (run from anywhere) ----------
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+OUT_DIR  = os.path.join(BASE_DIR, "outputs/WhatIf")
+
+emissions_csv = os.path.join(BASE_DIR, "outputs/Cleaned_GHGEmissions.csv")
+
+SUMMARY_YEARS = [2030, 2050]
+N_BENCHMARK = 1000        # random scenarios timed in the demo
+
+# Selector field -> facility column it matches against
+SELECTORS = {
+    "facility": "Facility Name",
+    "sector": "Facility Description",
+    "company": "Reporting Company",
+    "province": "Facility Province",
+}
+
+
+@dataclass
+class Action:
+    """
+    One abatement action on the facilities matching every given selector.
+
+    kind: "reduce" (cut by `amount` as a fraction), "retire" (zero from
+    `year`) or "cap" (at most `amount` tonnes per year). Each selector is a
+    name or list of names; facility may also be a Facility ID.
+    """
+    kind: str
+    year: int
+    amount: float = 0.0
+    facility: object = None
+    sector: object = None
+    company: object = None
+    province: object = None
+
+
+class WhatIfEngine:
+    """
+    Facility x year contribution arrays with incremental scenario evaluation.
+
+    Built once: every facility's emissions through the last actual year,
+    then held flat at its last-year value (0 if it stopped reporting) to
+    the horizon, plus business-as-usual province totals, target gaps and
+    the national gap. evaluate() only touches the rows an action selects:
+    their deltas are scattered onto province totals with np.add.at and
+    gaps are the baseline gaps plus those deltas, so nothing is regrouped.
+    """
+
+    def __init__(self, df, targets, horizon=HORIZON_YEAR):
+        index = build_facility_index(df, [TOTAL_COL])
+        actual, hist_years = index.dense(TOTAL_COL, fill_value=0.0)
+        self.last_year = int(hist_years[-1])
+        self.years = np.arange(hist_years[0], horizon + 1)
+        future = np.repeat(actual[:, -1:], len(self.years) - len(hist_years), axis=1)
+        self.contrib = np.concatenate([actual, future], axis=1)              # F x Y
+        self.facility_ids = index.facility_ids
+
+        # Integer codes per selector column, so selection is a code comparison
+        self.codes, self.labels = {}, {}
+        for field, col in SELECTORS.items():
+            codes, uniques = pd.factorize(index.info[col].astype(str))
+            self.codes[field], self.labels[field] = codes, pd.Index(uniques)
+        self.provinces = np.asarray(self.labels["province"])
+        self.province_codes = self.codes["province"]
+
+        self.totals = np.zeros((len(self.provinces), len(self.years)))
+        np.add.at(self.totals, self.province_codes, self.contrib)
+
+        # Province-wide targets with a level, evaluated at their target year
+        hist_totals = pd.DataFrame(self.totals[:, :len(hist_years)], index=self.provinces, columns=hist_years)
+        levels = target_levels(targets, hist_totals)
+        levels = levels[(levels["Sector"] == "All") & levels["Target Level (upper)"].notna()
+                        & levels["Province"].isin(self.provinces) & levels["Target Year"].between(self.years[0], horizon)]
+        self.targets = levels
+        self.target_rows = self.labels["province"].get_indexer(levels["Province"])
+        self.target_cols = np.searchsorted(self.years, levels["Target Year"].to_numpy(dtype=np.int64))
+        self.target_levels = levels["Target Level (upper)"].to_numpy(dtype=float)
+
+        # National gap: implied emissions above each province's straight line to net zero in the horizon year
+        progress = np.clip((self.years - self.last_year) / (horizon - self.last_year), 0.0, 1.0)
+        last = self.totals[:, self.years == self.last_year]
+        self.net_zero = np.where(self.years >= self.last_year, last * (1.0 - progress), self.totals)
+        self.base = self._result(self.totals)
+
+    def _result(self, totals):
+        gap = totals[self.target_rows, self.target_cols] - self.target_levels
+        return {"totals": totals, "target_gap": gap,
+                "national": totals.sum(axis=0), "national_gap": (totals - self.net_zero).sum(axis=0)}
+
+    def select(self, action):
+        """Row positions of the facilities matched by every selector set on `action`."""
+        mask = np.ones(len(self.facility_ids), dtype=bool)
+        for field in SELECTORS:
+            wanted = getattr(action, field)
+            if wanted is None:
+                continue
+            wanted = [wanted] if np.isscalar(wanted) else list(wanted)
+            if field == "facility" and all(isinstance(w, (int, np.integer)) for w in wanted):
+                mask &= np.isin(self.facility_ids, wanted)
+                continue
+            codes = self.labels[field].get_indexer([str(w) for w in wanted])
+            mask &= np.isin(self.codes[field], codes[codes >= 0])
+        return np.flatnonzero(mask)
+
+    def evaluate(self, actions):
+        """Scenario result (same keys as `self.base`) after applying `actions` in order."""
+        selections = [self.select(a) for a in actions]
+        rows = np.unique(np.concatenate(selections)) if selections else np.array([], dtype=int)
+        original = self.contrib[rows]
+        changed = original.copy()
+        for action, sel in zip(actions, selections):
+            local = np.searchsorted(rows, sel)
+            from_year = self.years >= action.year
+            block = changed[local][:, from_year]
+            if action.kind == "reduce":
+                block = block * (1.0 - action.amount)
+            elif action.kind == "retire":
+                block = np.zeros_like(block)
+            elif action.kind == "cap":
+                block = np.minimum(block, action.amount)
+            else:
+                raise ValueError(f"Unknown abatement action: {action.kind}")
+            changed[np.ix_(local, np.flatnonzero(from_year))] = block
+
+        totals = self.totals.copy()
+        np.add.at(totals, self.province_codes[rows], changed - original)
+        return self._result(totals)
+
+
+def scenario_summary(engine, results):
+    """(per-scenario national table, scenario x target gap table)."""
+    summary, gaps = [], []
+    cols = np.searchsorted(engine.years, SUMMARY_YEARS)
+    base = engine.base
+    for name, res in results.items():
+        row = {"Scenario": name}
+        for year, c in zip(SUMMARY_YEARS, cols):
+            row[f"National {year} (tonnes CO2e)"] = res["national"][c]
+            row[f"Abated {year} vs BAU (tonnes CO2e)"] = base["national"][c] - res["national"][c]
+            row[f"National Gap {year} (tonnes CO2e)"] = res["national_gap"][c]
+        row["Targets Met"] = int((res["target_gap"] <= 0).sum())
+        summary.append(row)
+
+        table = engine.targets[["Province", "Target Year", "Baseline Year", "Target Level (upper)"]].copy()
+        table.insert(0, "Scenario", name)
+        table["Projected Emissions"] = res["totals"][engine.target_rows, engine.target_cols]
+        table["Gap (tonnes CO2e)"] = res["target_gap"]
+        table["Gap Closed vs BAU (tonnes CO2e)"] = base["target_gap"] - res["target_gap"]
+        table["Met"] = res["target_gap"] <= 0
+        gaps.append(table)
+    return pd.DataFrame(summary), pd.concat(gaps, ignore_index=True)
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    emission_df = pd.read_csv(emissions_csv)
+    engine = WhatIfEngine(emission_df, load_targets())
+
+    # Scenarios quantifying the README recommendations
+    oil_sands = ["In-situ oil sands extraction", "Mined oil sands extraction", "Non-Conventional Oil Extraction"]
+    coal_units = ["Boundary Dam Power Station", "Poplar River Power Station", "Shand Power Station",
+                  "Belledune Generating Station", "Lingan Generating Station", "Point Aconi Generating Station",
+                  "Point Tupper Generating Station", "Trenton Generating Station"]
+    top_company = emission_df[emission_df["Reference Year"] == engine.last_year] \
+        .groupby("Reporting Company")[TOTAL_COL].sum().idxmax()
+    scenarios = {
+        "Business as usual": [],
+        "Oil sands CCUS (-60% from 2030)": [Action("reduce", 2030, 0.60, sector=oil_sands, province="Alberta")],
+        "Coal units retired in 2030": [Action("retire", 2030, facility=coal_units)],
+        "Every facility capped at 1 Mt from 2035": [Action("cap", 2035, 1_000_000)],
+        f"{top_company} -25% from 2030": [Action("reduce", 2030, 0.25, company=top_company)],
+    }
+    scenarios["Combined (CCUS + coal + cap)"] = sum(list(scenarios.values())[1:4], [])
+
+    missing = sorted(set(coal_units) - set(engine.labels["facility"]))
+    if missing:
+        print(f"⚠️ Coal units not in the data (no effect): {missing}")
+
+    results = {name: engine.evaluate(actions) for name, actions in scenarios.items()}
+    summary, gaps = scenario_summary(engine, results)
+    summary_csv = os.path.join(OUT_DIR, "whatif_scenario_summary.csv")
+    summary.to_csv(summary_csv, index=False)
+    print(f"Saved what-if scenario summary → {summary_csv}")
+    gaps_csv = os.path.join(OUT_DIR, "whatif_target_gaps.csv")
+    gaps.to_csv(gaps_csv, index=False)
+    print(f"Saved what-if target gaps → {gaps_csv}")
+
+    # Throughput: random single-sector percent reductions
+    rng = np.random.default_rng(42)
+    sectors = rng.choice(np.asarray(engine.labels["sector"]), N_BENCHMARK)
+    cuts = rng.uniform(0.1, 0.9, N_BENCHMARK)
+    start = time.perf_counter()
+    for sector, cut in zip(sectors, cuts):
+        engine.evaluate([Action("reduce", 2030, cut, sector=sector)])
+    elapsed = time.perf_counter() - start
+    print(f"Evaluated {N_BENCHMARK} random scenarios in {elapsed:.2f}s ({N_BENCHMARK / elapsed:,.0f} scenarios/s)")
+
+    # Plot: national implied emissions under each scenario
+    plt.figure(figsize=(12, 6))
+    for name, res in results.items():
+        plt.plot(engine.years, res["national"] / 1e6, linestyle="-" if name == "Business as usual" else "--", label=name)
+    plt.plot(engine.years, engine.net_zero.sum(axis=0) / 1e6, color="black", linestyle=":", label="Net-zero path")
+    plt.axvline(engine.last_year, color="grey", linewidth=0.8)
+    plt.title("Canada (all facilities) — National Emissions under What-If Abatement Scenarios")
+    plt.xlabel("Year")
+    plt.ylabel("Emissions (Mt CO2e)")
+    plt.legend(fontsize=8)
+    plt.grid(True)
+    plt.tight_layout()
+    whatif_png = os.path.join(OUT_DIR, "whatif_national_scenarios.png")
+    plt.savefig(whatif_png, dpi=200)
+    plt.show()
+    print(f"Saved what-if scenario plot → {whatif_png}")